@@ -0,0 +1,216 @@
+"""
+Genre and mood tags from the beat's own sound, to go with the YouTube trend tags.
+
+    python audio_tagger.py                      # tag every analysed beat in the library
+    python audio_tagger.py --analyze            # analyse the rest first
+    python audio_tagger.py --fit labels.json    # refit the prototypes from labelled beats
+
+detect_audio_meta.analyze() stores a few timbre statistics per beat (spectral
+centroid, rolloff, flatness, bass share, onset rate, loudness spread, MFCC
+means) next to bpm and key. Tagging is a nearest-centroid classifier over
+those numbers: each genre and mood is a prototype in tag_prototypes.json, and
+the whole library is one (beats x features) matrix compared against every
+prototype at once. No model download, no GPU, microseconds per beat.
+
+A prototype only constrains the features it lists, so hand-written ones can
+stick to the readable statistics. --fit replaces them with the means of beats
+you labelled yourself, over all features, in the file format:
+    {"genre": {"trap": [beat paths...], ...}, "mood": {"dark": [...], ...}}
+"""
+import argparse
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+from dotenv import load_dotenv
+
+BASE_DIR = Path(__file__).resolve().parent
+
+load_dotenv()
+
+# ===== CONFIG =====
+
+PROTOTYPES_JSON = Path(os.getenv("AUDIO_TAG_PROTOTYPES") or BASE_DIR / "tag_prototypes.json")
+N_MFCC = 13
+BASS_HZ = 150              # below this counts as 808 / bass
+FEATURES = (["tempo", "mode", "centroid", "rolloff", "flatness", "bass_ratio", "onset_rate", "dynamics"]
+            + [f"mfcc{i}" for i in range(N_MFCC)])
+PER_BEAT = {"genre": 1, "mood": 2}      # most tags kept per group
+RUNNER_UP = 1.5            # later picks are kept only within this factor of the best distance
+# ===================
+
+
+def describe(feats):
+    """Timbre statistics of a beat from detect_audio_meta.features() (one STFT of the trimmed audio)."""
+    import librosa
+    from detect_audio_meta import HOP_LENGTH
+
+    sr = feats["sr"]
+    start, end = feats["trim"]
+    y = feats["y"][start:end]
+    if len(y) < 2048:
+        return None
+    spectrum = np.abs(librosa.stft(y, n_fft=2048, hop_length=HOP_LENGTH))
+    power = spectrum ** 2
+    freqs = librosa.fft_frequencies(sr=sr, n_fft=2048)
+
+    mel = librosa.feature.melspectrogram(S=power, sr=sr)
+    mfcc = librosa.feature.mfcc(S=librosa.power_to_db(mel), n_mfcc=N_MFCC).mean(axis=1)
+    loudness = librosa.amplitude_to_db(librosa.feature.rms(S=spectrum)[0], ref=np.max)
+    onset_env = feats["onset_env"][start // HOP_LENGTH:end // HOP_LENGTH + 1]
+    onsets = librosa.onset.onset_detect(onset_envelope=onset_env, sr=sr, hop_length=HOP_LENGTH)
+
+    stats = {
+        "centroid": librosa.feature.spectral_centroid(S=spectrum, sr=sr).mean(),
+        "rolloff": librosa.feature.spectral_rolloff(S=spectrum, sr=sr).mean(),
+        "flatness": librosa.feature.spectral_flatness(S=spectrum).mean(),
+        "bass_ratio": power[freqs < BASS_HZ].sum() / (power.sum() + 1e-12),
+        "onset_rate": len(onsets) / (len(y) / sr),
+        # spread of the loud part only: fade-ins and tails aren't dynamics
+        "dynamics": loudness[loudness > -40].std() if (loudness > -40).any() else 0.0,
+    }
+    stats.update({f"mfcc{i}": v for i, v in enumerate(mfcc)})
+    return {k: round(float(v), 4) for k, v in stats.items()}
+
+
+def _folded_tempo(bpm):
+    # half- and double-time reads of the same groove land on the same number (60-120)
+    bpm = float(bpm or 0)
+    while 0 < bpm < 60:
+        bpm *= 2
+    while bpm >= 120:
+        bpm /= 2
+    return bpm
+
+
+def vector(analysis):
+    """One row of FEATURES for an analysis, NaN where it has no timbre statistics."""
+    timbre = analysis.get("timbre")
+    if not timbre:
+        return np.full(len(FEATURES), np.nan)
+    values = dict(timbre, tempo=_folded_tempo(analysis.get("bpm")),
+                  mode=1.0 if "major" in str(analysis.get("key", "")).lower() else 0.0)
+    return np.array([values.get(name, np.nan) for name in FEATURES], dtype=float)
+
+
+class Prototypes:
+    """The genre and mood centroids of tag_prototypes.json as (tags x features) arrays per group."""
+
+    def __init__(self, path=PROTOTYPES_JSON):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        self.scale = np.array([data["scale"].get(name, 1.0) for name in FEATURES], dtype=float)
+        self.groups = {}
+        for group in PER_BEAT:
+            names = list(data.get(group, {}))
+            centers = np.array([[data[group][n].get(f, np.nan) for f in FEATURES] for n in names], dtype=float)
+            # features a prototype leaves out don't count towards its distance
+            self.groups[group] = (names, np.nan_to_num(centers / self.scale), ~np.isnan(centers))
+
+    def distances(self, X, group):
+        """(beats x tags) mean squared scaled distance of each row of X to each prototype."""
+        names, centers, mask = self.groups[group]
+        diff = np.nan_to_num(X / self.scale)[:, None, :] - centers[None, :, :]
+        return names, (diff ** 2 * mask).sum(axis=2) / np.maximum(mask.sum(axis=1), 1)
+
+
+_prototypes = None
+
+
+def get_prototypes():
+    global _prototypes
+    if _prototypes is None:
+        _prototypes = Prototypes()
+    return _prototypes
+
+
+def classify(X):
+    """Tags for every row of a (beats x FEATURES) matrix in one pass; rows with NaNs get none."""
+    X = np.atleast_2d(X)
+    usable = ~np.isnan(X).any(axis=1)
+    prototypes = get_prototypes()
+    picks = {}
+    for group, n in PER_BEAT.items():
+        names, dist = prototypes.distances(X, group)
+        order = np.argsort(dist, axis=1)[:, :n]
+        ranked = np.take_along_axis(dist, order, axis=1)
+        keep = ranked <= RUNNER_UP * ranked[:, :1]
+        picks[group] = [[names[j] for j, k in zip(row, kept) if k] for row, kept in zip(order, keep)]
+
+    results = []
+    for i, ok in enumerate(usable):
+        if not ok:
+            results.append({"genres": [], "moods": [], "tags": []})
+            continue
+        genres, moods = picks["genre"][i], picks["mood"][i]
+        tags = [f"{m} {g} beat" for g in genres for m in moods] + [f"{g} beat" for g in genres]
+        results.append({"genres": genres, "moods": moods, "tags": tags})
+    return results
+
+
+def tags_for(analysis):
+    """{"genres", "moods", "tags"} for one analysis from detect_audio_meta.analyze_beat()."""
+    return classify(vector(analysis))[0]
+
+
+def tag_library(index=None):
+    """{beat path: tags} for every analysed beat in the library index, classified together."""
+    from library_index import get_index
+
+    index = index or get_index()
+    rows = [(r["path"], json.loads(r["analysis"])) for r in index.files("beat") if r["analysis"]]
+    rows = [(path, analysis) for path, analysis in rows if analysis.get("timbre")]
+    if not rows:
+        return {}
+    X = np.stack([vector(analysis) for _, analysis in rows])
+    return {path: tags for (path, _), tags in zip(rows, classify(X))}
+
+
+def fit(labels_path, out_path=PROTOTYPES_JSON):
+    """Write prototypes that are the feature means of labelled, analysed beats."""
+    from detect_audio_meta import analyze_beat
+
+    with open(labels_path, encoding="utf-8") as f:
+        labels = json.load(f)
+    paths = sorted({p for group in PER_BEAT for tagged in labels.get(group, {}).values() for p in tagged})
+    X = {path: vector(analyze_beat(path)) for path in paths}
+    spread = np.nanstd(np.stack(list(X.values())), axis=0)
+
+    data = {"scale": {name: round(float(s), 4) or 1.0 for name, s in zip(FEATURES, spread)}}
+    for group in PER_BEAT:
+        data[group] = {}
+        for tag, tagged in labels.get(group, {}).items():
+            center = np.nanmean(np.stack([X[p] for p in tagged]), axis=0)
+            data[group][tag] = {name: round(float(v), 4) for name, v in zip(FEATURES, center)}
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    print(f"[INFO] Fitted {sum(len(data[g]) for g in PER_BEAT)} prototypes from {len(paths)} beats into {out_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tag the beat library with genres and moods from its audio.")
+    parser.add_argument("--analyze", action="store_true", help="analyse beats that have no timbre statistics yet")
+    parser.add_argument("--fit", metavar="LABELS_JSON", help="refit the prototypes from labelled beats")
+    args = parser.parse_args()
+
+    if args.fit:
+        fit(args.fit)
+    else:
+        from library_index import get_index
+
+        index = get_index()
+        if args.analyze:
+            from detect_audio_meta import analyze_beat, DuplicateBeat
+
+            for row in index.files("beat"):
+                try:
+                    analyze_beat(row["path"])
+                except DuplicateBeat as e:
+                    print(f"[WARN] {e}")
+        tagged = tag_library(index)
+        for path, tags in tagged.items():
+            print(f"{os.path.relpath(path, BASE_DIR)}: {', '.join(tags['genres'] + tags['moods'])}")
+        missing = len(index.files("beat")) - len(tagged)
+        if missing:
+            print(f"[INFO] {missing} beat(s) not analysed yet (run with --analyze).")
@@ -0,0 +1,265 @@
+import contextvars
+import json
+import mimetypes
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import tracing
+from upload_progress import new_progress, mark_done, save_progress
+
+BASE_DIR = Path(__file__).resolve().parent
+
+load_dotenv()
+
+# ===== CONFIG =====
+
+SESSION_FILE = Path(os.getenv("BEATSTARS_SESSION_FILE", BASE_DIR / "secrets" / "beatstars_session.json"))
+
+# Base URL of the Studio API the HTTP backend talks to (point it at standins/beatstars_api.py to test locally).
+# The backend is disabled while this is unset.
+API_URL = os.getenv("BEATSTARS_API_URL", "")
+# Size of each PUT when streaming an asset; the server may ask for a different one
+CHUNK_SIZE = int(os.getenv("BEATSTARS_CHUNK_SIZE", str(8 * 1024 * 1024)))
+POOL_SIZE = 4
+CHUNK_RETRIES = 3
+# ===================
+
+# Endpoints, relative to API_URL
+CREATE_TRACK = "/tracks"
+TRACK = "/tracks/{track_id}"
+START_ASSET_UPLOAD = "/tracks/{track_id}/assets/{kind}"
+PUBLISH_TRACK = "/tracks/{track_id}/publish"
+
+
+class BeatStarsAPIError(RuntimeError):
+    pass
+
+
+class BeatStarsServerError(BeatStarsAPIError):
+    pass
+
+
+def load_session(session_file=SESSION_FILE):
+    """
+    Read a Playwright storage_state file and return (cookies, bearer token).
+    The token is whatever Studio keeps in localStorage under a *token* key.
+    """
+    with open(session_file, "r", encoding="utf-8") as f:
+        state = json.load(f)
+
+    cookies = requests.cookies.RequestsCookieJar()
+    for c in state.get("cookies", []):
+        cookies.set(c["name"], c["value"], domain=c.get("domain", ""), path=c.get("path", "/"))
+
+    token = None
+    for origin in state.get("origins", []):
+        for item in origin.get("localStorage", []):
+            if "token" not in item["name"].lower():
+                continue
+            value = item["value"]
+            try:
+                parsed = json.loads(value)
+                if isinstance(parsed, dict):
+                    value = parsed.get("access_token") or parsed.get("accessToken") or parsed.get("token")
+            except ValueError:
+                pass
+            if isinstance(value, str) and value:
+                token = value
+                break
+        if token:
+            break
+    return cookies, token
+
+
+class _FileSlice:
+    """Read-only view of bytes [start, end) of an open file, streamed by requests with a known length."""
+
+    def __init__(self, f, start, end):
+        self._f = f
+        self._f.seek(start)
+        self._remaining = end - start
+
+    def __len__(self):
+        return self._remaining
+
+    def read(self, size=-1):
+        if self._remaining <= 0:
+            return b""
+        if size is None or size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._f.read(size)
+        self._remaining -= len(data)
+        return data
+
+
+class BeatStarsHTTPClient:
+    """Talks to the Studio API directly with the cookies/token of a saved browser session."""
+
+    def __init__(self, session_file=SESSION_FILE, api_url=None, pool_size=POOL_SIZE):
+        self.api_url = (api_url or API_URL).rstrip("/")
+        if not self.api_url:
+            raise BeatStarsAPIError("BEATSTARS_API_URL is not set.")
+
+        self.session = requests.Session()
+        # only retry failed connects here; chunk PUTs are retried by upload_asset with a rewound body
+        retry = Retry(total=3, connect=3, read=0, status=0, backoff_factor=0.5)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        cookies, token = load_session(session_file)
+        self.session.cookies = cookies
+        if token:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+
+    def _request(self, method, path, **kwargs):
+        url = path if path.startswith("http") else self.api_url + path
+        resp = self.session.request(method, url, timeout=kwargs.pop("timeout", 60), **kwargs)
+        tracing.count("requests")
+        tracing.count("bytes_received", len(resp.content))
+        if resp.status_code in (401, 403):
+            raise BeatStarsAPIError("BeatStars session expired — run auth_to_beatstars.py again.")
+        if resp.status_code >= 500:
+            raise BeatStarsServerError(f"{method} {url} failed: {resp.status_code} {resp.text[:200]}")
+        if resp.status_code >= 400:
+            raise BeatStarsAPIError(f"{method} {url} failed: {resp.status_code} {resp.text[:200]}")
+        return resp.json() if resp.content else {}
+
+    @tracing.traced("beatstars.api.create")
+    def create_track(self):
+        return self._request("POST", CREATE_TRACK)["id"]
+
+    def upload_asset(self, track_id, kind, file_path):
+        """Stream a file to the track in Content-Range chunks and return the asset id."""
+        with tracing.span(f"beatstars.api.{kind}"):
+            return self._upload_asset(track_id, kind, file_path)
+
+    def _upload_asset(self, track_id, kind, file_path):
+        size = os.path.getsize(file_path)
+        content_type = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+        started = self._request(
+            "POST",
+            START_ASSET_UPLOAD.format(track_id=track_id, kind=kind),
+            json={"filename": os.path.basename(file_path), "size": size, "content_type": content_type},
+        )
+        upload_url = started["upload_url"]
+        chunk_size = int(started.get("chunk_size") or CHUNK_SIZE)
+
+        result = {}
+        offset = 0
+        with open(file_path, "rb") as f:
+            while True:
+                end = min(offset + chunk_size, size)
+                for attempt in range(1, CHUNK_RETRIES + 1):
+                    try:
+                        result = self._request(
+                            "PUT",
+                            upload_url,
+                            data=_FileSlice(f, offset, end),
+                            headers={
+                                "Content-Type": content_type,
+                                "Content-Range": f"bytes {offset}-{end - 1}/{size}" if size else "bytes */0",
+                            },
+                            timeout=300,
+                        )
+                        break
+                    except (requests.ConnectionError, requests.Timeout, BeatStarsServerError) as e:
+                        if attempt == CHUNK_RETRIES:
+                            raise
+                        print(f"[WARN] {kind} chunk at {offset} failed ({e}), retrying...")
+                        tracing.count("retries")
+                        time.sleep(2 ** attempt)
+                tracing.count("bytes_sent", end - offset)
+                offset = end
+                if offset >= size:
+                    break
+        return result.get("asset_id")
+
+    @tracing.traced("beatstars.api.update")
+    def update_track(self, track_id, fields):
+        return self._request("PATCH", TRACK.format(track_id=track_id), json=fields)
+
+    @tracing.traced("beatstars.api.publish")
+    def publish(self, track_id):
+        return self._request("POST", PUBLISH_TRACK.format(track_id=track_id)).get("shortlink")
+
+
+def upload_track(beat_path, image_path, tags, collaborators, title, stems_path=None, preview_path=None,
+                 session_file=SESSION_FILE, api_url=None, progress=None, publish=True):
+    """
+    HTTP counterpart of open_and_fill: upload, fill, publish and return the shortlink.
+    `progress` (see upload_progress.py) is updated and saved as each part lands,
+    so a retry reuses the draft and only sends what is still missing.
+    With publish=False the draft is left unpublished and None is returned.
+    preview_path, if given, is uploaded as the track's (voice-tagged) preview.
+    """
+    client = BeatStarsHTTPClient(session_file=session_file, api_url=api_url)
+    progress = progress or new_progress(beat_path, "http")
+
+    if not progress["track_id"]:
+        progress["track_id"] = client.create_track()
+        mark_done(progress, "create")
+        print(f"[INFO] Draft track created: {progress['track_id']}")
+    track_id = progress["track_id"]
+
+    assets = {"audio": beat_path, "artwork": image_path}
+    if preview_path:
+        # the tagged preview streams on the marketplace instead of a cut of the master
+        assets["preview"] = preview_path
+    if stems_path and os.path.exists(stems_path):
+        assets["stems"] = stems_path
+    elif stems_path:
+        print(f"[WARN] Stem file not found at {stems_path}. Skipping.")
+    pending = {kind: path for kind, path in assets.items() if kind not in progress["assets"]}
+
+    # audio, artwork and stems go up side by side over the pooled session
+    if pending:
+        with ThreadPoolExecutor(max_workers=len(pending)) as pool:
+            # each upload runs in a copy of this context so its span nests under the current one
+            futures = {pool.submit(contextvars.copy_context().run, client.upload_asset, track_id, kind, path): kind
+                       for kind, path in pending.items()}
+            # every asset that lands is saved, even if one before it failed, so a retry doesn't resend it
+            error = None
+            for future in as_completed(futures):
+                kind = futures[future]
+                try:
+                    progress["assets"][kind] = future.result()
+                except Exception as e:
+                    print(f"[ERROR] {kind.capitalize()} upload failed: {e}")
+                    error = error or e
+                    continue
+                save_progress(progress)
+                print(f"[INFO] {kind.capitalize()} uploaded.")
+            if error:
+                raise error
+
+    if "metadata" not in progress["done"]:
+        collabs = collaborators if isinstance(collaborators, list) else [collaborators]
+        client.update_track(track_id, {
+            "title": title,
+            "tags": list(tags),
+            "collaborators": [c.strip() for c in collabs if c and c.strip()],
+            "autofill_metadata": True,
+        })
+        mark_done(progress, "metadata")
+        print("[INFO] Metadata saved.")
+
+    if not publish:
+        print(f"[INFO] Draft {track_id} saved, not publishing yet.")
+        return None
+
+    beat_link = client.publish(track_id)
+    if beat_link:
+        progress["link"] = beat_link
+        mark_done(progress, "publish")
+        print(f"BeatStars shortlink: {beat_link}")
+        with open("last_published_link.txt", "w") as f:
+            f.write(beat_link)
+    return beat_link
@@ -0,0 +1 @@
+"""Standalone benchmarks; run them from src/, e.g. `python -m bench.import_time`."""
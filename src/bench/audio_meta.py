@@ -0,0 +1,299 @@
+"""
+Speed, memory and accuracy of detect_audio_meta on synthetic fixtures.
+
+    python -m bench.audio_meta                    # compare against the baseline
+    python -m bench.audio_meta --quick            # smaller grid while iterating
+    python -m bench.audio_meta --update-baseline
+
+Fixtures are generated (deterministically) with known tempo and key: chord
+progressions in all 24 keys over a drum loop, bare click tracks, noisy mixes,
+and a few lengths and formats (wav, flac, mp3 when ffmpeg is available).
+Each is analysed with estimate_bpm and estimate_key; wall time, peak traced
+memory and accuracy are recorded:
+
+    bpm: exact (within 2%), octave (half/double tempo), wrong
+    key: exact, relative (C major <-> A minor), parallel (C major <-> C minor),
+         fifth (a fifth away, same mode), wrong
+
+The summary is compared with bench/audio_meta_baseline.json and the run fails
+when accuracy drops or time/memory grow beyond the tolerances.
+"""
+import argparse
+import json
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from detect_audio_meta import estimate_bpm, estimate_key  # noqa: E402
+
+# ===== CONFIG =====
+
+BASELINE_FILE = Path(__file__).resolve().parent / "audio_meta_baseline.json"
+FIXTURE_DIR = BASE_DIR / "cache" / "bench_audio"
+SR = 22050
+TEMPOS = [72, 90, 120, 140, 160]
+ACCURACY_DROP = 0.05      # fail when a rate falls by more than this (absolute)
+SLOWDOWN = 1.3            # ... or time / memory grow by more than this factor
+# ===================
+
+PITCH_CLASSES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+# semitone offsets from the tonic: I-V-vi-IV and i-iv-V-i (harmonic minor)
+PROGRESSIONS = {
+    "Major": [(0, 4, 7), (7, 11, 14), (9, 12, 16), (5, 9, 12)],
+    "Minor": [(0, 3, 7), (5, 8, 12), (7, 11, 14), (0, 3, 7)],
+}
+
+
+# ===========================================
+# Synthesis
+# ===========================================
+def _tone(freq, n, rng):
+    t = np.arange(n) / SR
+    phase = rng.uniform(0, 2 * np.pi)
+    wave = sum((0.6 ** h) * np.sin(2 * np.pi * freq * (h + 1) * t + phase) for h in range(4))
+    return wave * np.exp(-1.5 * t)
+
+
+def chords(tonic, mode, bpm, seconds, rng):
+    """Block chords plus bass, one chord per bar, looping the progression."""
+    n = int(seconds * SR)
+    out = np.zeros(n)
+    bar = int(4 * 60 / bpm * SR)
+    root_midi = 48 + PITCH_CLASSES.index(tonic)  # around C3
+    for i, start in enumerate(range(0, n, bar)):
+        length = min(bar, n - start)
+        for offset in PROGRESSIONS[mode][i % 4]:
+            out[start:start + length] += _tone(440 * 2 ** ((root_midi + offset - 69) / 12), length, rng)
+        bass = PROGRESSIONS[mode][i % 4][0]
+        out[start:start + length] += 1.5 * _tone(440 * 2 ** ((root_midi - 12 + bass - 69) / 12), length, rng)
+    return out / (np.abs(out).max() + 1e-9)
+
+
+def drums(bpm, seconds, rng):
+    """Kick on 1 and 3, snare on 2 and 4, hats on eighths."""
+    n = int(seconds * SR)
+    out = np.zeros(n)
+    beat = 60 / bpm * SR
+    kick_t = np.arange(int(0.15 * SR)) / SR
+    kick = np.sin(2 * np.pi * (50 + 100 * np.exp(-kick_t * 30)) * kick_t) * np.exp(-kick_t * 20)
+    snare = rng.standard_normal(int(0.12 * SR)) * np.exp(-np.arange(int(0.12 * SR)) / SR * 30) * 0.6
+    hat = np.diff(rng.standard_normal(int(0.03 * SR) + 1)) * np.exp(-np.arange(int(0.03 * SR)) / SR * 150) * 0.2
+    for k in range(int(seconds * bpm / 60 * 2)):
+        pos = int(k * beat / 2)
+        sounds = [hat] + ([kick] if k % 4 == 0 else []) + ([snare] if k % 4 == 2 else [])
+        for sound in sounds:
+            end = min(n, pos + len(sound))
+            out[pos:end] += sound[:end - pos]
+    return out / (np.abs(out).max() + 1e-9)
+
+
+def clicks(bpm, seconds):
+    """Metronome: 1 kHz blips, accented downbeat."""
+    n = int(seconds * SR)
+    out = np.zeros(n)
+    blip_t = np.arange(int(0.02 * SR)) / SR
+    for k in range(int(seconds * bpm / 60)):
+        pos = int(k * 60 / bpm * SR)
+        freq, gain = (1500, 1.0) if k % 4 == 0 else (1000, 0.6)
+        blip = gain * np.sin(2 * np.pi * freq * blip_t) * np.exp(-blip_t * 200)
+        end = min(n, pos + len(blip))
+        out[pos:end] += blip[:end - pos]
+    return out
+
+
+def fixture_grid(quick=False):
+    """(name, kind, tonic, mode, bpm, seconds, noise_snr_db, format) for every fixture."""
+    grid = []
+    keys = [(t, m) for m in ("Major", "Minor") for t in PITCH_CLASSES]
+    if quick:
+        keys = keys[::4]
+    for i, (tonic, mode) in enumerate(keys):
+        bpm = TEMPOS[i % len(TEMPOS)]
+        grid.append((f"key_{tonic}{mode[:3]}_{bpm}", "mix", tonic, mode, bpm, 30, None, "wav"))
+    for bpm in (TEMPOS[::2] if quick else TEMPOS):
+        grid.append((f"click_{bpm}", "click", None, None, bpm, 30, None, "wav"))
+    for seconds in ((15, 60) if quick else (15, 60, 180)):
+        for fmt in ("wav", "flac", "mp3"):
+            grid.append((f"len{seconds}_{fmt}", "mix", "A", "Minor", 140, seconds, None, fmt))
+    for i, snr in enumerate((20, 10) if quick else (20, 10, 5)):
+        tonic = PITCH_CLASSES[(3 * i + 2) % 12]
+        grid.append((f"noise{snr}db_{tonic}Maj", "mix", tonic, "Major", TEMPOS[i + 1], 30, snr, "wav"))
+    return grid
+
+
+def render_fixture(spec, rng):
+    name, kind, tonic, mode, bpm, seconds, snr, fmt = spec
+    if kind == "click":
+        y = clicks(bpm, seconds)
+    else:
+        y = 0.6 * chords(tonic, mode, bpm, seconds, rng) + 0.4 * drums(bpm, seconds, rng)
+    if snr is not None:
+        noise = rng.standard_normal(len(y))
+        y = y + noise * np.sqrt(np.mean(y ** 2) / 10 ** (snr / 10))
+    return (0.9 * y / (np.abs(y).max() + 1e-9)).astype(np.float32)
+
+
+def write_fixture(spec, directory, rng):
+    """Render a fixture to disk (reused between runs); None if its format can't be produced here."""
+    name, fmt = spec[0], spec[-1]
+    path = directory / f"{name}.{fmt}"
+    if path.exists():
+        return path
+    y = render_fixture(spec, rng)
+    if fmt in ("wav", "flac"):
+        sf.write(path, y, SR)
+        return path
+    if not shutil.which("ffmpeg"):
+        return None
+    wav = directory / f"{name}.tmp.wav"
+    sf.write(wav, y, SR)
+    subprocess.run(["ffmpeg", "-y", "-loglevel", "error", "-i", str(wav), "-b:a", "192k", str(path)], check=True)
+    wav.unlink()
+    return path
+
+
+# ===========================================
+# Scoring
+# ===========================================
+def bpm_category(expected, got):
+    if abs(got - expected) <= 0.02 * expected:
+        return "exact"
+    if any(abs(got - expected * f) <= 0.02 * expected * f for f in (0.5, 2.0, 2 / 3, 1.5)):
+        return "octave"
+    return "wrong"
+
+
+def key_category(tonic, mode, got):
+    got_tonic, got_mode = got.split()
+    a, b = PITCH_CLASSES.index(tonic), PITCH_CLASSES.index(got_tonic)
+    if got_mode == mode:
+        if a == b:
+            return "exact"
+        if (b - a) % 12 in (5, 7):
+            return "fifth"
+        return "wrong"
+    relative = (a + 9) % 12 if mode == "Major" else (a + 3) % 12
+    if b == relative:
+        return "relative"
+    if a == b:
+        return "parallel"
+    return "wrong"
+
+
+def measure(func, path):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(str(path))
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 1e6
+
+
+# ===========================================
+# Run
+# ===========================================
+def run(quick=False):
+    FIXTURE_DIR.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(274)
+    # librosa JIT-compiles on first use; keep that out of the first fixture's numbers
+    warmup = write_fixture(("warmup", "mix", "C", "Major", 120, 5, None, "wav"), FIXTURE_DIR, rng)
+    estimate_bpm(str(warmup))
+    estimate_key(str(warmup))
+    rows = []
+    for spec in fixture_grid(quick):
+        name, kind, tonic, mode, bpm, seconds, snr, fmt = spec
+        path = write_fixture(spec, FIXTURE_DIR, rng)
+        if path is None:
+            print(f"{name:<22} skipped (no ffmpeg for {fmt})")
+            continue
+        got_bpm, bpm_time, bpm_mem = measure(estimate_bpm, path)
+        row = {
+            "name": name, "seconds": seconds, "format": fmt,
+            "bpm": bpm, "got_bpm": got_bpm, "bpm_result": bpm_category(bpm, got_bpm),
+            "bpm_time": bpm_time, "bpm_mem": bpm_mem,
+        }
+        if kind == "mix":
+            got_key, key_time, key_mem = measure(estimate_key, path)
+            row.update(key=f"{tonic} {mode}", got_key=got_key, key_result=key_category(tonic, mode, got_key),
+                       key_time=key_time, key_mem=key_mem)
+        rows.append(row)
+        print(f"{name:<22} bpm {bpm:>3}->{got_bpm:<3} {row['bpm_result']:<6} {bpm_time:6.2f}s {bpm_mem:6.0f}MB"
+              + (f"   key {row['key']:<9}->{row['got_key']:<9} {row['key_result']:<8} {row['key_time']:6.2f}s {row['key_mem']:6.0f}MB"
+                 if "key" in row else ""))
+    return rows
+
+
+def summarize(rows):
+    keyed = [r for r in rows if "key" in r]
+    audio_minutes = sum(r["seconds"] for r in rows) / 60
+    summary = {
+        "fixtures": len(rows),
+        "bpm_exact": sum(r["bpm_result"] == "exact" for r in rows) / len(rows),
+        "bpm_exact_or_octave": sum(r["bpm_result"] != "wrong" for r in rows) / len(rows),
+        "key_exact": sum(r["key_result"] == "exact" for r in keyed) / len(keyed),
+        "key_exact_or_related": sum(r["key_result"] != "wrong" for r in keyed) / len(keyed),
+        # seconds of analysis per minute of audio
+        "bpm_s_per_min": sum(r["bpm_time"] for r in rows) / audio_minutes,
+        "key_s_per_min": sum(r["key_time"] for r in keyed) / (sum(r["seconds"] for r in keyed) / 60),
+        "peak_mem_mb": max(max(r["bpm_mem"], r.get("key_mem", 0)) for r in rows),
+        "median_peak_mem_mb": statistics.median(max(r["bpm_mem"], r.get("key_mem", 0)) for r in rows),
+    }
+    for field in ("key_result", "bpm_result"):
+        counts = {}
+        for r in rows:
+            if field in r:
+                counts[r[field]] = counts.get(r[field], 0) + 1
+        summary[field.replace("_result", "_categories")] = counts
+    return summary
+
+
+def compare(summary, baseline):
+    """Human-readable regressions against the baseline (empty list if none)."""
+    problems = []
+    for rate in ("bpm_exact", "bpm_exact_or_octave", "key_exact", "key_exact_or_related"):
+        if rate in baseline and summary[rate] < baseline[rate] - ACCURACY_DROP:
+            problems.append(f"{rate} fell from {baseline[rate]:.0%} to {summary[rate]:.0%}")
+    for cost in ("bpm_s_per_min", "key_s_per_min", "peak_mem_mb"):
+        if cost in baseline and summary[cost] > baseline[cost] * SLOWDOWN:
+            problems.append(f"{cost} grew from {baseline[cost]:.2f} to {summary[cost]:.2f}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="smaller fixture grid")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    summary = summarize(run(args.quick))
+    print("\n" + json.dumps(summary, indent=2))
+
+    baselines = json.loads(BASELINE_FILE.read_text()) if BASELINE_FILE.exists() else {}
+    grid = "quick" if args.quick else "full"
+    if args.update_baseline:
+        baselines[grid] = summary
+        BASELINE_FILE.write_text(json.dumps(baselines, indent=2) + "\n")
+        print(f"\nBaseline ({grid}) written to {BASELINE_FILE}")
+        return
+    problems = compare(summary, baselines.get(grid, {}))
+    if problems:
+        print("\n[ERROR] detect_audio_meta regressed:")
+        for problem in problems:
+            print(f"  - {problem}")
+        sys.exit(1)
+    print(f"\nNo regressions against the {grid} baseline." if grid in baselines else "\nNo baseline yet (--update-baseline).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Startup latency of the entry points.
+
+    python -m bench.import_time                  # compare against the baseline
+    python -m bench.import_time --update-baseline
+
+Every module is imported in a fresh interpreter (so nothing is cached between
+runs), several times, and the median wall time is compared with
+bench/import_time_baseline.json. A module that got slower than the baseline by
+more than the tolerance fails the run; the heaviest imports from
+`python -X importtime` are printed to show where the time went.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# ===== CONFIG =====
+
+BASELINE_FILE = Path(__file__).resolve().parent / "import_time_baseline.json"
+ENTRY_POINTS = ["orchestrator", "gui", "yt_status_watcher", "yt_bulk_update", "upload_to_youtube", "upload_to_beatstars"]
+RUNS = 5
+TOLERANCE = 1.5     # fail when slower than baseline * TOLERANCE ...
+SLACK_MS = 50       # ... and by more than this many ms (noise floor)
+TOP_IMPORTS = 5
+# ===================
+
+
+def _run(module, *flags):
+    return subprocess.run(
+        [sys.executable, *flags, "-c", f"import {module}"],
+        cwd=BASE_DIR, capture_output=True, text=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    )
+
+
+def time_import(module, runs=RUNS):
+    """Median wall time (ms) of a new interpreter that imports `module`."""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = _run(module)
+        elapsed = (time.perf_counter() - start) * 1000
+        if result.returncode != 0:
+            error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "unknown error"
+            raise ImportError(error)
+        samples.append(elapsed)
+    return statistics.median(samples)
+
+
+def heaviest_imports(module, top=TOP_IMPORTS):
+    """Direct imports of `module` with the largest cumulative time in -X importtime (ms)."""
+    stderr = _run(module, "-X", "importtime").stderr
+    children, totals = {}, {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or line.count("|") != 2:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        # children are listed before the module that imported them
+        if depth == 1:
+            children[name.strip()] = int(cumulative) / 1000
+        elif depth == 0:
+            if name.strip() == module:
+                totals = children
+            children = {}
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("modules", nargs="*", default=ENTRY_POINTS)
+    parser.add_argument("--runs", type=int, default=RUNS)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    startup = time_import("sys", args.runs)
+    print(f"Bare interpreter startup: {startup:.0f} ms\n")
+
+    try:
+        with open(BASELINE_FILE, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        baseline = {}
+
+    results, regressions = {}, []
+    for module in args.modules:
+        try:
+            ms = max(time_import(module, args.runs) - startup, 0.0)
+        except ImportError as e:
+            print(f"{module:<22} skipped ({e})")
+            continue
+        results[module] = round(ms, 1)
+        line = f"{module:<22} {ms:8.0f} ms"
+        if module in baseline:
+            line += f"   baseline {baseline[module]:.0f} ms"
+            if ms > baseline[module] * TOLERANCE and ms - baseline[module] > SLACK_MS:
+                line += "   REGRESSION"
+                regressions.append(module)
+        print(line)
+        for name, cumulative in heaviest_imports(module):
+            print(f"    {name:<30} {cumulative:8.1f} ms")
+
+    if args.update_baseline:
+        with open(BASELINE_FILE, "w", encoding="utf-8") as f:
+            json.dump({**baseline, **results}, f, indent=2, sort_keys=True)
+        print(f"\nBaseline written to {BASELINE_FILE}")
+    elif regressions:
+        print(f"\n[ERROR] Import time regressed for: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
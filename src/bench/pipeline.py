@@ -0,0 +1,281 @@
+"""
+End-to-end latency of orchestrator.main against local stand-ins.
+
+    python -m bench.pipeline                              # one beat
+    python -m bench.pipeline --beats 6 --parallel 3       # a batch, 3 at a time
+    python -m bench.pipeline --latency 80 --failure-rate 0.05 --bandwidth 4
+
+YouTube (and Google's token endpoint), Gemini and BeatStars are replaced by the
+servers in standins/, reached through the same endpoint overrides a real setup
+could use (YOUTUBE_API_ENDPOINT, GOOGLE_TOKEN_URI, GEMINI_API_ENDPOINT,
+BEATSTARS_STUDIO_URL / BEATSTARS_API_URL). Every call to them can get
+artificial latency, a failure rate and an upload bandwidth cap. Beats, artwork
+and stems are synthesized, and every state file the pipeline writes (quota
+ledger, watch list, upload sessions, library index, traces, .env token) goes to a
+scratch directory, so real accounts and data are never touched.
+
+Prints per-stage and end-to-end latency plus batch throughput, and appends the
+result to cache/bench_pipeline.jsonl to track it over time.
+"""
+import argparse
+import contextlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+from PIL import Image
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from bench.audio_meta import SR, PITCH_CLASSES, TEMPOS, chords, drums  # noqa: E402
+from standins import beatstars_api, beatstars_studio, gemini_api, youtube_api  # noqa: E402
+
+# ===== CONFIG =====
+
+HISTORY_FILE = BASE_DIR / "cache" / "bench_pipeline.jsonl"
+ARTIST = "Bench Artist"
+BEAT_SECONDS = 30
+STAGES = ["auth", "analyze", "tags", "metadata", "beatstars", "video", "youtube", "shorts", "cleanup"]
+# ===================
+
+
+# ===========================================
+# Environment
+# ===========================================
+def start_standins(latency_ms=0, failure_rate=0.0, bandwidth_mbps=0, beatstars="browser"):
+    """Start every stand-in and point the pipeline's endpoint overrides at them."""
+    knobs = {"latency": latency_ms / 1000, "failure_rate": failure_rate}
+    bandwidth = int(bandwidth_mbps * 1e6)
+    servers = {
+        "youtube": youtube_api.start(bandwidth=bandwidth, **knobs),
+        "gemini": gemini_api.start(**knobs),
+    }
+    yt_url, gemini_url = servers["youtube"][1], servers["gemini"][1]
+    os.environ.update({
+        "YOUTUBE_API_ENDPOINT": yt_url,
+        "GOOGLE_TOKEN_URI": f"{yt_url}/token",
+        "YOUTUBE_API_KEY": "bench",
+        "GEMINI_API_ENDPOINT": gemini_url,
+        "GEMINI_API_KEY": "bench",
+    })
+    if beatstars == "http":
+        servers["beatstars"] = beatstars_api.start(**knobs)
+        os.environ.update({"BEATSTARS_BACKEND": "http", "BEATSTARS_API_URL": servers["beatstars"][1]})
+    else:
+        servers["beatstars"] = beatstars_studio.start(bandwidth=bandwidth, **knobs)
+        os.environ.update({"BEATSTARS_BACKEND": "browser", "BEATSTARS_STUDIO_URL": servers["beatstars"][1]})
+    return servers
+
+
+def isolate(workdir, studio_url):
+    """Send every file the pipeline writes into workdir (call after start_standins, before running)."""
+    session = workdir / "beatstars_session.json"
+    session.write_text(json.dumps({"cookies": [], "origins": [
+        {"origin": studio_url, "localStorage": [{"name": "auth_token", "value": "bench"}]}]}))
+    os.environ["BEATSTARS_SESSION_FILE"] = str(session)
+
+    import google_auth_check
+    import gen_video
+    import library_index
+    import network_filter
+    import prep_image
+    import tracing
+    import upload_progress
+    import upload_to_youtube
+    import voice_tag
+    import yt_quota
+    import yt_status_watcher
+
+    google_auth_check.ENV_PATH = workdir / ".env"
+    gen_video.VIDEO_DIR = workdir / "vids"
+    network_filter.SIZES_FILE = workdir / "network_sizes.json"
+    prep_image.DERIVATIVE_DIR = workdir / "artwork"
+    tracing.TRACE_DIR = workdir / "traces"
+    tracing.TRACE_FILE = tracing.TRACE_DIR / "spans.jsonl"
+    tracing.METRICS_FILE = tracing.TRACE_DIR / "metrics.json"
+    tracing.PROM_FILE = tracing.TRACE_DIR / "beat_pipeline.prom"
+    upload_progress.PROGRESS_DIR = workdir / "beatstars_progress"
+    upload_to_youtube.UPLOAD_STATE_DIR = workdir / "yt_uploads"
+    yt_quota.QUOTA_FILE = workdir / "yt_quota.json"
+    voice_tag.CACHE_DIR = workdir / "tagged"
+    yt_status_watcher.WATCH_FILE = workdir / "yt_watch.json"
+    data = workdir / "data"
+    library_index._index = library_index.LibraryIndex(
+        workdir / "library.sqlite3",
+        roots={"beat": data / "beats", "image": data / "images", "stems": data / "stems"},
+        collabs_json=data / "collabs.json",
+    )
+    os.makedirs(gen_video.VIDEO_DIR, exist_ok=True)
+
+    # every channel profile in CONFIG.yml gets stand-in credentials
+    for channel in upload_to_youtube.load_channels():
+        for suffix in ("CLIENT_ID", "CLIENT_SECRET", "REFRESH_TOKEN"):
+            os.environ[f"{channel['env_prefix']}_{suffix}"] = "bench"
+    os.chdir(workdir)
+
+
+def make_fixtures(workdir, count, seconds=BEAT_SECONDS):
+    """(beat, image, stems zip) per job; the pipeline deletes them, so each job gets its own."""
+    rng = np.random.default_rng(274)
+    jobs = []
+    for i in range(count):
+        folder = workdir / "data" / "beats" / ARTIST
+        os.makedirs(folder, exist_ok=True)
+        os.makedirs(workdir / "data" / "images" / ARTIST, exist_ok=True)
+        bpm = TEMPOS[i % len(TEMPOS)]
+        mode = "Minor" if i % 2 else "Major"
+        y = 0.6 * chords(PITCH_CLASSES[(5 * i) % 12], mode, bpm, seconds, rng) + 0.4 * drums(bpm, seconds, rng)
+        beat = folder / f"bench beat {i + 1}.wav"
+        sf.write(beat, (0.9 * y / np.abs(y).max()).astype(np.float32), SR)
+
+        gradient = np.linspace(0, 255, 1280, dtype=np.uint8)
+        pixels = np.stack([np.tile(gradient, (720, 1)), np.full((720, 1280), 40 * i % 255, np.uint8),
+                           np.tile(gradient[::-1], (720, 1))], axis=-1)
+        image = workdir / "data" / "images" / ARTIST / f"cover {i + 1}.jpg"
+        Image.fromarray(pixels).save(image, quality=90)
+
+        stems = workdir / "data" / "stems" / ARTIST / f"bench beat {i + 1}.zip"
+        os.makedirs(stems.parent, exist_ok=True)
+        with zipfile.ZipFile(stems, "w") as z:
+            z.write(beat, "drums.wav")
+        jobs.append((str(beat), str(image), str(stems)))
+    return jobs
+
+
+# ===========================================
+# Run
+# ===========================================
+def run_one(job):
+    """One orchestrator.main run; returns its stage durations, total time and outcome."""
+    from orchestrator import main as orchestrator_main
+
+    beat, image, stems = job
+    marks = []
+    upload_speeds = []
+
+    def on_stage(name):
+        marks.append((name, time.perf_counter()))
+
+    def on_progress(kind, fraction, speed):
+        if kind == "upload" and speed:
+            upload_speeds.append(speed)
+
+    start = time.perf_counter()
+    error = None
+    try:
+        result = orchestrator_main(beat, image, ARTIST, stems_path=stems, on_stage=on_stage, on_progress=on_progress)
+        if result is None:
+            error = "pipeline stopped (see log)"
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    end = time.perf_counter()
+
+    stages = {}
+    for (name, at), (_, until) in zip(marks, marks[1:] + [(None, end)]):
+        stages[name] = stages.get(name, 0.0) + until - at
+    return {"beat": os.path.basename(beat), "stages": stages, "total": end - start, "ok": error is None,
+            "error": error, "upload_mb_s": upload_speeds[-1] if upload_speeds else None}
+
+
+def run_batch(jobs, parallel=1, log_path=None):
+    """Run every job (parallel at a time) with pipeline output sent to log_path; returns (results, wall time)."""
+    log = open(log_path, "w", encoding="utf-8") if log_path else None
+    redirect = contextlib.redirect_stdout(log) if log else contextlib.nullcontext()
+    start = time.perf_counter()
+    try:
+        with redirect, ThreadPoolExecutor(max_workers=parallel) as pool:
+            results = list(pool.map(run_one, jobs))
+    finally:
+        if log:
+            log.close()
+    return results, time.perf_counter() - start
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def summarize(results, wall):
+    def stats(values):
+        return {"mean": statistics.fmean(values), "p50": _percentile(values, 0.5),
+                "p95": _percentile(values, 0.95), "max": max(values)} if values else None
+
+    ok = [r for r in results if r["ok"]]
+    names = [s for s in STAGES if any(s in r["stages"] for r in results)]
+    return {
+        "beats": len(results),
+        "succeeded": len(ok),
+        "wall_s": wall,
+        "beats_per_min": len(ok) / wall * 60 if wall else 0.0,
+        "end_to_end": stats([r["total"] for r in ok]),
+        "stages": {name: stats([r["stages"][name] for r in ok if name in r["stages"]]) for name in names},
+        "errors": [f"{r['beat']}: {r['error']}" for r in results if not r["ok"]],
+    }
+
+
+def print_report(summary):
+    print(f"{'stage':<12} {'mean':>8} {'p50':>8} {'p95':>8} {'max':>8}")
+    rows = list(summary["stages"].items()) + [("end-to-end", summary["end_to_end"])]
+    for name, s in rows:
+        if s:
+            print(f"{name:<12} {s['mean']:7.2f}s {s['p50']:7.2f}s {s['p95']:7.2f}s {s['max']:7.2f}s")
+    print(f"\n{summary['succeeded']}/{summary['beats']} beats in {summary['wall_s']:.1f}s "
+          f"({summary['beats_per_min']:.2f} beats/min)")
+    for error in summary["errors"]:
+        print(f"[ERROR] {error}")
+
+
+def _git_commit():
+    result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True, text=True)
+    return result.stdout.strip() or None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--beats", type=int, default=1, help="beats in the batch")
+    parser.add_argument("--parallel", type=int, default=1, help="pipelines running at once")
+    parser.add_argument("--seconds", type=int, default=BEAT_SECONDS, help="length of each synthetic beat")
+    parser.add_argument("--latency", type=float, default=0, help="ms added to every stand-in call")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of stand-in calls answered with 503")
+    parser.add_argument("--bandwidth", type=float, default=0, help="upload cap in MB/s (0 = unlimited)")
+    parser.add_argument("--beatstars", choices=["browser", "http"], default="browser",
+                        help="drive the Studio mock page with Playwright, or use the HTTP backend")
+    parser.add_argument("--verbose", action="store_true", help="show pipeline output instead of logging it")
+    args = parser.parse_args()
+
+    servers = start_standins(args.latency, args.failure_rate, args.bandwidth, args.beatstars)
+    workdir = Path(tempfile.mkdtemp(prefix="bench_pipeline_"))
+    isolate(workdir, servers["beatstars"][1])
+    jobs = make_fixtures(workdir, args.beats, args.seconds)
+    log_path = None if args.verbose else workdir / "pipeline.log"
+    print(f"Running {args.beats} beat(s), {args.parallel} at a time (scratch: {workdir})\n")
+
+    results, wall = run_batch(jobs, args.parallel, log_path)
+    summary = summarize(results, wall)
+    print_report(summary)
+    if log_path:
+        print(f"\nPipeline log: {log_path}")
+
+    os.makedirs(HISTORY_FILE.parent, exist_ok=True)
+    record = {"at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"), "commit": _git_commit(),
+              "args": {k: v for k, v in vars(args).items() if k != "verbose"}, "summary": summary}
+    with open(HISTORY_FILE, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+    if summary["succeeded"] < summary["beats"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,57 @@
 import librosa
 import numpy as np
 
+import tracing
+
 _PITCH_CLASSES = ['C','C#','D','D#','E','F','F#','G','G#','A','A#','B']
 _MAJOR_PROFILE = np.array([6.35,2.23,3.48,2.33,4.38,4.09,2.52,5.19,2.39,3.66,2.29,2.88])
 _MINOR_PROFILE = np.array([6.33,2.68,3.52,5.38,2.60,3.53,2.54,4.75,3.98,2.69,3.34,3.17])
 
-def estimate_bpm(path):
-    y, sr = librosa.load(path, mono=True)
-    tempo, _ = librosa.beat.beat_track(y=y, sr=sr)
-    return int(round(tempo[0]))
+HOP_LENGTH = 512
+FP_SEGMENTS = 16       # time slices whose chroma shape goes into the fingerprint (16 x 12 bits)
+FP_ONSET_STEPS = 64    # rises/falls of the onset envelope in the fingerprint (64 bits)
+# what analyze() returns; stored analyses missing any of it are redone
+ANALYSIS_KEYS = {"bpm", "key", "fingerprint", "structure", "timbre", "highlight"}
+
+
+class DuplicateBeat(Exception):
+    """The beat sounds like one that was already released."""
+
+    def __init__(self, path, match):
+        super().__init__(f"{path} duplicates {match['path']} ({match['artist']}, released {match['released_at'][:10]}, "
+                         f"{match['distance']} bits apart)")
+        self.path = path
+        self.match = match
 
-def estimate_key(path):
-    y, sr = librosa.load(path, mono=True)
-    y, _ = librosa.effects.trim(y)
-    y_harmonic, _ = librosa.effects.hpss(y)
 
+def _onset_envelope(y, sr):
+    # same envelope beat_track computes from y, so the tempo is unchanged when it is passed in
+    return librosa.onset.onset_strength(y=y, sr=sr, hop_length=HOP_LENGTH, aggregate=np.median)
+
+
+def _chroma(y, sr):
     chroma = librosa.feature.chroma_cqt(y=y, sr=sr)
-    chroma = chroma / (chroma.sum(axis=0, keepdims=True) + 1e-6)
+    return chroma / (chroma.sum(axis=0, keepdims=True) + 1e-6)
+
+
+def features(y, sr):
+    """Everything the estimates and the fingerprint share, computed once per beat."""
+    y_trimmed, (start, end) = librosa.effects.trim(y)
+    return {
+        "y": y,
+        "sr": sr,
+        "onset_env": _onset_envelope(y, sr),
+        "chroma": _chroma(y_trimmed, sr),
+        "trim": (int(start), int(end)),
+    }
+
+
+def _bpm(onset_env, sr):
+    tempo, _ = librosa.beat.beat_track(onset_envelope=onset_env, sr=sr, hop_length=HOP_LENGTH)
+    return int(round(tempo[0]))
+
+
+def _key(chroma):
     chroma_mean = chroma.mean(axis=1)
 
     best_score, best_key, best_mode = -np.inf, None, None
@@ -42,9 +77,77 @@ def estimate_key(path):
     # confidence = float(np.exp(best_score) / np.sum(np.exp(vals)))
 
     return f"{best_key} {best_mode}"
-    
+
+
+def fingerprint(feats):
+    """
+    256-bit fingerprint (hex) that survives re-encoding, renaming and gain changes:
+    which pitch classes dominate each of FP_SEGMENTS slices of the trimmed beat,
+    and whether the onset strength rises or falls between FP_ONSET_STEPS slices.
+    None for clips too short to slice.
+    """
+    chroma = feats["chroma"]
+    start, end = feats["trim"]
+    onset = feats["onset_env"][start // HOP_LENGTH:end // HOP_LENGTH + 1]
+    if chroma.shape[1] < FP_SEGMENTS or len(onset) <= FP_ONSET_STEPS:
+        return None
+    slices = np.stack([s.mean(axis=1) for s in np.array_split(chroma, FP_SEGMENTS, axis=1)])
+    chroma_bits = slices > slices.mean(axis=1, keepdims=True)
+    steps = np.array([s.mean() for s in np.array_split(onset, FP_ONSET_STEPS + 1)])
+    onset_bits = steps[1:] > steps[:-1]
+    return np.packbits(np.concatenate([chroma_bits.ravel(), onset_bits])).tobytes().hex()
+
+
+@tracing.traced("audio.analyze")
+def analyze(path):
+    """
+    bpm, key, fingerprint, song structure, timbre statistics and the Shorts
+    highlight of a beat from a single decode.
+    """
+    from audio_tagger import describe
+    from shorts import pick_segment
+    from song_structure import analyze_structure
+
+    y, sr = librosa.load(path, mono=True)
+    feats = features(y, sr)
+    bpm = _bpm(feats["onset_env"], sr)
+    structure = analyze_structure(feats, bpm)
+    return {"bpm": bpm, "key": _key(feats["chroma"]), "fingerprint": fingerprint(feats),
+            "structure": structure, "timbre": describe(feats), "highlight": pick_segment(feats, structure)}
+
+
+def analyze_beat(path):
+    """
+    analyze() through the library index: reused while the file is unchanged,
+    and refused with DuplicateBeat when it matches an already released beat
+    (which also takes it out of random picks).
+    """
+    from library_index import get_index
+
+    index = get_index()
+    analysis = index.get_analysis(path)
+    if not analysis or ANALYSIS_KEYS - set(analysis):
+        analysis = analyze(path)
+        index.set_analysis(path, analysis)
+    else:
+        tracing.count("cache_hits")
+    match = index.find_duplicate(analysis["fingerprint"], path) if analysis["fingerprint"] else None
+    if match:
+        index.set_analysis(path, analysis, status="duplicate")
+        raise DuplicateBeat(path, match)
+    return analysis
+
+
+def estimate_bpm(path):
+    y, sr = librosa.load(path, mono=True)
+    return _bpm(_onset_envelope(y, sr), sr)
+
+def estimate_key(path):
+    y, sr = librosa.load(path, mono=True)
+    y, _ = librosa.effects.trim(y)
+    return _key(_chroma(y, sr))
+
 
 def detect_audio_meta(path):
-    bpm = estimate_bpm(path)
-    key = estimate_key(path)
-    return bpm, key
+    analysis = analyze(path)
+    return analysis["bpm"], analysis["key"]
@@ -0,0 +1,40 @@
+"""
+Cross-process lock for the small JSON state files several processes update
+(cron runs, the GUI, the scheduler and the status watcher can overlap).
+
+    with locked(WATCH_FILE):
+        data = load(); data.update(...); save(data)
+
+The lock is an OS lock on a sibling "<name>.lock" file, so it is released
+even when a process dies holding it.
+"""
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextmanager
+def locked(path):
+    """Hold an exclusive lock on path (the file itself is not touched) for the block."""
+    lock_path = Path(f"{path}.lock")
+    os.makedirs(lock_path.parent, exist_ok=True)
+    with open(lock_path, "a+b") as f:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
@@ -1,19 +1,35 @@
 import os, json, re
-import google.generativeai as genai
 from dotenv import load_dotenv
 import json
-import jsonschema
 import unicodedata
 from typing import List
 
+import tracing
+
 # Load .env and API key
 load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 MODEL_NAME = "gemini-flash-latest"
-if not GEMINI_API_KEY:
-    raise ValueError("Missing GEMINI_API_KEY in .env")
-genai.configure(api_key=GEMINI_API_KEY)
-model = genai.GenerativeModel(MODEL_NAME)
+# Host of the Gemini API, e.g. http://127.0.0.1:8767 for standins/gemini_api.py; unset = Google
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")
+_model = None
+
+
+def get_model():
+    """Configure Gemini on first use, so importing this module never needs the key."""
+    global _model
+    if _model is None:
+        if not GEMINI_API_KEY:
+            raise ValueError("Missing GEMINI_API_KEY in .env")
+        import google.generativeai as genai  # heavy; only needed once metadata is generated
+
+        if GEMINI_API_ENDPOINT:
+            genai.configure(api_key=GEMINI_API_KEY, transport="rest",
+                            client_options={"api_endpoint": GEMINI_API_ENDPOINT})
+        else:
+            genai.configure(api_key=GEMINI_API_KEY)
+        _model = genai.GenerativeModel(MODEL_NAME)
+    return _model
 
 response_schema = {
     "type": "OBJECT",
@@ -43,12 +59,13 @@ def limit_tags(tags: List[str], limit: int = 500) -> List[str]:
     return selected
 
 
+@tracing.traced("gemini.generate")
 def call_gemini(prompt: str) -> str:
     """
     Calls the Gemini API and returns the model text output.
     """
     
-    response = model.generate_content(
+    response = get_model().generate_content(
         prompt,
         generation_config={
             "response_mime_type": "application/json",
@@ -56,6 +73,10 @@ def call_gemini(prompt: str) -> str:
         })
     if not response.text:
         raise RuntimeError("Gemini returned empty response.")
+    usage = getattr(response, "usage_metadata", None)
+    if usage:
+        tracing.count("prompt_tokens", usage.prompt_token_count)
+        tracing.count("response_tokens", usage.candidates_token_count)
     return response.text
 
 
@@ -71,16 +92,36 @@ def parse_json(text: str):
         return {}
 
 
-def gen_metadata(artist: str, bpm: int, key: str,inst: str,email: str, tags):
+def build_description(body: str, key: str, bpm, inst: str, email: str, tags, short_hashtags, link: str = "[beatstars_link]"):
+    """
+    Full YouTube description: Gemini's intro text followed by usage terms, store link,
+    key/bpm, contacts and the tag block. `link` defaults to the placeholder the
+    orchestrator replaces once the BeatStars link is known.
+    """
+    description = body
+    description+=f"\n\nUSAGE TERMS\nYou may use this beat only for writing lyrics and creating demo. If you want to use this beat commercially you can buy a lease at my beat store.\n\nDownload/Purchase: {link}\n\nKey: {key}\nBpm: {bpm}\n\nInstagram: {inst}\nEmail: {email}\n\n"
+    description+=f"\n\nTags\n{tags}\n\n{short_hashtags}"
+    description=re.sub(r"[\[\]'\"]","",description)
+    return description
+
+
+def gen_metadata(artist: str, bpm: int, key: str,inst: str,email: str, tags, audio_tags=None):
     """
     Prompts Gemini to generate structured metadata for a given beat.
+    audio_tags ({"genres", "moods", "tags"} from audio_tagger.tags_for) describe
+    how the beat itself sounds; its tags join the trending ones.
     """
     
+    if audio_tags and audio_tags["tags"]:
+        tags = list(tags) + [t for t in audio_tags["tags"] if t not in tags]
     tags_str = ", ".join(tags)
+    sound = ""
+    if audio_tags and audio_tags["genres"]:
+        sound = f"\nThe beat itself sounds like {', '.join(audio_tags['moods'] + audio_tags['genres'])}; let the title name and hashtags fit that.\n"
    
     prompt = f"""
 These are the most trending tags for {artist} right now: {tags_str}
-
+{sound}
 Generate a JSON object using those tags with fields:
 1) title: (≤60 chars) Example title: "[FREE] {artist} TYPE BEAT – 'ASTROVIBES'." (generate random name, all caps)
 2) bs_tags: (3 relevant short tags for BeatStars)
@@ -117,9 +158,7 @@ Only output valid JSON and nothing else.
 
     print(json.dumps(data, indent=2, ensure_ascii=False))
 
-    data["description"]+=f"\n\nUSAGE TERMS\nYou may use this beat only for writing lyrics and creating demo. If you want to use this beat commercially you can buy a lease at my beat store.\n\nDownload/Purchase: [beatstars_link]\n\nKey: {key}\nBpm: {bpm}\n\nInstagram: {inst}\nEmail: {email}\n\n"
-    data["description"]+=f"\n\nTags\n{data['tags']}\n\n{data['short_hashtags']}"
-    data["description"]=re.sub(r"[\[\]'\"]","",data["description"])
+    data["description"] = build_description(data["description"], key, bpm, inst, email, data["tags"], data["short_hashtags"])
     
     with open("last_gen_metadata.json", "w", encoding="utf-8") as f:
         json.dump(data, f, indent=2, ensure_ascii=False)
@@ -1,52 +1,156 @@
-import os, subprocess
+import os, re, subprocess
 from pathlib import Path
 
+import tracing
+from prep_image import derivative
+
 BASE_DIR = Path(__file__).resolve().parent
 
 VIDEO_DIR = BASE_DIR / "data" / "vids"
 
 
-def make_video(img, audio, fps=30, codec="libx264", crf=18, ab="320k"):
+def _frame(img, name="frame"):
     """
-    Creates a 16:9 YouTube-ready video (e.g. 1920x1080) using an image as background
-    and centers the original image without resizing or stretching.
-    Black bars fill the rest of the frame if needed.
+    The cached letterboxed frame of an artwork (1920x1080, or the 1080x1920
+    "vertical" one for Shorts), so ffmpeg loops a right-sized image instead
+    of decoding and scaling the original.
     """
-    out_path = os.path.join(VIDEO_DIR, f"{os.path.splitext(os.path.basename(audio))[0]}.mp4")
-    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    try:
+        return derivative(img, name)
+    except Exception as e:
+        print(f"[WARN] Could not prepare video frame from {img} ({e}) — letting ffmpeg scale the original.")
+        return img
+
 
+def _video_cmd(img, audio, out, fps=30, codec="libx264", crf=18, ab="320k", size=(1920, 1080), audio_in=(), af=None):
     # Target YouTube resolution
-    width, height = 1920, 1080
+    width, height = size
 
-    # ffmpeg filter explanation:
+    # ffmpeg filter explanation (a no-op for frames from _frame, kept for any other image):
     # - scale: ensures image fits inside target size without changing aspect ratio
-    # - pad: adds black bars around to reach 16:9
+    # - pad: adds black bars around to reach the target aspect ratio
     vf_filter = (
         f"scale=w=min(iw*min({width}/iw\\,{height}/ih)\\,{width}):"
         f"h=min(ih*min({width}/iw\\,{height}/ih)\\,{height}),"
         f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2:black"
     )
 
-    cmd = [
+    return [
         "ffmpeg", "-y",
         "-loop", "1",
         "-framerate", str(fps),
         "-i", img,
+        *audio_in,
         "-i", audio,
         "-vf", vf_filter,
+        *(["-af", af] if af else []),
         "-c:v", codec,
         "-tune", "stillimage",
         "-crf", str(crf),
         "-c:a", "aac",
         "-b:a", ab,
         "-shortest",
-        out_path
+        *out,
     ]
 
-    subprocess.run(cmd, check=True)
+
+@tracing.traced("ffmpeg.probe")
+def audio_duration(audio):
+    """Length of an audio file in seconds, read from ffmpeg's header probe (None if unknown)."""
+    probe = subprocess.run(["ffmpeg", "-hide_banner", "-i", audio], capture_output=True, text=True)
+    match = re.search(r"Duration: (\d+):(\d+):(\d+\.\d+)", probe.stderr)
+    if not match:
+        return None
+    h, m, s = match.groups()
+    return int(h) * 3600 + int(m) * 60 + float(s)
+
+
+def _run_with_progress(cmd, duration, on_progress):
+    """
+    Run ffmpeg with machine-readable progress on stdout and report
+    on_progress(fraction, speed) as it encodes. Exceptions raised by the
+    callback (e.g. a cancel) kill ffmpeg and propagate.
+    """
+    cmd = cmd[:1] + ["-progress", "pipe:1", "-nostats"] + cmd[1:]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stdin=subprocess.DEVNULL, text=True)
+    try:
+        fields = {}
+        for line in proc.stdout:
+            key, _, value = line.strip().partition("=")
+            fields[key] = value
+            if key != "progress":
+                continue
+            if value == "end":
+                on_progress(1.0, fields.get("speed", "").strip())
+            elif fields.get("out_time_ms", "N/A").isdigit():
+                # out_time_ms is in microseconds despite its name
+                done = int(fields["out_time_ms"]) / 1e6
+                on_progress(min(done / duration, 1.0) if duration else None, fields.get("speed", "").strip())
+        if proc.wait() != 0:
+            raise subprocess.CalledProcessError(proc.returncode, cmd)
+    except BaseException:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        raise
+
+
+def video_path_for(audio):
+    """Where make_video writes the video of `audio`."""
+    return os.path.join(VIDEO_DIR, f"{os.path.splitext(os.path.basename(audio))[0]}.mp4")
+
+
+def make_video(img, audio, fps=30, codec="libx264", crf=18, ab="320k", on_progress=None):
+    """
+    Creates a 16:9 YouTube-ready video (e.g. 1920x1080) using an image as background
+    and centers the original image without resizing or stretching.
+    Black bars fill the rest of the frame if needed.
+    on_progress(fraction, speed), if given, is called while ffmpeg encodes.
+    """
+    out_path = video_path_for(audio)
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+
+    cmd = _video_cmd(_frame(img), audio, [out_path], fps=fps, codec=codec, crf=crf, ab=ab)
+    with tracing.span("ffmpeg.render", codec=codec) as render:
+        if on_progress:
+            _run_with_progress(cmd, audio_duration(audio), on_progress)
+        else:
+            subprocess.run(cmd, check=True)
+        render.count("bytes_written", os.path.getsize(out_path))
     return out_path
 
 
+def start_video_stream(img, audio, fps=30, codec="libx264", crf=18, ab="320k"):
+    """
+    Same video as make_video, but written as fragmented MP4 to ffmpeg's stdout
+    instead of a file, so it can be uploaded while it is still being encoded.
+    Returns the running ffmpeg process; read the video from proc.stdout.
+    """
+    out = ["-movflags", "frag_keyframe+empty_moov+default_base_moof", "-f", "mp4", "pipe:1"]
+    cmd = _video_cmd(_frame(img), audio, out, fps=fps, codec=codec, crf=crf, ab=ab)
+    return subprocess.Popen(cmd, stdout=subprocess.PIPE, stdin=subprocess.DEVNULL)
+
+
+def make_short(img, audio, start, duration, fps=10, codec="libx264", crf=20, ab="256k", fade=1.0):
+    """
+    A 1080x1920 YouTube Short: duration seconds of audio from start, over the
+    cached vertical artwork, with short fades so the cut doesn't click.
+    Same still-image encode as make_video, over a fraction of the length and
+    at 10 fps (the frame never changes; it renders in under half the time).
+    """
+    out_path = os.path.join(VIDEO_DIR, f"{os.path.splitext(os.path.basename(audio))[0]}_short.mp4")
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+
+    # -ss/-t before the audio input seek in the demuxer instead of decoding up to start
+    audio_in = ["-ss", f"{start:.3f}", "-t", f"{duration:.3f}"]
+    af = f"afade=t=in:d={fade},afade=t=out:st={max(duration - fade, 0):.3f}:d={fade}"
+    cmd = _video_cmd(_frame(img, "vertical"), audio, [out_path], fps=fps, codec=codec, crf=crf, ab=ab,
+                     size=(1080, 1920), audio_in=audio_in, af=af)
+    with tracing.span("ffmpeg.render", codec=codec, short=True) as render:
+        subprocess.run(cmd, check=True)
+        render.count("bytes_written", os.path.getsize(out_path))
+    return out_path
+
 
 if __name__ == "__main__":
     BEAT_PATH = "/Users/kvit/Documents/beat_auto_uploader/data/beats/don_toliver/ALLIANCE_135_VIRTHY_KVIT.mp3"
@@ -1,4 +1,6 @@
-from googleapiclient.discovery import build
+import tracing
+import yt_quota
+from upload_to_youtube import build_youtube
 from dotenv import load_dotenv
 from collections import Counter
 from datetime import datetime
@@ -8,6 +10,8 @@ import re
 
 load_dotenv()
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
+# retries (with backoff) for 5xx/rate-limit answers; one tag lookup makes ~30 calls
+API_RETRIES = 3
 
 
 def normalize_tag(tag: str) -> str:
@@ -18,6 +22,7 @@ def normalize_tag(tag: str) -> str:
     return tag.strip()
 
 
+@tracing.traced("youtube.search")
 def fetch_videos(youtube, query, order="relevance", max_results=15):
     """Return (video_id, publishedAt) tuples for a query."""
     search = youtube.search().list(
@@ -27,7 +32,9 @@ def fetch_videos(youtube, query, order="relevance", max_results=15):
         type="video",
         order=order
     )
-    res = search.execute()
+    res = search.execute(num_retries=API_RETRIES)
+    # billed to the API key's project, not a channel's ledger
+    tracing.count("quota_units", yt_quota.COSTS["search.list"])
     videos = []
     for item in res["items"]:
         vid = item["id"]["videoId"]
@@ -36,13 +43,15 @@ def fetch_videos(youtube, query, order="relevance", max_results=15):
     return videos
 
 
+@tracing.traced("youtube.videos_list")
 def fetch_tags(youtube, videos, artist):
     """Return Counter of tags weighted by recency."""
     tag_counter = Counter()
     now = datetime.now()
 
     for vid, pub in videos:
-        video = youtube.videos().list(part="snippet", id=vid).execute()
+        video = youtube.videos().list(part="snippet", id=vid).execute(num_retries=API_RETRIES)
+        tracing.count("quota_units", yt_quota.COSTS["videos.list"])
         if not video["items"]:
             continue
         snippet = video["items"][0]["snippet"]
@@ -65,7 +74,7 @@ def fetch_tags(youtube, videos, artist):
 
 
 def get_trending_tags(artist: str, top_n: int = 40):
-    youtube = build("youtube", "v3", developerKey=YOUTUBE_API_KEY)
+    youtube = build_youtube(developerKey=YOUTUBE_API_KEY)
     query = f"{artist} type beat"
 
     # Fetch both relevance- and date-sorted videos
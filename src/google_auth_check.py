@@ -4,22 +4,56 @@ from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from pathlib import Path
 
+import tracing
+
 BASE_DIR = Path(__file__).resolve().parent
 
 ENV_PATH = BASE_DIR / ".env"
-SCOPES = ["https://www.googleapis.com/auth/youtube.upload"]
+UPLOAD_SCOPE = "https://www.googleapis.com/auth/youtube.upload"
+# videos.list with processingDetails for the status watcher
+READONLY_SCOPE = "https://www.googleapis.com/auth/youtube.readonly"
+# videos.update for yt_bulk_update
+FORCE_SSL_SCOPE = "https://www.googleapis.com/auth/youtube.force-ssl"
+SCOPES = [UPLOAD_SCOPE, READONLY_SCOPE, FORCE_SSL_SCOPE]
 load_dotenv(ENV_PATH)
+# OAuth token endpoint, overridable to point at a local stand-in (see standins/youtube_api.py)
+TOKEN_URI = os.getenv("GOOGLE_TOKEN_URI") or "https://oauth2.googleapis.com/token"
+
+def missing_scopes(granted, needed=SCOPES):
+    """
+    The scopes of `needed` a token wasn't granted. `granted` is a token response's
+    space-separated "scope" or a list; if the server didn't say, none are missing.
+    """
+    if not granted:
+        return []
+    if isinstance(granted, str):
+        granted = granted.split()
+    return [scope for scope in needed if scope not in granted]
+
+
+def require_scopes(creds, needed, env_prefix="GOOGLE"):
+    """Raise if refreshed credentials lack one of `needed` (tokens made before it was in SCOPES)."""
+    missing = missing_scopes(creds.granted_scopes, needed)
+    if missing:
+        raise RuntimeError(f"The {env_prefix} token lacks {', '.join(missing)} — "
+                           f"re-run google_auth_setup.py {env_prefix} to grant it.")
+
 
-def check_and_refresh_google_token():
-    client_id = os.getenv("GOOGLE_CLIENT_ID")
-    client_secret = os.getenv("GOOGLE_CLIENT_SECRET")
-    refresh_token = os.getenv("GOOGLE_REFRESH_TOKEN")
+@tracing.traced("google.token_refresh")
+def check_and_refresh_google_token(env_prefix="GOOGLE"):
+    """
+    Refresh the access token of one channel. Each channel keeps its credentials
+    in .env as <env_prefix>_CLIENT_ID / _CLIENT_SECRET / _REFRESH_TOKEN.
+    """
+    client_id = os.getenv(f"{env_prefix}_CLIENT_ID")
+    client_secret = os.getenv(f"{env_prefix}_CLIENT_SECRET")
+    refresh_token = os.getenv(f"{env_prefix}_REFRESH_TOKEN")
 
     if not all([client_id, client_secret, refresh_token]):
-        raise RuntimeError("Missing credentials in .env — run google_auth_setup.py first.")
+        raise RuntimeError(f"Missing {env_prefix}_* credentials in .env — run google_auth_setup.py first.")
 
     response = requests.post(
-        "https://oauth2.googleapis.com/token",
+        TOKEN_URI,
         data={
             "client_id": client_id,
             "client_secret": client_secret,
@@ -35,12 +69,12 @@ def check_and_refresh_google_token():
 
     data = response.json()
     new_token = data["access_token"]
-    set_key(ENV_PATH, "GOOGLE_ACCESS_TOKEN", new_token)
+    set_key(ENV_PATH, f"{env_prefix}_ACCESS_TOKEN", new_token)
 
     creds = Credentials(
         token=new_token,
         refresh_token=refresh_token,
-        token_uri="https://oauth2.googleapis.com/token",
+        token_uri=TOKEN_URI,
         client_id=client_id,
         client_secret=client_secret,
         scopes=SCOPES,
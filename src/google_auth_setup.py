@@ -1,4 +1,5 @@
 import os
+import argparse
 import json
 import requests
 from dotenv import load_dotenv, set_key
@@ -7,25 +8,23 @@ from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from pathlib import Path
 
+from google_auth_check import SCOPES, missing_scopes
+
 BASE_DIR = Path(__file__).resolve().parent
 
 ENV_PATH = BASE_DIR / ".env"
-SCOPES = ["https://www.googleapis.com/auth/youtube.upload"]
 
 load_dotenv(ENV_PATH)
 
-# Ensure client_secret.json exists
 CLIENT_SECRET_FILE = "client_secret.json"
-if not os.path.exists(CLIENT_SECRET_FILE):
-    raise FileNotFoundError("Missing client_secret.json file.")
 
 def save_env_var(key, value):
     """Save or update a key=value pair inside .env"""
     set_key(ENV_PATH, key, value)
     os.environ[key] = value
 
-def validate_refresh_token(refresh_token, client_id, client_secret):
-    """Check if the stored refresh token is still valid."""
+def validate_refresh_token(refresh_token, client_id, client_secret, env_prefix="GOOGLE"):
+    """Check if the stored refresh token is still valid and was granted every scope in SCOPES."""
     try:
         response = requests.post(
             "https://oauth2.googleapis.com/token",
@@ -38,10 +37,16 @@ def validate_refresh_token(refresh_token, client_id, client_secret):
             timeout=10,
         )
         if response.status_code == 200:
-            access_token = response.json().get("access_token")
+            data = response.json()
+            # tokens from before the status watcher and bulk updates only carry youtube.upload
+            missing = missing_scopes(data.get("scope"))
+            if missing:
+                print("Refresh token lacks scopes:", ", ".join(missing))
+                return False
+            access_token = data.get("access_token")
             if access_token:
                 print("Refresh token is valid.")
-                save_env_var("GOOGLE_ACCESS_TOKEN", access_token)
+                save_env_var(f"{env_prefix}_ACCESS_TOKEN", access_token)
                 return True
         else:
             print("Token validation failed:", response.json())
@@ -50,7 +55,7 @@ def validate_refresh_token(refresh_token, client_id, client_secret):
     return False
 
 
-def authenticate_and_store():
+def authenticate_and_store(env_prefix="GOOGLE"):
     """Run OAuth flow, get refresh token, and store credentials in .env"""
     flow = InstalledAppFlow.from_client_secrets_file(CLIENT_SECRET_FILE, SCOPES)
     creds = flow.run_local_server(port=0)
@@ -63,31 +68,43 @@ def authenticate_and_store():
     print("\nAuthentication successful.")
     print("Saving credentials to .env ...")
 
-    save_env_var("GOOGLE_CLIENT_ID", client_id)
-    save_env_var("GOOGLE_CLIENT_SECRET", client_secret)
-    save_env_var("GOOGLE_REFRESH_TOKEN", refresh_token)
-    save_env_var("GOOGLE_ACCESS_TOKEN", access_token)
+    save_env_var(f"{env_prefix}_CLIENT_ID", client_id)
+    save_env_var(f"{env_prefix}_CLIENT_SECRET", client_secret)
+    save_env_var(f"{env_prefix}_REFRESH_TOKEN", refresh_token)
+    save_env_var(f"{env_prefix}_ACCESS_TOKEN", access_token)
 
     print("Saved to .env successfully.")
 
 
-def main():
-    client_id = os.getenv("GOOGLE_CLIENT_ID")
-    client_secret = os.getenv("GOOGLE_CLIENT_SECRET")
-    refresh_token = os.getenv("GOOGLE_REFRESH_TOKEN")
+def main(env_prefix="GOOGLE", force=False):
+    # Ensure client_secret.json exists
+    if not os.path.exists(CLIENT_SECRET_FILE):
+        raise FileNotFoundError("Missing client_secret.json file.")
+
+    client_id = os.getenv(f"{env_prefix}_CLIENT_ID")
+    client_secret = os.getenv(f"{env_prefix}_CLIENT_SECRET")
+    refresh_token = os.getenv(f"{env_prefix}_REFRESH_TOKEN")
 
-    if client_id and client_secret and refresh_token:
+    if force:
+        print("--force given — re-authenticating.")
+        authenticate_and_store(env_prefix)
+    elif client_id and client_secret and refresh_token:
         print("🔎 Found existing credentials in .env, validating...")
-        if validate_refresh_token(refresh_token, client_id, client_secret):
+        if validate_refresh_token(refresh_token, client_id, client_secret, env_prefix):
             print("Existing credentials are valid — nothing to do.")
             return
         else:
-            print("Stored refresh token invalid — re-authenticating.")
-            authenticate_and_store()
+            print("Stored refresh token invalid or missing scopes — re-authenticating.")
+            authenticate_and_store(env_prefix)
     else:
         print("No valid credentials found — starting authentication.")
-        authenticate_and_store()
+        authenticate_and_store(env_prefix)
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Authorize a YouTube channel and store its tokens in .env.")
+    # `python google_auth_setup.py GOOGLE_SECOND` for another channel
+    parser.add_argument("env_prefix", nargs="?", default="GOOGLE", help=".env prefix of the channel being set up")
+    parser.add_argument("--force", action="store_true", help="run the consent flow even if the stored token works")
+    args = parser.parse_args()
+    main(args.env_prefix, force=args.force)
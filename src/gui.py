@@ -1,12 +1,17 @@
 import sys
 import os
-from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QPushButton, QFileDialog, QLabel, QLineEdit, QStackedWidget, QMessageBox
+import io
+import time
+import threading
+from PyQt5.QtCore import QDateTime, QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+from PyQt5.QtWidgets import (
+    QApplication, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QFileDialog, QLabel, QLineEdit, QStackedWidget,
+    QMessageBox, QPlainTextEdit, QTableWidget, QTableWidgetItem, QAbstractItemView, QCheckBox, QDateTimeEdit, QSpinBox,
+)
 from dotenv import load_dotenv, set_key
 import subprocess
-from playwright.sync_api import sync_playwright
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from orchestrator import main as orchestrator_main  # Import the main function from orchestrator.py
+from orchestrator import main as orchestrator_main, PipelineCancelled  # Import the main function from orchestrator.py
+from rndm_select import del_file
 
 # Load environment variables
 load_dotenv()
@@ -30,9 +35,11 @@ def save_api_keys(beatstars_link, instagram_link, email, youtube_api_key):
 
 # Authenticate to Google via OAuth2 (for YouTube)
 def authenticate_youtube():
-    flow = InstalledAppFlow.from_client_secrets_file(
-        'client_secret.json', ['https://www.googleapis.com/auth/youtube.upload']
-    )
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    from googleapiclient.discovery import build
+    from google_auth_setup import SCOPES
+
+    flow = InstalledAppFlow.from_client_secrets_file('client_secret.json', SCOPES)
     credentials = flow.run_local_server(port=0)
     youtube = build('youtube', 'v3', credentials=credentials)
     return youtube
@@ -40,6 +47,8 @@ def authenticate_youtube():
 # Authenticate to BeatStars (check if session exists)
 def authenticate_beatstars():
     if not os.path.exists("beatstars_session.json"):
+        from playwright.sync_api import sync_playwright
+
         with sync_playwright() as p:
             browser = p.chromium.launch(headless=False)
             context = browser.new_context()
@@ -61,19 +70,181 @@ def authenticate_beatstars():
             print("BeatStars session saved to beatstars_session.json")
             browser.close()
 
+AUDIO_EXTS = (".mp3", ".wav")
+IMAGE_EXTS = (".jpg", ".jpeg", ".png")
+STEMS_EXTS = (".zip",)
+QUEUE_COLUMNS = ["Beat", "Image", "Stems", "Artist", "Publish at", "Stage", "Elapsed", "BeatStars", "YouTube"]
+# Pipelines running at the same time (each one opens its own browser and upload)
+DEFAULT_PARALLEL_JOBS = int(os.getenv("GUI_PARALLEL_JOBS", "2"))
+
 # Upload function using orchestrator.py
-def upload_files(beat_file, image_file, stems_file, artist_name, upload_time):
+def upload_files(beat_file, image_file, stems_file, artist_name, upload_time, **hooks):
     print(f"Uploading: Beat: {beat_file}, Image: {image_file}, Stems: {stems_file}")
     
+    from detect_audio_meta import DuplicateBeat
+
     # Call the orchestrator.py main function to process the upload
-    bs_link,yt_link = orchestrator_main(beat_file, image_file, artist_name)  # Pass the chosen beat, image, and artist name
+    try:
+        result = orchestrator_main(beat_file, image_file, artist_name, stems_path=stems_file, publish_at=upload_time, **hooks)  # Pass the chosen beat, image, and artist name
+    except DuplicateBeat as e:
+        match = e.match
+        raise RuntimeError(f"Already released as {os.path.basename(match['path'])} ({match['artist']}, "
+                           f"{match['released_at'][:10]}); not uploaded again.") from e
+    if result is None:
+        raise RuntimeError("Google token invalid. Run google_auth_setup.py to re-authenticate.")
+    bs_link,yt_link = result
     return bs_link,yt_link
 
+
+class _LineStream(io.TextIOBase):
+    """File-like object that hands every printed line to a callback."""
+
+    def __init__(self, emit_line):
+        self._emit_line = emit_line
+        self._partial = ""
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        lines = (self._partial + text).split("\n")
+        self._partial = lines.pop()
+        for line in lines:
+            self._emit_line(line)
+        return len(text)
+
+    def flush(self):
+        if self._partial:
+            self._emit_line(self._partial)
+            self._partial = ""
+
+
+class _ThreadRoutedStdout(io.TextIOBase):
+    """
+    sys.stdout replacement that sends each worker thread's prints to that job's
+    stream, so parallel jobs don't interleave. Other threads keep the real stdout.
+    """
+
+    def __init__(self, fallback):
+        self.fallback = fallback
+        self._routes = {}
+
+    def writable(self):
+        return True
+
+    def route(self, stream):
+        self._routes[threading.get_ident()] = stream
+
+    def unroute(self):
+        self._routes.pop(threading.get_ident(), None)
+
+    def write(self, text):
+        return self._routes.get(threading.get_ident(), self.fallback).write(text)
+
+    def flush(self):
+        self._routes.get(threading.get_ident(), self.fallback).flush()
+
+
+class JobSignals(QObject):
+    """Signals shared by all queued jobs; the first argument is the job id."""
+    log = pyqtSignal(int, str)
+    stage = pyqtSignal(int, str)
+    progress = pyqtSignal(int, str, float, str)  # kind, fraction (-1 if unknown), speed
+    done = pyqtSignal(int, str, str)             # bs_link, yt_link
+    failed = pyqtSignal(int, str)
+    cancelled = pyqtSignal(int)
+
+
+class UploadJob(QRunnable):
+    """
+    One beat's pipeline, run on the App's QThreadPool. Everything it prints is
+    streamed to `log`; stage changes and ffmpeg/upload progress come through
+    `stage` and `progress`. Setting job["cancel"] stops it at the next stage or
+    progress tick.
+    """
+
+    def __init__(self, job, signals, stdout_router):
+        super().__init__()
+        self.job = job
+        self.signals = signals
+        self.stdout_router = stdout_router
+
+    def _report_progress(self, kind, fraction, speed):
+        if isinstance(speed, float):
+            speed = f"{speed:.1f} MB/s"
+        self.signals.progress.emit(self.job["id"], kind, -1.0 if fraction is None else fraction, speed or "")
+
+    def run(self):
+        job = self.job
+        if job["cancel"]:
+            self.signals.cancelled.emit(job["id"])
+            return
+        stream = _LineStream(lambda line: self.signals.log.emit(job["id"], line))
+        self.stdout_router.route(stream)
+        try:
+            bs_link, yt_link = upload_files(
+                job["beat"], job["image"], job["stems"], job["artist"], job["publish_at"],
+                keep_image=job["keep_image"],
+                on_stage=lambda name: self.signals.stage.emit(job["id"], name),
+                on_progress=self._report_progress,
+                should_cancel=lambda: job["cancel"],
+            )
+            self.signals.done.emit(job["id"], bs_link, yt_link)
+        except PipelineCancelled:
+            self.signals.cancelled.emit(job["id"])
+        except Exception as e:
+            self.signals.failed.emit(job["id"], str(e))
+        finally:
+            stream.flush()
+            self.stdout_router.unroute()
+
+
+def _stem(path):
+    return os.path.splitext(os.path.basename(path))[0].lower()
+
+
+def expand_paths(paths):
+    """Dropped files plus every file inside dropped folders."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files += [os.path.join(root, n) for n in sorted(names) if not n.startswith(".")]
+        elif os.path.isfile(path):
+            files.append(path)
+    return files
+
+
+class DropTable(QTableWidget):
+    """Queue table that accepts files and folders dragged onto it."""
+    files_dropped = pyqtSignal(list)
+
+    def __init__(self, columns, parent=None):
+        super().__init__(0, len(columns), parent)
+        self.setHorizontalHeaderLabels(columns)
+        self.setAcceptDrops(True)
+        self.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.horizontalHeader().setStretchLastSection(True)
+
+    def dragEnterEvent(self, event):
+        if event.mimeData().hasUrls():
+            event.acceptProposedAction()
+
+    def dragMoveEvent(self, event):
+        if event.mimeData().hasUrls():
+            event.acceptProposedAction()
+
+    def dropEvent(self, event):
+        self.files_dropped.emit([url.toLocalFile() for url in event.mimeData().urls()])
+        event.acceptProposedAction()
+
+
 class App(QWidget):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Beat Upload Automation")
-        self.setGeometry(200, 200, 600, 400)
+        self.setGeometry(200, 200, 1100, 600)
         self.layout = QVBoxLayout()
 
         # Stacked widget for page navigation
@@ -105,30 +276,74 @@ class App(QWidget):
 
         self.page_credentials.setLayout(self.layout_credentials)
 
-        # Page 2: Upload Page
+        # Page 2: Upload Queue Page
         self.page_upload = QWidget()
         self.layout_upload = QVBoxLayout()
 
         self.artist_name_input = QLineEdit(self)
-        self.artist_name_input.setPlaceholderText("Enter Artist Name")
+        self.artist_name_input.setPlaceholderText("Enter Artist Name (empty: the beat's folder name)")
         self.layout_upload.addWidget(self.artist_name_input)
 
-        self.upload_button_beat = QPushButton("Upload Beat", self)
+        self.queue_table = DropTable(QUEUE_COLUMNS, self)
+        self.queue_table.files_dropped.connect(self.add_files)
+        self.layout_upload.addWidget(QLabel("Drop beats, images, stems (.zip) or whole folders here:"))
+        self.layout_upload.addWidget(self.queue_table)
+
+        self.layout_add = QHBoxLayout()
+        self.upload_button_beat = QPushButton("Add Beats", self)
         self.upload_button_beat.clicked.connect(self.upload_beat)
-        self.layout_upload.addWidget(self.upload_button_beat)
+        self.layout_add.addWidget(self.upload_button_beat)
 
-        self.upload_button_image = QPushButton("Upload Image", self)
+        self.upload_button_image = QPushButton("Add Images", self)
         self.upload_button_image.clicked.connect(self.upload_image)
-        self.layout_upload.addWidget(self.upload_button_image)
+        self.layout_add.addWidget(self.upload_button_image)
 
-        self.selected_stems = None
-        self.upload_button_stems = QPushButton("Upload Stems", self)
+        self.upload_button_stems = QPushButton("Add Stems", self)
         self.upload_button_stems.clicked.connect(self.upload_stems)
-        self.layout_upload.addWidget(self.upload_button_stems)
+        self.layout_add.addWidget(self.upload_button_stems)
+
+        self.remove_button = QPushButton("Remove Selected", self)
+        self.remove_button.clicked.connect(self.remove_selected)
+        self.layout_add.addWidget(self.remove_button)
+        self.layout_upload.addLayout(self.layout_add)
+
+        # Scheduling: first release time and spacing between releases
+        self.layout_schedule = QHBoxLayout()
+        self.schedule_checkbox = QCheckBox("Schedule YouTube releases from", self)
+        self.layout_schedule.addWidget(self.schedule_checkbox)
+        self.schedule_start = QDateTimeEdit(QDateTime.currentDateTime().addDays(1), self)
+        self.schedule_start.setCalendarPopup(True)
+        self.layout_schedule.addWidget(self.schedule_start)
+        self.layout_schedule.addWidget(QLabel("every", self))
+        self.schedule_interval = QSpinBox(self)
+        self.schedule_interval.setRange(1, 24 * 14)
+        self.schedule_interval.setValue(24)
+        self.schedule_interval.setSuffix(" h")
+        self.layout_schedule.addWidget(self.schedule_interval)
+        self.layout_upload.addLayout(self.layout_schedule)
+
+        self.layout_run = QHBoxLayout()
+        self.layout_run.addWidget(QLabel("Parallel jobs:", self))
+        self.parallel_input = QSpinBox(self)
+        self.parallel_input.setRange(1, 8)
+        self.parallel_input.setValue(DEFAULT_PARALLEL_JOBS)
+        self.layout_run.addWidget(self.parallel_input)
 
         self.upload_button_start = QPushButton("Start Upload", self)
         self.upload_button_start.clicked.connect(self.start_upload)
-        self.layout_upload.addWidget(self.upload_button_start)
+        self.layout_run.addWidget(self.upload_button_start)
+
+        self.cancel_button = QPushButton("Cancel All", self)
+        self.cancel_button.clicked.connect(self.cancel_all)
+        self.layout_run.addWidget(self.cancel_button)
+
+        self.show_log_button = QPushButton("Show Log", self)
+        self.show_log_button.clicked.connect(lambda: self.pages.setCurrentIndex(2))
+        self.layout_run.addWidget(self.show_log_button)
+        self.layout_upload.addLayout(self.layout_run)
+
+        self.status_label = QLabel("Queue is empty.")
+        self.layout_upload.addWidget(self.status_label)
 
         self.page_upload.setLayout(self.layout_upload)
 
@@ -136,9 +351,15 @@ class App(QWidget):
         self.page_log = QWidget()
         self.layout_log = QVBoxLayout()
 
-        self.log_text = QLabel("Logs will be shown here.")
+        self.log_text = QPlainTextEdit(self)
+        self.log_text.setReadOnly(True)
+        self.log_text.setMaximumBlockCount(20000)
         self.layout_log.addWidget(self.log_text)
 
+        self.back_button = QPushButton("Back to Queue", self)
+        self.back_button.clicked.connect(lambda: self.pages.setCurrentIndex(1))
+        self.layout_log.addWidget(self.back_button)
+
         self.page_log.setLayout(self.layout_log)
 
         # Add pages to the stacked widget
@@ -150,6 +371,24 @@ class App(QWidget):
         self.layout.addWidget(self.pages)
         self.setLayout(self.layout)
 
+        # Job queue: one dict per table row, run on a thread pool
+        self.jobs = []
+        self.next_job_id = 0
+        self.pool = QThreadPool(self)
+        self.signals = JobSignals()
+        self.signals.log.connect(self.on_log)
+        self.signals.stage.connect(self.on_stage)
+        self.signals.progress.connect(self.on_progress)
+        self.signals.done.connect(self.on_done)
+        self.signals.failed.connect(self.on_failed)
+        self.signals.cancelled.connect(self.on_cancelled)
+        self.stdout_router = _ThreadRoutedStdout(sys.stdout)
+        sys.stdout = self.stdout_router
+
+        self.elapsed_timer = QTimer(self)
+        self.elapsed_timer.timeout.connect(self.refresh_elapsed)
+        self.elapsed_timer.start(1000)
+
         # Start on the credentials page if credentials are not saved
         if not check_credentials():
             self.pages.setCurrentIndex(0)
@@ -170,39 +409,203 @@ class App(QWidget):
         else:
             QMessageBox.warning(self, "Input Error", "Please provide all required information.")
 
+    # ---------- queue building ----------
+
     def upload_beat(self):
-        # Open file dialog to select a beat
-        beat_file, _ = QFileDialog.getOpenFileName(self, "Select Beat File", "", "Audio Files (*.mp3 *.wav)")
-        if beat_file:
-            self.selected_beat = beat_file
-            QMessageBox.information(self, "Beat Selected", f"Selected beat: {beat_file}")
+        # Open file dialog to select beats
+        beat_files, _ = QFileDialog.getOpenFileNames(self, "Select Beat Files", "", "Audio Files (*.mp3 *.wav)")
+        self.add_files(beat_files)
 
     def upload_image(self):
-        # Open file dialog to select an image
-        image_file, _ = QFileDialog.getOpenFileName(self, "Select Image File", "", "Image Files (*.jpg *.png)")
-        if image_file:
-            self.selected_image = image_file
-            QMessageBox.information(self, "Image Selected", f"Selected image: {image_file}")
+        # Open file dialog to select images
+        image_files, _ = QFileDialog.getOpenFileNames(self, "Select Image Files", "", "Image Files (*.jpg *.jpeg *.png)")
+        self.add_files(image_files)
 
     def upload_stems(self):
         # Open file dialog to select stems
-        stems_file, _ = QFileDialog.getOpenFileName(self, "Select Stems File", "", "Zip Files (*.zip)")
-        if stems_file:
-            self.selected_stems = stems_file
-            QMessageBox.information(self, "Stems Selected", f"Selected stems: {stems_file}")
+        stems_files, _ = QFileDialog.getOpenFileNames(self, "Select Stems Files", "", "Zip Files (*.zip)")
+        self.add_files(stems_files)
+
+    def add_files(self, paths):
+        """
+        Turn dropped/selected files into queue entries: every beat becomes a job,
+        stems and images go to the job whose beat has the same file name, or else
+        to the queued jobs still missing one, in order. Jobs still without artwork
+        get the last image of the batch, so one cover can serve many beats.
+        """
+        files = expand_paths(paths)
+        beats = [f for f in files if f.lower().endswith(AUDIO_EXTS)]
+        images = [f for f in files if f.lower().endswith(IMAGE_EXTS)]
+        stems = [f for f in files if f.lower().endswith(STEMS_EXTS)]
+
+        for beat in beats:
+            artist = self.artist_name_input.text().strip() or os.path.basename(os.path.dirname(beat))
+            self.jobs.append({
+                "id": self.next_job_id, "beat": beat, "image": None, "stems": None, "artist": artist,
+                "publish_at": None, "keep_image": False, "status": "queued", "started": None, "finished": None,
+                "bs_link": "", "yt_link": "", "cancel": False,
+            })
+            self.next_job_id += 1
+
+        self._assign(stems, "stems")
+        self._assign(images, "image")
+        if images:
+            for job in self._pending_jobs():
+                if not job["image"]:
+                    job["image"] = images[-1]
+        self.refresh_table()
+
+    def _pending_jobs(self):
+        return [job for job in self.jobs if job["status"] == "queued"]
+
+    def _assign(self, files, field):
+        """Pair files with queued jobs by name, then in order."""
+        left = []
+        for path in files:
+            match = next((j for j in self._pending_jobs() if not j[field] and _stem(j["beat"]) == _stem(path)), None)
+            if match:
+                match[field] = path
+            else:
+                left.append(path)
+        for path in left:
+            job = next((j for j in self._pending_jobs() if not j[field]), None)
+            if job:
+                job[field] = path
+
+    def remove_selected(self):
+        rows = {index.row() for index in self.queue_table.selectionModel().selectedRows()}
+        self.jobs = [job for i, job in enumerate(self.jobs) if i not in rows or job["status"] != "queued"]
+        self.refresh_table()
+
+    # ---------- running ----------
 
     def start_upload(self):
-        # Get the artist name
-        artist_name = self.artist_name_input.text()
-
-        # Check if all files are selected
-        if not hasattr(self, 'selected_beat') or not hasattr(self, 'selected_image'):
-            QMessageBox.warning(self, "Missing Files", "Please select both a beat and an image.")
+        pending = self._pending_jobs()
+        if not pending:
+            QMessageBox.warning(self, "Empty Queue", "Drop some beats into the queue first.")
+            return
+        missing = [os.path.basename(job["beat"]) for job in pending if not job["image"]]
+        if missing:
+            QMessageBox.warning(self, "Missing Files", "Please add an image for: " + ", ".join(missing))
             return
 
-        # Start upload process
-        beat_link, yt_link = upload_files(self.selected_beat, self.selected_image, self.selected_stems, artist_name, "2025-11-05T10:00:00Z")
-        self.log_text.setText(f"Upload Complete!\n\nBeatStars: {beat_link}\nYouTube: {yt_link}")
+        if self.schedule_checkbox.isChecked():
+            start = self.schedule_start.dateTime().toUTC()
+            step = self.schedule_interval.value() * 3600
+            for i, job in enumerate(pending):
+                job["publish_at"] = start.addSecs(i * step).toString("yyyy-MM-ddTHH:mm:ssZ")
+
+        # images shared by several jobs are deleted once the last of them succeeded
+        for job in pending:
+            job["keep_image"] = sum(j["image"] == job["image"] for j in self.jobs if j["status"] in ("queued", "waiting", "running")) > 1
+
+        self.pool.setMaxThreadCount(self.parallel_input.value())
+        for job in pending:
+            job["status"] = "waiting"
+            self.pool.start(UploadJob(job, self.signals, self.stdout_router))
+        self.refresh_table()
+
+    def cancel_all(self):
+        self.pool.clear()  # drop jobs that haven't started yet
+        for job in self.jobs:
+            if job["status"] == "waiting":
+                job["cancel"] = True
+                self._finish(job, "cancelled")
+            elif job["status"] == "running":
+                job["cancel"] = True
+                job["stage"] = "cancelling"
+        self.refresh_table()
+
+    def _job(self, job_id):
+        return next(job for job in self.jobs if job["id"] == job_id)
+
+    def on_log(self, job_id, line):
+        self.log_text.appendPlainText(f"[{_stem(self._job(job_id)['beat'])}] {line}")
+
+    def on_stage(self, job_id, name):
+        job = self._job(job_id)
+        if job["status"] == "waiting":
+            job["status"], job["started"] = "running", time.monotonic()
+        job["stage"] = name
+        self.refresh_table()
+
+    def on_progress(self, job_id, kind, fraction, speed):
+        job = self._job(job_id)
+        percent = "" if fraction < 0 else f" {int(fraction * 100)}%"
+        job["stage"] = f"{kind}{percent} ({speed})" if speed else f"{kind}{percent}"
+        self.refresh_row(self.jobs.index(job))
+
+    def _finish(self, job, status):
+        job["status"], job["stage"], job["finished"] = status, status, time.monotonic()
+
+    def on_done(self, job_id, beat_link, yt_link):
+        job = self._job(job_id)
+        job["bs_link"], job["yt_link"] = beat_link, yt_link
+        self._finish(job, "done")
+        if job["keep_image"] and not any(
+            j["image"] == job["image"] and j["status"] in ("queued", "waiting", "running", "failed") for j in self.jobs
+        ):
+            del_file(job["image"])
+        self.refresh_table()
+
+    def on_failed(self, job_id, error):
+        job = self._job(job_id)
+        self._finish(job, "failed")
+        job["stage"] = f"failed: {error}"
+        self.refresh_table()
+
+    def on_cancelled(self, job_id):
+        self._finish(self._job(job_id), "cancelled")
+        self.refresh_table()
+
+    # ---------- display ----------
+
+    def _elapsed(self, job):
+        if not job["started"]:
+            return ""
+        seconds = int((job["finished"] or time.monotonic()) - job["started"])
+        return f"{seconds // 60}:{seconds % 60:02d}"
+
+    def refresh_row(self, row):
+        job = self.jobs[row]
+        values = [
+            os.path.basename(job["beat"]),
+            os.path.basename(job["image"] or "—"),
+            os.path.basename(job["stems"] or "(default)"),
+            job["artist"],
+            job["publish_at"] or "now",
+            job.get("stage") or job["status"],
+            self._elapsed(job),
+            job["bs_link"],
+            job["yt_link"],
+        ]
+        for column, value in enumerate(values):
+            item = self.queue_table.item(row, column)
+            if item is None:
+                self.queue_table.setItem(row, column, QTableWidgetItem(value))
+            elif item.text() != value:
+                item.setText(value)
+
+    def refresh_table(self):
+        self.queue_table.setRowCount(len(self.jobs))
+        for row in range(len(self.jobs)):
+            self.refresh_row(row)
+        counts = {}
+        for job in self.jobs:
+            counts[job["status"]] = counts.get(job["status"], 0) + 1
+        self.status_label.setText(", ".join(f"{n} {status}" for status, n in counts.items()) or "Queue is empty.")
+
+    def refresh_elapsed(self):
+        for row, job in enumerate(self.jobs):
+            if job["status"] == "running":
+                self.refresh_row(row)
+
+    def closeEvent(self, event):
+        if any(job["status"] in ("waiting", "running") for job in self.jobs):
+            self.cancel_all()
+            self.pool.waitForDone(5000)
+        sys.stdout = self.stdout_router.fallback
+        super().closeEvent(event)
 
 # Main entry point
 if __name__ == "__main__":
@@ -0,0 +1,511 @@
+"""
+Persistent index of the beat library (beats, artworks, stems zips, collaborators).
+
+    python library_index.py            # refresh and print a summary
+    python library_index.py --full     # re-stat every file, not only changed folders
+    python library_index.py --watch    # keep the index fresh with watchdog
+
+Files live in db/library.sqlite3 with size, mtime, content hash and analysis
+status. A refresh only lists folders whose mtime changed (adding, removing or
+renaming a file touches its folder), so with thousands of beats on slow storage
+it costs one stat per artist folder. Random picks come from in-memory tables
+built from the index: artists are drawn with an alias table (O(1) per pick),
+weighted towards artists with fewer recent releases.
+
+Released beats keep their audio fingerprint (see detect_audio_meta.analyze)
+after the file is gone, so a re-export of an old beat is recognised before
+it goes through the pipeline again (see FingerprintIndex).
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+
+# ===== CONFIG =====
+
+DB_PATH = BASE_DIR.parent / "db" / "library.sqlite3"
+DATA_DIR = BASE_DIR / "data"
+ROOTS = {"beat": DATA_DIR / "beats", "image": DATA_DIR / "images", "stems": DATA_DIR / "stems"}
+COLLABS_JSON = DATA_DIR / "collaborators" / "collaborators.json"
+EXTENSIONS = {
+    "beat": ('.mp3', '.wav', '.flac', '.m4a', '.aac', '.ogg', '.aiff', '.wma'),
+    "image": ('.jpg', '.jpeg', '.png', '.webp', '.bmp', '.gif', '.tiff'),
+    "stems": ('.zip',),
+}
+REFRESH_INTERVAL = 30      # seconds an index is trusted before picks re-check folder mtimes
+RECENT_DAYS = 14           # releases inside this window lower an artist's weight
+HASH_CHUNK = 1024 * 1024
+FINGERPRINT_BITS = 256
+FINGERPRINT_BANDS = 21     # LSH bands of 12 bits; sharing one band makes a fingerprint a candidate
+DUPLICATE_MAX_BITS = 32    # fingerprints at most this many bits apart are the same beat
+# ===================
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    artist TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    hash TEXT,
+    analysis_status TEXT NOT NULL DEFAULT 'pending',
+    analysis TEXT
+);
+CREATE INDEX IF NOT EXISTS files_kind_artist ON files (kind, artist);
+CREATE INDEX IF NOT EXISTS files_hash ON files (hash);
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS releases (
+    artist TEXT NOT NULL,
+    path TEXT,
+    released_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS collaborators (
+    alias TEXT PRIMARY KEY,
+    name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS fingerprints (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    hash TEXT,
+    artist TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    released_at TEXT NOT NULL
+);
+"""
+
+
+def file_hash(path):
+    """blake2b of the file contents (hex)."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class AliasTable:
+    """Walker/Vose alias table: O(n) to build, O(1) per weighted draw."""
+
+    def __init__(self, items, weights):
+        n = len(items)
+        total = float(sum(weights))
+        self.items = list(items)
+        self.prob = [0.0] * n
+        self.alias = list(range(n))
+        scaled = [w * n / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s], self.alias[s] = scaled[s], l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        for i in small + large:
+            self.prob[i] = 1.0
+
+    def sample(self, rng=random):
+        i = rng.randrange(len(self.items))
+        return self.items[i] if rng.random() < self.prob[i] else self.items[self.alias[i]]
+
+
+class FingerprintIndex:
+    """
+    LSH over released fingerprints: each is cut into FINGERPRINT_BANDS keys of
+    12 bits and only fingerprints sharing a key are compared bit by bit. The
+    buckets live in memory and catch up with the fingerprints table by id
+    (it is append-only), so a lookup stays well under a millisecond with tens
+    of thousands of releases while other processes keep adding to it.
+    """
+
+    def __init__(self):
+        import numpy as np
+
+        self._np = np
+        width = FINGERPRINT_BITS // FINGERPRINT_BANDS
+        # bands draw their bits from all over the fingerprint: neighbouring bits (one
+        # slice's pitch classes) are correlated and would crowd into the same buckets
+        order = np.random.default_rng(0).permutation(FINGERPRINT_BITS)[:width * FINGERPRINT_BANDS]
+        self._order = order.reshape(FINGERPRINT_BANDS, width)
+        self._weights = 1 << np.arange(width)
+        self.last_id = 0
+        self.rows = []
+        self.bits = np.zeros((0, FINGERPRINT_BITS // 64), np.uint64)
+        self.buckets = [{} for _ in range(FINGERPRINT_BANDS)]
+
+    def _as_array(self, fingerprints):
+        """(n, FINGERPRINT_BITS / 8) uint8 array of hex fingerprints."""
+        data = b"".join(bytes.fromhex(f) for f in fingerprints)
+        return self._np.frombuffer(data, self._np.uint8).reshape(len(fingerprints), FINGERPRINT_BITS // 8)
+
+    def _keys(self, packed):
+        """(n, FINGERPRINT_BANDS) bucket keys of n packed fingerprints."""
+        bits = self._np.unpackbits(packed, axis=1)
+        return bits[:, self._order] @ self._weights
+
+    def add(self, rows):
+        if not rows:
+            return
+        packed = self._as_array([r["fingerprint"] for r in rows])
+        start = len(self.rows)
+        for offset, keys in enumerate(self._keys(packed).tolist()):
+            for bucket, key in zip(self.buckets, keys):
+                bucket.setdefault(key, []).append(start + offset)
+        self.rows.extend(dict(r) for r in rows)
+        self.bits = self._np.concatenate([self.bits, packed.view(self._np.uint64)])
+        self.last_id = rows[-1]["id"]
+
+    def nearest(self, fingerprint, max_bits):
+        """(row, distance) pairs within max_bits of fingerprint, closest first."""
+        np = self._np
+        packed = self._as_array([fingerprint])
+        candidates = set()
+        for bucket, key in zip(self.buckets, self._keys(packed)[0].tolist()):
+            candidates.update(bucket.get(key, ()))
+        if not candidates:
+            return []
+        candidates = np.fromiter(candidates, np.int64, len(candidates))
+        diff = self.bits[candidates] ^ packed.view(np.uint64)
+        if hasattr(np, "bitwise_count"):
+            distances = np.bitwise_count(diff).sum(axis=1)
+        else:  # numpy < 2
+            distances = np.unpackbits(diff.view(np.uint8), axis=1).sum(axis=1)
+        close = np.argsort(distances)
+        return [(self.rows[candidates[i]], int(distances[i])) for i in close if distances[i] <= max_bits]
+
+
+class LibraryIndex:
+
+    def __init__(self, db_path=DB_PATH, roots=None, collabs_json=COLLABS_JSON):
+        self.db_path = Path(db_path)
+        self.roots = {kind: Path(p) for kind, p in (roots or ROOTS).items()}
+        self.collabs_json = Path(collabs_json)
+        os.makedirs(self.db_path.parent, exist_ok=True)
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.executescript(SCHEMA)
+        self._refreshed_at = 0.0
+        self._tables = None  # cached pick tables, rebuilt after changes
+        self._fingerprints = None  # FingerprintIndex, loaded on the first duplicate check
+
+    # ---------- refresh ----------
+
+    def _dir_mtime(self, path):
+        row = self._db.execute("SELECT mtime FROM dirs WHERE path = ?", (str(path),)).fetchone()
+        return row["mtime"] if row else None
+
+    def _set_dir_mtime(self, path, mtime):
+        self._db.execute("INSERT OR REPLACE INTO dirs (path, mtime) VALUES (?, ?)", (str(path), mtime))
+
+    def _sync_folder(self, kind, artist, folder, counts):
+        """Reconcile one artist folder's files with the index."""
+        known = {
+            row["path"]: row for row in
+            self._db.execute("SELECT path, size, mtime FROM files WHERE kind = ? AND artist = ?", (kind, artist))
+        }
+        seen = set()
+        for entry in os.scandir(folder):
+            if entry.name.startswith(".") or not entry.name.lower().endswith(EXTENSIONS[kind]) or not entry.is_file():
+                continue
+            st = entry.stat()
+            seen.add(entry.path)
+            row = known.get(entry.path)
+            if row and row["size"] == st.st_size and row["mtime"] == st.st_mtime:
+                continue
+            digest = file_hash(entry.path)
+            if row:
+                # contents changed: earlier analysis no longer applies
+                self._db.execute(
+                    "UPDATE files SET size = ?, mtime = ?, hash = ?, analysis_status = 'pending', analysis = NULL "
+                    "WHERE path = ?", (st.st_size, st.st_mtime, digest, entry.path))
+                counts["updated"] += 1
+            else:
+                self._db.execute(
+                    "INSERT INTO files (path, kind, artist, name, size, mtime, hash) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (entry.path, kind, artist, entry.name, st.st_size, st.st_mtime, digest))
+                counts["added"] += 1
+        for path in set(known) - seen:
+            self._db.execute("DELETE FROM files WHERE path = ?", (path,))
+            counts["removed"] += 1
+
+    def refresh(self, full=False):
+        """
+        Bring the index up to date. Only folders whose mtime changed are listed;
+        full=True re-stats every file (catches in-place edits that keep the folder mtime).
+        """
+        counts = {"added": 0, "updated": 0, "removed": 0}
+        with self._lock, self._db:
+            for kind, root in self.roots.items():
+                if not root.is_dir():
+                    continue
+                root_mtime = root.stat().st_mtime
+                if full or self._dir_mtime(root) != root_mtime:
+                    artists = [e.name for e in os.scandir(root) if e.is_dir() and not e.name.startswith(".")]
+                    gone = {r["artist"] for r in self._db.execute("SELECT DISTINCT artist FROM files WHERE kind = ?", (kind,))} - set(artists)
+                    for artist in gone:
+                        counts["removed"] += self._db.execute(
+                            "DELETE FROM files WHERE kind = ? AND artist = ?", (kind, artist)).rowcount
+                        self._db.execute("DELETE FROM dirs WHERE path = ?", (str(root / artist),))
+                    self._set_dir_mtime(root, root_mtime)
+                else:
+                    artists = [Path(r["path"]).name for r in
+                               self._db.execute("SELECT path FROM dirs WHERE path LIKE ?", (f"{root}{os.sep}%",))]
+
+                for artist in artists:
+                    folder = root / artist
+                    try:
+                        mtime = folder.stat().st_mtime
+                    except FileNotFoundError:
+                        continue
+                    if full or self._dir_mtime(folder) != mtime:
+                        self._sync_folder(kind, artist, folder, counts)
+                        self._set_dir_mtime(folder, mtime)
+
+            self._refresh_collaborators()
+        self._refreshed_at = time.monotonic()
+        if any(counts.values()):
+            self._tables = None
+        return counts
+
+    def refresh_if_stale(self):
+        if time.monotonic() - self._refreshed_at > REFRESH_INTERVAL:
+            self.refresh()
+
+    def _refresh_collaborators(self):
+        if not self.collabs_json.exists():
+            return
+        mtime = self.collabs_json.stat().st_mtime
+        if self._dir_mtime(self.collabs_json) == mtime:
+            return
+        with open(self.collabs_json, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self._db.execute("DELETE FROM collaborators")
+        self._db.executemany("INSERT OR REPLACE INTO collaborators (alias, name) VALUES (?, ?)",
+                             [(k.lower(), v) for k, v in data.items()])
+        self._set_dir_mtime(self.collabs_json, mtime)
+
+    def collaborators(self):
+        """{alias: BeatStars name} from collaborators.json."""
+        with self._lock:
+            return {r["alias"]: r["name"] for r in self._db.execute("SELECT alias, name FROM collaborators")}
+
+    # ---------- queries ----------
+
+    def files(self, kind, artist=None):
+        with self._lock:
+            if artist:
+                rows = self._db.execute("SELECT * FROM files WHERE kind = ? AND artist = ? ORDER BY name", (kind, artist))
+            else:
+                rows = self._db.execute("SELECT * FROM files WHERE kind = ? ORDER BY artist, name", (kind,))
+            return [dict(r) for r in rows]
+
+    def get(self, path):
+        with self._lock:
+            row = self._db.execute("SELECT * FROM files WHERE path = ?", (str(path),)).fetchone()
+            return dict(row) if row else None
+
+    def stems_for(self, beat_path):
+        """The stems zip named like the beat in the same artist's stems folder, if indexed."""
+        artist = os.path.basename(os.path.dirname(beat_path))
+        name = os.path.splitext(os.path.basename(beat_path))[0] + ".zip"
+        path = str(self.roots["stems"] / artist / name)
+        return path if self.get(path) else None
+
+    # ---------- selection ----------
+
+    def _recent_releases(self):
+        since = (datetime.now(timezone.utc) - timedelta(days=RECENT_DAYS)).isoformat()
+        rows = self._db.execute("SELECT artist, COUNT(*) AS n FROM releases WHERE released_at >= ? GROUP BY artist", (since,))
+        return {r["artist"]: r["n"] for r in rows}
+
+    def _pick_tables(self):
+        """Per-artist file lists plus the artist alias table, cached until the index changes."""
+        if self._tables is None:
+            with self._lock:
+                by_kind = {}
+                # beats found to duplicate a release are never offered again
+                for row in self._db.execute(
+                        "SELECT kind, artist, path FROM files WHERE analysis_status != 'duplicate' ORDER BY path"):
+                    by_kind.setdefault(row["kind"], {}).setdefault(row["artist"], []).append(row["path"])
+                recent = self._recent_releases()
+            beats = by_kind.get("beat", {})
+            artists = sorted(beats)
+            weights = [1.0 / (1 + recent.get(a, 0)) for a in artists]
+            self._tables = {"files": by_kind, "artists": AliasTable(artists, weights) if artists else None}
+        return self._tables
+
+    def _pick_from(self, paths, exclude):
+        if not paths:
+            return None
+        # a few rejection draws keep the pick O(1) when little is excluded
+        for _ in range(8):
+            path = random.choice(paths)
+            if path not in exclude:
+                return path
+        left = [p for p in paths if p not in exclude]
+        return random.choice(left) if left else None
+
+    def pick_beat(self, artist=None, exclude=()):
+        """Random beat path; without `artist`, artists with fewer recent releases are favoured."""
+        self.refresh_if_stale()
+        tables = self._pick_tables()
+        beats = tables["files"].get("beat", {})
+        if artist:
+            return self._pick_from(beats.get(artist, []), exclude)
+        if not tables["artists"]:
+            return None
+        for _ in range(8):
+            path = self._pick_from(beats[tables["artists"].sample()], exclude)
+            if path:
+                return path
+        # nearly everything excluded: fall back to any artist with something left
+        candidates = [p for paths in beats.values() for p in paths if p not in exclude]
+        return random.choice(candidates) if candidates else None
+
+    def pick_image(self, artist, exclude=()):
+        self.refresh_if_stale()
+        return self._pick_from(self._pick_tables()["files"].get("image", {}).get(artist, []), exclude)
+
+    def forget(self, path):
+        """Drop a file that was just deleted, without waiting for the next refresh."""
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM files WHERE path = ?", (str(path),))
+        self._tables = None
+
+    def record_release(self, artist, path=None, fingerprint=None):
+        """
+        Count a release against the artist's weight for the next RECENT_DAYS, and
+        remember the beat's fingerprint (given, or from its stored analysis) so
+        find_duplicate() catches it coming back under another name.
+        """
+        row = self.get(path) if path else None
+        if not fingerprint and row and row["analysis"]:
+            fingerprint = json.loads(row["analysis"]).get("fingerprint")
+        released_at = datetime.now(timezone.utc).isoformat()
+        with self._lock, self._db:
+            self._db.execute("INSERT INTO releases (artist, path, released_at) VALUES (?, ?, ?)",
+                             (artist, path, released_at))
+            if fingerprint:
+                self._db.execute(
+                    "INSERT INTO fingerprints (path, hash, artist, fingerprint, released_at) VALUES (?, ?, ?, ?, ?)",
+                    (str(path), row["hash"] if row else None, artist, fingerprint, released_at))
+        self._tables = None
+
+    def find_duplicate(self, fingerprint, path=None):
+        """
+        The closest released beat within DUPLICATE_MAX_BITS of `fingerprint`
+        (a dict with its path, artist, released_at and distance), or None.
+        Releases of `path` itself with unchanged contents (a retried run) don't count.
+        """
+        row = self.get(path) if path else None
+        with self._lock:
+            if self._fingerprints is None:
+                self._fingerprints = FingerprintIndex()
+            self._fingerprints.add(self._db.execute(
+                "SELECT * FROM fingerprints WHERE id > ? ORDER BY id", (self._fingerprints.last_id,)).fetchall())
+            matches = self._fingerprints.nearest(fingerprint, DUPLICATE_MAX_BITS)
+        for match, distance in matches:
+            if path and match["path"] == str(path) and row and match["hash"] == row["hash"]:
+                continue
+            return dict(match, distance=distance)
+        return None
+
+    # ---------- analysis ----------
+
+    def set_analysis(self, path, analysis, status="done"):
+        with self._lock, self._db:
+            self._db.execute("UPDATE files SET analysis_status = ?, analysis = ? WHERE path = ?",
+                             (status, json.dumps(analysis) if analysis is not None else None, str(path)))
+        if status == "duplicate":
+            self._tables = None
+
+    def get_analysis(self, path):
+        row = self.get(path)
+        return json.loads(row["analysis"]) if row and row["analysis"] else None
+
+    def pending_analysis(self):
+        with self._lock:
+            return [r["path"] for r in self._db.execute(
+                "SELECT path FROM files WHERE kind = 'beat' AND analysis_status = 'pending' ORDER BY path")]
+
+    # ---------- watching ----------
+
+    def watch(self):
+        """
+        Refresh on file system events instead of on the next stale pick.
+        Needs the optional `watchdog` package; returns the running observer.
+        """
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            raise RuntimeError("Watching needs watchdog: pip install watchdog")
+
+        index = self
+
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                index.refresh()
+
+        observer = Observer()
+        for root in self.roots.values():
+            if root.is_dir():
+                observer.schedule(_Handler(), str(root), recursive=True)
+        observer.start()
+        return observer
+
+
+_index = None
+
+
+def get_index():
+    """Process-wide index, refreshed on first use."""
+    global _index
+    if _index is None:
+        _index = LibraryIndex()
+        _index.refresh()
+    return _index
+
+
+def forget(path):
+    """Index.forget for callers that delete files; a no-op if no index is loaded."""
+    if _index is not None:
+        _index.forget(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh the beat library index.")
+    parser.add_argument("--full", action="store_true", help="re-stat every file")
+    parser.add_argument("--watch", action="store_true", help="keep refreshing on file changes")
+    args = parser.parse_args()
+
+    index = LibraryIndex()
+    start = time.perf_counter()
+    counts = index.refresh(full=args.full)
+    print(f"Refreshed in {(time.perf_counter() - start) * 1000:.0f} ms: "
+          f"{counts['added']} added, {counts['updated']} updated, {counts['removed']} removed.")
+    for kind in ROOTS:
+        print(f"  {kind}: {len(index.files(kind))} file(s)")
+    print(f"  pending analysis: {len(index.pending_analysis())}")
+    print(f"  released fingerprints: {index._db.execute('SELECT COUNT(*) FROM fingerprints').fetchone()[0]}")
+    if args.watch:
+        observer = index.watch()
+        print("Watching for changes (Ctrl+C to stop)...")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            observer.stop()
+        observer.join()
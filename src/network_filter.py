@@ -0,0 +1,142 @@
+import json
+import os
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import yaml
+
+from file_lock import locked
+
+BASE_DIR = Path(__file__).resolve().parent
+
+# ===== CONFIG =====
+
+CONFIG_FILE = BASE_DIR.parent / "CONFIG.yml"
+# Response sizes seen on earlier sessions, used to estimate what blocking saved
+SIZES_FILE = BASE_DIR / "cache" / "network_sizes.json"
+# ===================
+
+DEFAULTS = {
+    "enabled": True,
+    "block_resource_types": ["image", "font", "media"],
+    "block_domains": [],
+    "stub_domains": [],
+    "allow_domains": [],
+}
+
+
+def load_network_config():
+    config = dict(DEFAULTS)
+    try:
+        with open(CONFIG_FILE, "r", encoding="utf-8") as f:
+            config.update((yaml.safe_load(f) or {}).get("beatstars_network") or {})
+    except FileNotFoundError:
+        pass
+    if os.getenv("BEATSTARS_NETWORK_FILTER") == "0":
+        config["enabled"] = False
+    return config
+
+
+def _matches(host, domains):
+    return any(host == d or host.endswith("." + d) for d in domains)
+
+
+def _size_key(url):
+    parts = urlsplit(url)
+    return f"{parts.netloc}{parts.path}"
+
+
+def _load_sizes():
+    try:
+        with open(SIZES_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+class NetworkFilter:
+    """
+    Routing layer for a Playwright context: aborts requests the upload flow doesn't
+    need, stubs analytics scripts, and keeps per-session request/byte counts.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or load_network_config()
+        self.allowed = 0
+        self.blocked = 0
+        self.stubbed = 0
+        self.bytes_loaded = 0
+        self.bytes_saved = 0
+        self.unknown_saved = 0
+        self.known_sizes = _load_sizes()
+        self.new_sizes = {}     # seen in this session; only these are written back
+
+    async def install(self, context):
+        context.on("response", self._on_response)
+        if self.config["enabled"]:
+            await context.route("**/*", self._route)
+
+    def _on_response(self, response):
+        length = response.headers.get("content-length")
+        if length and length.isdigit():
+            self.bytes_loaded += int(length)
+            self.known_sizes[_size_key(response.url)] = int(length)
+            self.new_sizes[_size_key(response.url)] = int(length)
+
+    def _count_saved(self, url):
+        size = self.known_sizes.get(_size_key(url))
+        if size is None:
+            self.unknown_saved += 1
+        else:
+            self.bytes_saved += size
+
+    async def _route(self, route):
+        request = route.request
+        host = urlsplit(request.url).hostname or ""
+
+        if _matches(host, self.config["allow_domains"]):
+            self.allowed += 1
+            return await route.continue_()
+        if _matches(host, self.config["stub_domains"]):
+            self.stubbed += 1
+            self._count_saved(request.url)
+            content_type = "application/javascript" if request.resource_type == "script" else "text/plain"
+            return await route.fulfill(status=200, body="", content_type=content_type)
+        if request.resource_type in self.config["block_resource_types"] or _matches(host, self.config["block_domains"]):
+            self.blocked += 1
+            self._count_saved(request.url)
+            return await route.abort("blockedbyclient")
+
+        self.allowed += 1
+        await route.continue_()
+
+    def save_sizes(self):
+        """Merge this session's sizes into SIZES_FILE; concurrent sessions each add theirs."""
+        if not self.new_sizes:
+            return
+        with locked(SIZES_FILE):
+            sizes = _load_sizes()
+            sizes.update(self.new_sizes)
+            os.makedirs(SIZES_FILE.parent, exist_ok=True)
+            tmp = SIZES_FILE.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(sizes, f)
+            os.replace(tmp, SIZES_FILE)
+
+    def summary(self):
+        return {
+            "requests_allowed": self.allowed,
+            "requests_blocked": self.blocked,
+            "requests_stubbed": self.stubbed,
+            "bytes_loaded": self.bytes_loaded,
+            "bytes_saved": self.bytes_saved,
+            "saved_of_unknown_size": self.unknown_saved,
+        }
+
+    def report(self, log=print):
+        if not self.config["enabled"]:
+            log(f"[INFO] Network filter off: {self.bytes_loaded / 1e6:.1f} MB loaded.")
+            return
+        unknown = f" (+{self.unknown_saved} of unknown size)" if self.unknown_saved else ""
+        log(f"[INFO] Network filter: {self.blocked} blocked, {self.stubbed} stubbed, {self.allowed} allowed; "
+            f"{self.bytes_loaded / 1e6:.1f} MB loaded, ~{self.bytes_saved / 1e6:.1f} MB saved{unknown}.")
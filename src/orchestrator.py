@@ -5,23 +5,73 @@ from dotenv import load_dotenv
 import json
 import time
 
-from detect_audio_meta import detect_audio_meta
-from get_tags import get_trending_tags
-from upload_to_beatstars import open_and_fill
-from upload_to_youtube import upload_video
+import tracing
 from rndm_select import *
-from gen_metadata import gen_metadata
-from gen_video import make_video
+
+# Stage modules (librosa, googleapiclient, Gemini, Playwright) are imported inside
+# main() right before the stage that needs them, so importing this module is cheap.
 
 load_dotenv()
 BEATSTARS_LINK=os.getenv("BEATSTARS_LINK")
 INST_LINK=os.getenv("INST_LINK")
 EMAIL=os.getenv("EMAIL")
+# Encode the video straight into the YouTube upload instead of writing data/vids/*.mp4 first
+STREAM_VIDEO=os.getenv("STREAM_VIDEO", "0") == "1"
+# Also upload the beat's highlight as a vertical YouTube Short
+SHORTS=os.getenv("SHORTS", "1") == "1"
+
+
+class PipelineCancelled(Exception):
+    """Raised when the caller's should_cancel() asks the pipeline to stop."""
+
 
 # def main():
-def main(chosen_beat_path,chosen_image_path,artist_name):
+def main(chosen_beat_path=None,chosen_image_path=None,artist_name=None,stems_path=None,publish_at=None,keep_image=False,
+         on_stage=None,on_progress=None,should_cancel=None):
+    """
+    Runs the whole upload pipeline for one beat and returns (bs_link, yt_link).
+    Without a beat/image a random one is picked from data/ (what cron runs).
+
+    Returns None when the Google token is invalid, and raises
+    detect_audio_meta.DuplicateBeat when the beat was already released.
+
+    stems_path overrides the default data/stems/<artist>/<beat>.zip, publish_at
+    (ISO 8601 UTC) schedules the YouTube video instead of publishing it right away,
+    and keep_image leaves the artwork on disk for other uploads that share it.
+
+    Optional hooks for callers that run it in the background (e.g. the GUI):
+    on_stage(name) is called as each stage starts, on_progress(kind, fraction, speed)
+    reports ffmpeg ("video") and YouTube ("upload") progress, and should_cancel()
+    is polled between stages and on every progress tick; when it returns True
+    the run stops with PipelineCancelled.
+    """
+    with tracing.span("pipeline", artist=artist_name, scheduled=bool(publish_at)) as run, tracing.Stages() as stages:
+        return _run(run, stages, chosen_beat_path, chosen_image_path, artist_name, stems_path, publish_at, keep_image,
+                    on_stage, on_progress, should_cancel)
+
+
+def _run(run, stages, chosen_beat_path, chosen_image_path, artist_name, stems_path, publish_at, keep_image,
+         on_stage, on_progress, should_cancel):
+
+    def check_cancel():
+        if should_cancel and should_cancel():
+            raise PipelineCancelled("Upload cancelled.")
+
+    def stage(name):
+        check_cancel()
+        stages.enter(name)
+        if on_stage:
+            on_stage(name)
+
+    def progress(kind):
+        def report(fraction, speed):
+            check_cancel()
+            if on_progress:
+                on_progress(kind, fraction, speed)
+        return report
 
     # Check/refresh Google token before uploading to YouTube
+    stage("auth")
     from google_auth_check import check_and_refresh_google_token
     try:
         creds = check_and_refresh_google_token()
@@ -29,46 +79,78 @@ def main(chosen_beat_path,chosen_image_path,artist_name):
     except Exception as e:
         print(f"Google token invalid: {e}")
         print("Please run google_auth_setup.py manually to re-authenticate.")
+        run.set(outcome="auth_failed")
         return  # stop the orchestration safely
 
-    # pick random beat
-    # chosen_beat_path, chosen_beat, chosen_folder = pick_random_beat()
-    # if not chosen_beat:
-    #     raise ValueError("There are no beats to upload")
-    
-    # extract collabs
     collabs=[]
-    # collabs = extract_collabs(chosen_beat)
-    
-    # pick random image
-    # chosen_image_path,chosen_image = pick_random_picture(chosen_folder)
-    # if not chosen_image:
-    #     raise ValueError(f"There are no images to use for {chosen_folder} beats")
+    if chosen_beat_path is None:
+        # pick random beat (of artist_name, if given)
+        chosen_beat_path, chosen_beat, chosen_folder = pick_random_beat(artist_name)
+        if not chosen_beat:
+            raise ValueError("There are no beats to upload")
+        artist_name = chosen_folder
+
+        # extract collabs
+        collabs = extract_collabs(chosen_beat)
+
+    if chosen_image_path is None:
+        # pick random image
+        chosen_image_path,chosen_image = pick_random_picture(artist_name)
+        if not chosen_image:
+            raise ValueError(f"There are no images to use for {artist_name} beats")
+    run.set(artist=artist_name, beat=os.path.basename(chosen_beat_path))
     
     # detect bpm and key of the beat
-    bpm, key = detect_audio_meta(chosen_beat_path)
+    stage("analyze")
+    from detect_audio_meta import analyze_beat, DuplicateBeat
+    try:
+        # before anything that costs quota, a BeatStars slot or a render
+        analysis = analyze_beat(chosen_beat_path)
+    except DuplicateBeat as e:
+        print(f"[ERROR] Not uploading a beat that was already released: {e}")
+        run.set(outcome="duplicate", duplicate_of=e.match["path"])
+        # raised, not returned: None already means the Google token is invalid
+        raise
+    bpm, key = analysis["bpm"], analysis["key"]
+    tracing.annotate(bpm=bpm, key=key)
     # bpm = 136
     # key = "C# Minor"
     
     # get relevant tags:
     # tags = get_trending_tags(chosen_folder,50)
+    stage("tags")
+    from get_tags import get_trending_tags
     tags = get_trending_tags(artist_name,50)
 
     # generate metadata
+    stage("metadata")
+    from gen_metadata import gen_metadata
+    from audio_tagger import tags_for
+    audio_tags = tags_for(analysis)
+    tracing.annotate(genres=audio_tags["genres"], moods=audio_tags["moods"])
     # metaData = gen_metadata(chosen_folder, bpm, key,INST_LINK,EMAIL,tags)
-    metaData = gen_metadata(artist_name, bpm, key,INST_LINK,EMAIL,tags)
+    metaData = gen_metadata(artist_name, bpm, key,INST_LINK,EMAIL,tags,audio_tags=audio_tags)
     
     # with open("last_gen_metadata.json",'r',encoding="utf-8") as f:
     #     metaData = json.load(f)
 
     
+    # the public video carries the voice tag; buyers get the untagged master from BeatStars.
+    # Mixed before anything is published, and never fails: it falls back to the untagged beat.
+    from voice_tag import tagged_audio
+    video_audio = tagged_audio(chosen_beat_path)
+
     # upload to BeatStars
+    stage("beatstars")
+    from upload_to_beatstars import open_and_fill
     MAX_ATTEMPTS = 3
     bs_link = None
     for attempt in range(1, MAX_ATTEMPTS + 1):
+        check_cancel()
+        tracing.annotate(attempts=attempt)
         print(f"\nAttempt {attempt}/{MAX_ATTEMPTS} to upload on BeatStars...\n")
         try:
-            bs_link = open_and_fill(chosen_beat_path,chosen_image_path,metaData["bs_tags"],collabs,metaData["title"])
+            bs_link = open_and_fill(chosen_beat_path,chosen_image_path,metaData["bs_tags"],collabs,metaData["title"],stems_path=stems_path)
             if bs_link and bs_link.startswith("https://bsta.rs/"):
                 print(f"Upload successful on attempt {attempt}: {bs_link}")
                 break
@@ -86,17 +168,91 @@ def main(chosen_beat_path,chosen_image_path,artist_name):
     # with open("last_published_link.txt",'r',encoding="utf-8") as f:
     #     bs_link = f.read().strip()
     
-    # generate video
-    video_path = make_video(chosen_image_path, chosen_beat_path)
-
-    # upload to youtube
     metaData["description"] = metaData["description"].replace("beatstars_link",bs_link)
-    yt_link=upload_video(video_path,metaData["title"],metaData["description"],metaData["yt_tags"],privacy_status="public")
+
+    # scheduled videos must stay private until publishAt
+    privacy_status = "private" if publish_at else "public"
+
+    from upload_to_youtube import upload_video, upload_video_stream, upload_to_channels, load_channels, apply_overrides, pending_upload
+    from yt_status_watcher import watch_video, video_id_from_link
+    from gen_video import make_video, start_video_stream, video_path_for
+
+    channels = load_channels()
+
+    def render():
+        # an upload cut off in an earlier run only resumes for the same bytes, so its render is reused
+        previous = video_path_for(video_audio)
+        if any(pending_upload(previous, channel["name"]) for channel in channels):
+            print(f"[INFO] Reusing {os.path.basename(previous)} to finish the upload an earlier run started.")
+            return previous
+        return make_video(chosen_image_path, video_audio, on_progress=progress("video"))
+
+    if len(channels) > 1:
+        # one render, one metadata generation, uploaded to every channel at once
+        stage("video")
+        video_path = render()
+        stage("youtube")
+        yt_links = upload_to_channels(video_path,metaData["title"],metaData["description"],metaData["yt_tags"],channels=channels,privacy_status=privacy_status,publish_at=publish_at,on_progress=progress("upload"),thumbnail=chosen_image_path)
+        for name, link in yt_links.items():
+            if not isinstance(link, Exception):
+                watch_video(video_id_from_link(link), channel=name, publish_at=publish_at)
+        yt_link = yt_links[channels[0]["name"]]
+        if isinstance(yt_link, Exception):
+            raise yt_link
+    else:
+        # the one profile's credentials, quota ledger and overrides, as upload_to_channels would use them
+        channel = channels[0]
+        title, description, yt_tags, yt_options = apply_overrides(
+            metaData["title"], metaData["description"], metaData["yt_tags"],
+            {"privacy_status": privacy_status, "publish_at": publish_at}, channel["overrides"])
+        if STREAM_VIDEO:
+            # generate video and upload to youtube at the same time, nothing is written to disk
+            stage("youtube")
+            ffmpeg = start_video_stream(chosen_image_path, video_audio)
+            yt_link=upload_video_stream(ffmpeg.stdout,title,description,yt_tags,process=ffmpeg,channel=channel,on_progress=progress("upload"),thumbnail=chosen_image_path,**yt_options)
+            video_path = None
+        else:
+            # generate video
+            stage("video")
+            video_path = render()
+
+            # upload to youtube
+            stage("youtube")
+            yt_link=upload_video(video_path,title,description,yt_tags,channel=channel,on_progress=progress("upload"),thumbnail=chosen_image_path,**yt_options)
+
+    if len(channels) == 1:
+        watch_video(video_id_from_link(yt_link), channel=channels[0]["name"], publish_at=publish_at)
+
+    short_link = None
+    if SHORTS and analysis.get("highlight"):
+        stage("shorts")
+        from shorts import make_and_upload_short
+        try:
+            short_link = make_and_upload_short(chosen_image_path, video_audio, analysis["highlight"], metaData, yt_link, bs_link,
+                                               channel=channels[0], privacy_status=privacy_status, publish_at=publish_at)
+            print(f"Short uploaded: {short_link}")
+        except Exception as e:
+            # the beat is already out on BeatStars and YouTube; a missing Short isn't worth failing the run
+            print(f"[WARN] Short not uploaded: {e}")
+
+    from library_index import get_index
+    get_index().record_release(artist_name, chosen_beat_path, fingerprint=analysis["fingerprint"])
 
     # delete files
+    stages.enter("cleanup")
+    if on_stage:
+        on_stage("cleanup")
     del_file(chosen_beat_path)
-    del_file(chosen_image_path)
-    del_file(video_path)
+    if not keep_image:
+        del_file(chosen_image_path)
+    if video_path:
+        del_file(video_path)
+    # the tagged mix and the artwork derivatives stay cached; each cache drops what went unused
+    import prep_image
+    import voice_tag
+    prep_image.prune()
+    voice_tag.prune()
+    run.set(outcome="released", bs_link=bs_link, yt_link=yt_link, short_link=short_link)
     return bs_link,yt_link
     
 if __name__ == "__main__":
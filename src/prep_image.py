@@ -1,12 +1,137 @@
-from PIL import Image
+"""
+Artwork derivatives, decoded once and cached by content hash.
+
+    python prep_image.py data/images/don_toliver/don.jpg
+
+Every artwork is turned into the right-sized files each platform wants:
+a letterboxed 1920x1080 video frame, a square BeatStars cover, a YouTube
+thumbnail and a vertical 1080x1920 frame for Shorts. Files are keyed by the
+blake2b of the original, so the same art used for several beats (or renamed)
+is only ever decoded and resized once. Large JPEGs are decoded in draft mode
+(libjpeg DCT scaling) at the smallest size that still covers every derivative.
+"""
 import os
+import sys
+import time
+from pathlib import Path
+
+from PIL import Image, ImageOps
+
+import tracing
+from library_index import file_hash
+
+BASE_DIR = Path(__file__).resolve().parent
+
+# ===== CONFIG =====
+
+DERIVATIVE_DIR = BASE_DIR / "cache" / "artwork"
+# name -> (width, height, fit); "pad" letterboxes on black, "crop" fills and center-crops
+DERIVATIVES = {
+    "frame": (1920, 1080, "pad"),
+    "cover": (1500, 1500, "crop"),     # BeatStars artwork: square, 1500x1500 recommended
+    "thumbnail": (1280, 720, "pad"),   # YouTube custom thumbnail: 16:9, max 2MB
+    "vertical": (1080, 1920, "pad"),
+}
+JPEG_QUALITY = 90
+THUMBNAIL_MAX_BYTES = 2 * 1024 * 1024
+CACHE_MAX_AGE_DAYS = 60    # prune() drops derivatives not used for this long
+
+
+def _decode(path, sizes):
+    """Open an image once, at the smallest draft scale that still covers every target size."""
+    img = Image.open(path)
+    longest = max(max(w, h) for w, h in sizes)
+    # draft only applies to JPEG; it picks a 1/2, 1/4 or 1/8 scale >= the requested box
+    img.draft("RGB", (longest, longest))
+    img = ImageOps.exif_transpose(img)
+    return img.convert("RGB")
+
+
+def _render(img, w, h, fit, upscale=True):
+    if fit == "crop":
+        return ImageOps.fit(img, (w, h), Image.LANCZOS)
+    # scale to fit inside, then pad with black. Derivatives scale up too, like the ffmpeg
+    # scale filter the video used to apply; upscale=False only ever shrinks (Image.thumbnail)
+    scale = min(w / img.width, h / img.height)
+    if not upscale:
+        scale = min(scale, 1)
+    size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+    canvas = Image.new("RGB", (w, h), (0, 0, 0))
+    canvas.paste(img.resize(size, Image.LANCZOS), ((w - size[0]) // 2, (h - size[1]) // 2))
+    return canvas
+
+
+def _save(img, out_path, max_bytes=None):
+    tmp = out_path.with_suffix(f".{os.getpid()}.tmp")
+    quality = JPEG_QUALITY
+    while True:
+        img.save(tmp, "JPEG", quality=quality, optimize=True)
+        if not max_bytes or tmp.stat().st_size <= max_bytes or quality <= 50:
+            break
+        quality -= 10
+    os.replace(tmp, out_path)
+
+
+def _cache_path(digest, name):
+    w, h, fit = DERIVATIVES[name]
+    return DERIVATIVE_DIR / digest[:2] / f"{digest}_{name}_{w}x{h}{fit[0]}.jpg"
+
+
+def derivatives(image_path, names=None):
+    """
+    {name: path} of the cached derivatives of an artwork, creating the missing
+    ones from a single decode. names defaults to every entry in DERIVATIVES.
+    """
+    names = list(names or DERIVATIVES)
+    with tracing.span("artwork.derive", image=os.path.basename(image_path)) as sp:
+        digest = file_hash(image_path)
+        paths = {name: _cache_path(digest, name) for name in names}
+        missing = [name for name, p in paths.items() if not p.exists()]
+        sp.count("cache_hits", len(names) - len(missing))
+        now = time.time()
+        for name, p in paths.items():
+            if name not in missing:
+                os.utime(p, (now, now))    # keeps it out of prune()
+        if missing:
+            img = _decode(image_path, [DERIVATIVES[n][:2] for n in missing])
+            sp.set(source_size=f"{img.width}x{img.height}")
+            for name in missing:
+                w, h, fit = DERIVATIVES[name]
+                paths[name].parent.mkdir(parents=True, exist_ok=True)
+                _save(_render(img, w, h, fit), paths[name],
+                      THUMBNAIL_MAX_BYTES if name == "thumbnail" else None)
+                sp.count("bytes_written", paths[name].stat().st_size)
+        return {name: str(p) for name, p in paths.items()}
+
+
+def derivative(image_path, name):
+    """Path of one cached derivative (see DERIVATIVES)."""
+    return derivatives(image_path, [name])[name]
+
+
+def prune(max_age_days=CACHE_MAX_AGE_DAYS):
+    """Delete derivatives not used for max_age_days; returns how many were removed."""
+    cutoff = time.time() - max_age_days * 86400
+    removed = 0
+    for p in DERIVATIVE_DIR.glob("*/*.jpg"):
+        try:
+            if p.stat().st_mtime < cutoff:
+                p.unlink()
+                removed += 1
+        except FileNotFoundError:
+            pass    # pruned by another run at the same time
+    return removed
+
 
 def fit_thumbnail(in_path, out_path, w=1920, h=1080):
     os.makedirs(os.path.dirname(out_path), exist_ok=True)
-    img = Image.open(in_path).convert("RGB")
-    img.thumbnail((w, h))
-    canvas = Image.new("RGB", (w, h), (0,0,0))
-    x, y = (w - img.width)//2, (h - img.height)//2
-    canvas.paste(img, (x,y))
-    canvas.save(out_path, quality=95)
+    _render(_decode(in_path, [(w, h)]), w, h, "pad", upscale=False).save(out_path, quality=95)
     return out_path
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(f"[INFO] Pruned {prune()} unused derivative(s) from {DERIVATIVE_DIR}")
+    for path in sys.argv[1:]:
+        for name, out in derivatives(path).items():
+            print(f"[INFO] {name:9s} {out} ({os.path.getsize(out) // 1024} KB)")
@@ -0,0 +1,354 @@
+"""
+Release scheduler daemon.
+
+    python release_scheduler.py          # run forever (start it once, e.g. from systemd/launchd)
+    python release_scheduler.py --once   # one pass, e.g. from cron every 10 minutes
+
+Owns the weekly release calendar from the release_schedule section of CONFIG.yml.
+Every slot is prepared ahead of time, preferably during idle hours: beat/image
+pick, analysis, tags, metadata, video render, BeatStars draft and a private
+YouTube upload with publishAt set to the slot. Shortly before the slot only the
+cheap part is left: publish the BeatStars draft and put its link into the
+already scheduled video's description. YouTube publishes the video itself.
+"""
+import argparse
+import json
+import os
+import time
+import traceback
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+import yaml
+from dotenv import load_dotenv
+
+import tracing
+from file_lock import locked
+from library_index import get_index
+from rndm_select import pick_random_beat, pick_random_picture, extract_collabs, del_file
+
+load_dotenv()
+BASE_DIR = Path(__file__).resolve().parent
+
+# ===== CONFIG =====
+
+CONFIG_FILE = BASE_DIR.parent / "CONFIG.yml"
+RELEASES_FILE = BASE_DIR / "cache" / "releases.json"
+POLL_SECONDS = 60
+MAX_ATTEMPTS = 3
+RETRY_AFTER = timedelta(minutes=30)
+INST_LINK = os.getenv("INST_LINK")
+EMAIL = os.getenv("EMAIL")
+# ===================
+
+DEFAULT_SCHEDULE = {
+    "timezone": "UTC",
+    "prepare_ahead_hours": 48,
+    "idle_hours": [2, 8],
+    "urgent_hours": 6,
+    "finalize_minutes": 15,
+    "artists": [],
+}
+WEEKDAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+# placeholder gen_metadata leaves in the description until the BeatStars link exists
+LINK_PLACEHOLDER = "beatstars_link"
+
+
+def load_schedule():
+    """The release_schedule section of CONFIG.yml, with defaults filled in."""
+    try:
+        with open(CONFIG_FILE, "r", encoding="utf-8") as f:
+            section = (yaml.safe_load(f) or {}).get("release_schedule") or {}
+    except FileNotFoundError:
+        section = {}
+    return {**DEFAULT_SCHEDULE, **section}
+
+
+def slots_between(schedule, start, end):
+    """(slot time in UTC, artist) for every calendar slot in [start, end)."""
+    tz = ZoneInfo(schedule["timezone"])
+    local_start = start.astimezone(tz)
+    slots = []
+    for entry in schedule["artists"]:
+        for slot in entry["slots"]:
+            day, clock = slot.lower().split()
+            hour, minute = (int(x) for x in clock.split(":"))
+            days_ahead = (WEEKDAYS.index(day[:3]) - local_start.weekday()) % 7
+            date = local_start.date() + timedelta(days=days_ahead)
+            while True:
+                at = datetime(date.year, date.month, date.day, hour, minute, tzinfo=tz).astimezone(timezone.utc)
+                if at >= end:
+                    break
+                if at >= start:
+                    slots.append((at, entry["name"]))
+                date += timedelta(days=7)
+    return sorted(slots)
+
+
+def _iso(dt):
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _parse(value):
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def load_releases():
+    try:
+        with open(RELEASES_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_releases(releases):
+    """Write the releases; callers hold locked(RELEASES_FILE) from reading them to here (see tick)."""
+    os.makedirs(RELEASES_FILE.parent, exist_ok=True)
+    tmp = RELEASES_FILE.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(releases, f, indent=2)
+    os.replace(tmp, RELEASES_FILE)
+
+
+class ReleaseScheduler:
+    """
+    Moves every calendar slot through
+    planned -> prepared -> released (or failed after MAX_ATTEMPTS, or missed
+    when the slot passed before it could be prepared or finalized).
+    Each preparation phase stores its result on the release, so a crash or
+    restart continues where it stopped instead of redoing finished work.
+    A failed or missed release whose video is already scheduled on YouTube
+    gets it unscheduled; until that works it keeps yt_scheduled set and every
+    pass reports it.
+    """
+
+    def __init__(self, schedule=None):
+        self.schedule = schedule or load_schedule()
+        self.releases = load_releases()
+
+    def save(self):
+        save_releases(self.releases)
+
+    # ---------- calendar ----------
+
+    def plan(self, now):
+        """Add a release for every slot inside the preparation horizon."""
+        horizon = now + timedelta(hours=self.schedule["prepare_ahead_hours"])
+        for at, artist in slots_between(self.schedule, now, horizon):
+            release_id = f"{artist}@{_iso(at)}"
+            if release_id not in self.releases:
+                self.releases[release_id] = {
+                    "id": release_id, "artist": artist, "publish_at": _iso(at),
+                    "status": "planned", "attempts": 0, "retry_at": None, "error": None,
+                }
+                print(f"[INFO] Planned release {release_id}")
+        for release in self.releases.values():
+            if release["status"] == "planned" and _parse(release["publish_at"]) <= now:
+                release["status"] = "missed"
+                print(f"[WARN] Release {release['id']} was never prepared, slot missed.")
+            elif release["status"] == "prepared" and _parse(release["publish_at"]) <= now:
+                # YouTube went ahead at the slot with the placeholder link; the video is taken back
+                release["status"] = "missed"
+                print(f"[WARN] Release {release['id']} was not finalized before its slot.")
+        self.save()
+
+    def is_idle(self, now):
+        start, end = self.schedule["idle_hours"]
+        hour = now.astimezone(ZoneInfo(self.schedule["timezone"])).hour
+        return start <= hour < end if start <= end else (hour >= start or hour < end)
+
+    def _ready(self, release, now):
+        return not release["retry_at"] or _parse(release["retry_at"]) <= now
+
+    def next_to_prepare(self, now):
+        """Earliest planned release that should be prepared now: any during idle hours, urgent ones always."""
+        urgent = now + timedelta(hours=self.schedule["urgent_hours"])
+        for release in sorted(self.releases.values(), key=lambda r: r["publish_at"]):
+            if release["status"] != "planned" or not self._ready(release, now):
+                continue
+            if _parse(release["publish_at"]) <= now:
+                continue
+            if self.is_idle(now) or _parse(release["publish_at"]) <= urgent:
+                return release
+        return None
+
+    def due_to_finalize(self, now):
+        lead = timedelta(minutes=self.schedule["finalize_minutes"])
+        return [
+            r for r in sorted(self.releases.values(), key=lambda r: r["publish_at"])
+            if r["status"] == "prepared" and self._ready(r, now) and _parse(r["publish_at"]) - lead <= now
+        ]
+
+    def to_unschedule(self):
+        """Releases that won't be finalized but whose video is (or may still be) scheduled to go public."""
+        return [
+            r for r in self.releases.values()
+            if r["status"] in ("failed", "missed") and r.get("yt_link") and r.get("yt_scheduled", True)
+        ]
+
+    # ---------- work ----------
+
+    def _reserved(self, field):
+        return {r[field] for r in self.releases.values() if r.get(field) and r["status"] in ("planned", "prepared")}
+
+    def prepare(self, release):
+        """Everything heavy, ending with the video scheduled on YouTube."""
+        artist = release["artist"]
+        if not release.get("beat_path"):
+            beat_path, beat, _ = pick_random_beat(artist, exclude=self._reserved("beat_path"))
+            if not beat:
+                raise ValueError(f"No beats left for {artist}")
+            image_path, image = pick_random_picture(artist, exclude=self._reserved("image_path"))
+            if not image:
+                raise ValueError(f"No images left for {artist}")
+            release.update(beat_path=beat_path, image_path=image_path, collabs=extract_collabs(beat))
+            self.save()
+
+        if not release.get("metadata"):
+            from detect_audio_meta import analyze_beat, DuplicateBeat
+            from get_tags import get_trending_tags
+            from gen_metadata import gen_metadata
+            from audio_tagger import tags_for
+
+            try:
+                analysis = analyze_beat(release["beat_path"])
+            except DuplicateBeat:
+                # the next attempt picks another beat; the index no longer offers this one
+                for field in ("beat_path", "image_path", "collabs"):
+                    release.pop(field, None)
+                raise
+            bpm, key = analysis["bpm"], analysis["key"]
+            tags = get_trending_tags(artist, 50)
+            release["metadata"] = gen_metadata(artist, bpm, key, INST_LINK, EMAIL, tags, audio_tags=tags_for(analysis))
+            self.save()
+
+        meta = release["metadata"]
+        if not release.get("draft"):
+            from upload_to_beatstars import open_and_fill
+
+            open_and_fill(release["beat_path"], release["image_path"], meta["bs_tags"], release["collabs"],
+                          meta["title"], publish=False)
+            release["draft"] = True
+            self.save()
+
+        if not release.get("yt_link"):
+            from gen_video import make_video
+            from upload_to_youtube import upload_video
+            from voice_tag import tagged_audio
+
+            if not release.get("video_path") or not os.path.exists(release["video_path"]):
+                release["video_audio"] = tagged_audio(release["beat_path"])
+                release["video_path"] = make_video(release["image_path"], release["video_audio"])
+                self.save()
+            # scheduled videos must stay private until publishAt
+            release["yt_link"] = upload_video(release["video_path"], meta["title"], meta["description"],
+                                              meta["yt_tags"], privacy_status="private",
+                                              publish_at=release["publish_at"], thumbnail=release["image_path"])
+            release["yt_scheduled"] = True
+            self.save()
+
+        release["status"] = "prepared"
+
+    def finalize(self, release):
+        """Publish the BeatStars draft and link it from the scheduled video."""
+        from upload_to_beatstars import open_and_fill
+        from yt_bulk_update import bulk_update, replace_link
+        from yt_status_watcher import watch_video, video_id_from_link
+
+        meta = release["metadata"]
+        if not release.get("bs_link"):
+            bs_link = open_and_fill(release["beat_path"], release["image_path"], meta["bs_tags"],
+                                    release["collabs"], meta["title"])
+            if not bs_link:
+                raise RuntimeError("BeatStars link not captured")
+            release["bs_link"] = bs_link
+            self.save()
+
+        video_id = video_id_from_link(release["yt_link"])
+        result = bulk_update([video_id], [replace_link(LINK_PLACEHOLDER, release["bs_link"])])
+        if result["failed"] or result["deferred"]:
+            raise RuntimeError(f"Description of {video_id} not updated")
+        watch_video(video_id, publish_at=release["publish_at"])
+        get_index().record_release(release["artist"], release["beat_path"])
+
+        for path in (release["beat_path"], release["image_path"], release.get("video_path")):
+            if path:
+                del_file(path)
+        import prep_image
+        import voice_tag
+        prep_image.prune()
+        voice_tag.prune()
+        release["status"] = "released"
+        print(f"[INFO] Released {release['id']}: {release['bs_link']} / {release['yt_link']}")
+
+    def unschedule(self, release):
+        """Keep the video of a release that won't be finalized private instead of letting YouTube publish it."""
+        from yt_bulk_update import unschedule
+        from yt_status_watcher import video_id_from_link
+
+        try:
+            unschedule(video_id_from_link(release["yt_link"]))
+        except Exception as e:
+            print(f"[ERROR] Release {release['id']}: {release['yt_link']} is still scheduled for "
+                  f"{release['publish_at']} and couldn't be unscheduled: {e}")
+        else:
+            release["yt_scheduled"] = False
+            print(f"[INFO] Release {release['id']}: {release['yt_link']} unscheduled, it stays private.")
+        self.save()
+
+    def _attempt(self, release, work, now):
+        try:
+            with tracing.span(f"release.{work.__name__}", release=release["id"], attempt=release["attempts"] + 1):
+                work(release)
+            release.update(error=None, retry_at=None, attempts=0)
+        except Exception as e:
+            release["attempts"] += 1
+            release["error"] = str(e)
+            traceback.print_exc()
+            if release["attempts"] >= MAX_ATTEMPTS:
+                release["status"] = "failed"
+                print(f"[ERROR] Release {release['id']} failed for good: {e}")
+            else:
+                release["retry_at"] = _iso(now + RETRY_AFTER)
+                print(f"[WARN] Release {release['id']} attempt {release['attempts']} failed: {e}")
+        self.save()
+
+    def tick(self, now=None):
+        """
+        One pass: plan, finalize what is due, unschedule what won't be released,
+        then prepare at most one release. The pass holds the releases file lock,
+        so the daemon and a cron --once run take turns instead of both preparing a slot.
+        """
+        now = now or datetime.now(timezone.utc)
+        with locked(RELEASES_FILE):
+            # the other process may have moved releases on since this one last looked
+            self.releases = load_releases()
+            self.plan(now)
+            for release in self.due_to_finalize(now):
+                self._attempt(release, self.finalize, now)
+            for release in self.to_unschedule():
+                self.unschedule(release)
+            # one heavy preparation per tick spreads renders and uploads across the idle window
+            release = self.next_to_prepare(now)
+            if release:
+                print(f"[INFO] Preparing {release['id']}...")
+                self._attempt(release, self.prepare, now)
+
+    def run(self, poll_seconds=POLL_SECONDS):
+        print(f"Release scheduler started ({len(self.schedule['artists'])} artist calendar(s)).")
+        while True:
+            self.tick()
+            time.sleep(poll_seconds)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prepare and publish releases from the CONFIG.yml calendar.")
+    parser.add_argument("--once", action="store_true", help="run a single pass and exit")
+    args = parser.parse_args()
+
+    scheduler = ReleaseScheduler()
+    if args.once:
+        scheduler.tick()
+    else:
+        scheduler.run()
@@ -1,7 +1,5 @@
 import os
-import random
 import re
-import json
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent
@@ -13,83 +11,34 @@ BEATS_DIR = BASE_DIR / "data" / "beats"
 IMG_DIR = BASE_DIR / "data" / "images"
 COLLABS_JSON = BASE_DIR / "data" / "collaborators" / "collaborators.json"
 
-import os
-import random
-
-def pick_random_beat():
-    AUDIO_EXTS = ('.mp3', '.wav', '.flac', '.m4a', '.aac', '.ogg', '.aiff', '.wma')
-
-    def is_audio_file(path: str) -> bool:
-        """Return True if path is a valid audio file (by extension, not hidden)."""
-        return (
-            os.path.isfile(path)
-            and path.lower().endswith(AUDIO_EXTS)
-            and not os.path.basename(path).startswith('.')
-        )
-
-    non_empty_folders = []
-    for folder_name in os.listdir(BEATS_DIR):
-        folder_path = os.path.join(BEATS_DIR, folder_name)
-        if not os.path.isdir(folder_path):
-            continue
-
-        # find all valid audio files in this folder
-        audio_files = [
-            f for f in os.listdir(folder_path)
-            if is_audio_file(os.path.join(folder_path, f))
-        ]
-
-        if audio_files:  # only count folders with real audio files
-            non_empty_folders.append((folder_name, audio_files))
-
-    if not non_empty_folders:
-        return None, None, None  # no folders with audio files
+from library_index import get_index, forget
 
-    # pick random folder and random audio file inside
-    chosen_folder, audio_files = random.choice(non_empty_folders)
-    chosen_beat = random.choice(audio_files)
-    beat_path = os.path.join(BEATS_DIR, chosen_folder, chosen_beat)
+def pick_random_beat(artist=None, exclude=()):
+    """
+    Random beat from the library index (or from `artist`'s folder only).
+    Artists with fewer recent releases are favoured. Paths in `exclude` are
+    never picked, e.g. beats already reserved for an upcoming release.
+    """
+    beat_path = get_index().pick_beat(artist, exclude=set(exclude))
+    if not beat_path:
+        return None, None, None  # no folders with audio files
 
-    return beat_path, chosen_beat, chosen_folder
+    return beat_path, os.path.basename(beat_path), os.path.basename(os.path.dirname(beat_path))
 
 
-import os
-import random
-
-def pick_random_picture(chosen_folder):
-    IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.webp', '.bmp', '.gif', '.tiff')
-
-    def is_image_file(path: str) -> bool:
-        """Return True if path is a valid image file (by extension, not hidden)."""
-        return (
-            os.path.isfile(path)
-            and path.lower().endswith(IMAGE_EXTS)
-            and not os.path.basename(path).startswith('.')
-        )
-
-    folder_path = os.path.join(IMG_DIR, chosen_folder)
-    if not os.path.isdir(folder_path):
-        return None, None
-
-    # collect all valid images
-    images = [
-        f for f in os.listdir(folder_path)
-        if is_image_file(os.path.join(folder_path, f))
-    ]
-
-    if not images:
+def pick_random_picture(chosen_folder, exclude=()):
+    image_path = get_index().pick_image(chosen_folder, exclude=set(exclude))
+    if not image_path:
         return None, None  # no valid images in this folder
 
-    chosen_image = random.choice(images)
-    image_path = os.path.join(folder_path, chosen_image)
-
-    return image_path, chosen_image
+    return image_path, os.path.basename(image_path)
 
 
 def del_file(file_path):
     # delete selected file
     if os.path.exists(file_path):
         os.remove(file_path)
+        forget(file_path)
         print(f"{os.path.basename(file_path)} successfully deleted")
 
 def extract_collabs(filename):
@@ -121,8 +70,7 @@ def extract_collabs(filename):
     # Clean names: remove @, _, leading digits
     cleaned = [re.sub(r'^[@_\d]+', '', p).lower() for p in producers_raw if p.strip()]
 
-    with open(COLLABS_JSON,"r",encoding="utf-8") as f:
-        data=json.load(f)
+    data = get_index().collaborators()
 
     # Known producers (keys + values)
     known = set([k.lower() for k in data.keys()] + [v.lower() for v in data.values()])
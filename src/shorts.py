@@ -0,0 +1,122 @@
+"""
+A YouTube Short for every release: the beat's strongest 15-60 s, vertical.
+
+    python shorts.py data/beats/don_toliver/ALLIANCE_135_VIRTHY_KVIT.mp3
+
+The segment is picked while the beat is analysed (detect_audio_meta.analyze
+stores it as "highlight"), from the audio that is already decoded there: a
+per-frame score of loudness and onset strength, summed over every window of
+SHORTS_SECONDS at once with a cumulative sum. Hook sections found by
+song_structure are preferred when they score close to the best window, so
+the clip starts where the hook does instead of mid-phrase. That costs a few
+milliseconds; rendering it is the same still-image encode as the long video
+on the cached 1080x1920 artwork, over a fraction of the length.
+"""
+import os
+import sys
+
+import numpy as np
+from dotenv import load_dotenv
+
+import tracing
+
+load_dotenv()
+
+# ===== CONFIG =====
+
+MIN_SECONDS = 15
+MAX_SECONDS = 60
+SECONDS = min(max(float(os.getenv("SHORTS_SECONDS") or 30), MIN_SECONDS), MAX_SECONDS)
+ONSET_WEIGHT = 0.5         # share of the score from onset strength, the rest is loudness
+HOOK_PREFERENCE = 0.9      # a hook is used if it scores at least this fraction of the best window
+TITLE_LIMIT = 100          # YouTube's title length limit
+# ===================
+
+
+def _score(feats):
+    """Per-frame 0..1 score: loudness and onset strength, each scaled to its own peak."""
+    import librosa
+    from detect_audio_meta import HOP_LENGTH
+
+    rms = librosa.feature.rms(y=feats["y"], hop_length=HOP_LENGTH)[0]
+    onset = feats["onset_env"]
+    n = min(len(rms), len(onset))
+    # onsets smoothed over ~1 s, so a window is scored on its groove, not single hits
+    width = max(1, int(feats["sr"] / HOP_LENGTH))
+    onset = np.convolve(onset[:n], np.ones(width) / width, mode="same")
+    return (1 - ONSET_WEIGHT) * rms[:n] / (rms.max() + 1e-9) + ONSET_WEIGHT * onset / (onset.max() + 1e-9)
+
+
+def pick_segment(feats, structure=None):
+    """
+    {"start", "end", "score", "source"} of the clip for the Short, in seconds,
+    from detect_audio_meta.features() and optionally song_structure's result.
+    None if the beat is shorter than MIN_SECONDS.
+    """
+    from detect_audio_meta import HOP_LENGTH
+
+    frame_s = HOP_LENGTH / feats["sr"]
+    score = _score(feats)
+    total = len(score) * frame_s
+    if total < MIN_SECONDS:
+        return None
+    length = min(SECONDS, total)
+    window = int(length / frame_s)
+
+    # mean score of every window of `window` frames, all at once
+    sums = np.concatenate([[0.0], np.cumsum(score)])
+    means = (sums[window:] - sums[:-window]) / window
+    best = int(np.argmax(means))
+    start, end, value, source = best * frame_s, best * frame_s + length, float(means[best]), "scan"
+
+    hooks = [s for s in (structure or {}).get("sections", []) if s["label"] == "hook"]
+    for hook in hooks:
+        # the hook from its first bar, stretched or cut to a Short's length
+        hook_len = min(max(hook["end"] - hook["start"], MIN_SECONDS), MAX_SECONDS, total)
+        a = min(int(hook["start"] / frame_s), len(score) - int(hook_len / frame_s))
+        b = a + int(hook_len / frame_s)
+        hook_value = float((sums[b] - sums[a]) / (b - a))
+        if hook_value >= HOOK_PREFERENCE * means[best] and (source == "scan" or hook_value > value):
+            start, end, value, source = a * frame_s, b * frame_s, hook_value, "hook"
+    return {"start": round(start, 2), "end": round(end, 2), "score": round(value, 3), "source": source}
+
+
+def short_metadata(metadata, yt_link, bs_link):
+    """Title, description and tags of the Short, from the release's generated metadata."""
+    suffix = " #Shorts"
+    title = metadata["title"][:TITLE_LIMIT - len(suffix)] + suffix
+    hashtags = metadata.get("short_hashtags") or ""
+    description = (f"Full beat: {yt_link}\nDownload/Purchase: {bs_link}\n\n"
+                   f"{hashtags} #Shorts").strip()
+    return title, description, metadata["yt_tags"]
+
+
+@tracing.traced("shorts")
+def make_and_upload_short(image_path, audio_path, highlight, metadata, yt_link, bs_link, channel=None, **body_options):
+    """
+    Render the highlight of audio_path over the vertical artwork and upload it
+    with upload_video; returns the Short's link. body_options are passed on
+    (privacy_status, publish_at, ...). The rendered file is removed afterwards.
+    """
+    from gen_video import make_short
+    from upload_to_youtube import upload_video
+
+    duration = highlight["end"] - highlight["start"]
+    tracing.annotate(start=highlight["start"], seconds=duration, source=highlight["source"])
+    video_path = make_short(image_path, audio_path, highlight["start"], duration)
+    try:
+        title, description, tags = short_metadata(metadata, yt_link, bs_link)
+        return upload_video(video_path, title, description, tags, channel=channel, **body_options)
+    finally:
+        os.remove(video_path)
+
+
+if __name__ == "__main__":
+    from detect_audio_meta import analyze
+
+    for path in sys.argv[1:]:
+        segment = analyze(path)["highlight"]
+        if segment:
+            print(f"{path}: {segment['start']:.2f} - {segment['end']:.2f} ({segment['source']}, score {segment['score']})")
+        else:
+            print(f"{path}: too short for a Short")
@@ -0,0 +1,156 @@
+"""
+Song structure (intro / verse / hook / break / outro) from the features detect_audio_meta already has.
+
+    python song_structure.py data/beats/don_toliver/ALLIANCE_135_VIRTHY_KVIT.mp3
+
+The beat is cut into bars (4 beats at the detected tempo), each bar described
+by its chroma, onset strength and loudness. A bar-by-bar self-similarity
+matrix is scanned with a checkerboard kernel; peaks of that novelty curve are
+section boundaries. Sections are grouped by how alike they sound and labelled
+from their loudness: the loudest group is the hook, quiet sections at the
+edges are intro/outro, quiet ones in between are breaks. Everything works on
+whole arrays, so it adds milliseconds to the bpm/key pass, not another decode.
+"""
+import sys
+
+import librosa
+import numpy as np
+
+from detect_audio_meta import HOP_LENGTH
+
+# ===== CONFIG =====
+
+BEATS_PER_BAR = 4
+KERNEL_BARS = 8            # width of the checkerboard kernel (bars either side / 2)
+MIN_SECTION_BARS = 4
+CHROMA_WEIGHT = 0.5        # per chroma bin, against 1 for onset strength and loudness
+SAME_GROUP = 0.9           # cosine similarity above which two sections count as the same part
+ENERGY_HOP = 1.0           # seconds per point of the stored energy curve
+# ===================
+
+
+def _bar_features(feats, rms, bpm):
+    """(bars, dims) matrix of per-bar chroma, onset strength and loudness, plus the bar length in frames."""
+    sr = feats["sr"]
+    first = feats["trim"][0] // HOP_LENGTH
+    chroma = feats["chroma"]
+    # chroma covers the trimmed beat; onset and loudness frames are cut to the same span
+    onset = feats["onset_env"][first:first + chroma.shape[1]]
+    rms = rms[first:first + chroma.shape[1]]
+    frames = min(chroma.shape[1], len(onset), len(rms))
+
+    bar = BEATS_PER_BAR * 60.0 / max(bpm, 1) * sr / HOP_LENGTH
+    # rounding can push the last bar start onto `frames` itself, which reduceat can't index
+    bounds = np.unique(np.clip(np.round(np.arange(0, frames, bar)).astype(int), 0, frames - 1))
+    counts = np.diff(np.append(bounds, frames))
+    per_frame = np.vstack([chroma[:, :frames], onset[None, :frames], rms[None, :frames]])
+    bars = np.add.reduceat(per_frame, bounds, axis=1) / counts
+    return bars.T, bar
+
+
+def _novelty(similarity, width):
+    """Foote novelty: a Gaussian-tapered checkerboard kernel slid along the diagonal."""
+    half = width // 2
+    signs = np.sign(np.arange(-half, half) + 0.5)
+    taper = np.exp(-0.5 * (np.arange(-half, half) + 0.5) ** 2 / (half / 2) ** 2)
+    kernel = np.outer(signs, signs) * np.outer(taper, taper)
+    padded = np.pad(similarity, half, mode="edge")
+    windows = np.lib.stride_tricks.sliding_window_view(padded, (width, width))
+    diagonal = windows[np.arange(len(similarity)), np.arange(len(similarity))]
+    return np.maximum((diagonal * kernel).sum(axis=(1, 2)), 0)
+
+
+def _boundaries(novelty):
+    """Bar indices where sections start: novelty peaks, at least MIN_SECTION_BARS apart."""
+    is_peak = (novelty > np.roll(novelty, 1)) & (novelty >= np.roll(novelty, -1))
+    is_peak &= novelty > novelty.mean() + 0.5 * novelty.std()
+    is_peak[:MIN_SECTION_BARS] = is_peak[-MIN_SECTION_BARS + 1:] = False
+    cuts = [0]
+    for i in np.flatnonzero(is_peak)[np.argsort(-novelty[is_peak])]:
+        if all(abs(i - c) >= MIN_SECTION_BARS for c in cuts):
+            cuts.append(int(i))
+    return sorted(cuts)
+
+
+def _labels(means, energy):
+    """Group letters and part names for sections, from their mean features and loudness."""
+    unit = means / (np.linalg.norm(means, axis=1, keepdims=True) + 1e-9)
+    alike = unit @ unit.T > SAME_GROUP
+    groups = []
+    for i in range(len(means)):
+        earlier = np.flatnonzero(alike[i, :i])
+        groups.append(groups[earlier[0]] if len(earlier) else chr(ord("A") + len(set(groups))))
+
+    loud = energy >= np.percentile(energy, 60)
+    quiet = energy < 0.6 * energy.max()
+    hook_group = groups[int(np.argmax(energy))]
+    names = []
+    for i, group in enumerate(groups):
+        if quiet[i] and i == 0:
+            names.append("intro")
+        elif quiet[i] and i == len(groups) - 1 and i > 0:
+            names.append("outro")
+        elif group == hook_group or (loud[i] and not quiet[i]):
+            names.append("hook")
+        elif quiet[i]:
+            names.append("break")
+        else:
+            names.append("verse")
+    return groups, names
+
+
+def analyze_structure(feats, bpm):
+    """
+    {"sections": [{start, end, label, group, energy}], "energy": [...], "energy_hop": s}
+    from detect_audio_meta.features() and the detected bpm. Times are seconds
+    into the file; energy is loudness scaled to the loudest part (0..1).
+    """
+    sr = feats["sr"]
+    offset = feats["trim"][0] / sr
+    rms = librosa.feature.rms(y=feats["y"], hop_length=HOP_LENGTH)[0]
+    bars, bar_frames = _bar_features(feats, rms, bpm)
+    bar_seconds = bar_frames * HOP_LENGTH / sr
+
+    # z-scored per feature, with the 12 chroma bins turned down so harmony alone
+    # doesn't drown out the drums dropping in or the level jumping at a hook
+    z = (bars - bars.mean(axis=0)) / (bars.std(axis=0) + 1e-9)
+    z[:, :12] *= CHROMA_WEIGHT
+    unit = z / (np.linalg.norm(z, axis=1, keepdims=True) + 1e-9)
+    similarity = unit @ unit.T
+
+    width = min(KERNEL_BARS, len(bars) - len(bars) % 2)
+    cuts = _boundaries(_novelty(similarity, width)) if width >= 2 else [0]
+    edges = cuts + [len(bars)]
+
+    loudness = bars[:, -1]
+    # sections are grouped on what they play (chroma, onsets), labelled on how loud they are
+    means = np.stack([z[a:b, :-1].mean(axis=0) for a, b in zip(edges, edges[1:])])
+    energy = np.array([loudness[a:b].mean() for a, b in zip(edges, edges[1:])])
+    energy = energy / (energy.max() + 1e-9)
+    groups, names = _labels(means, energy)
+
+    duration = (feats["trim"][1] - feats["trim"][0]) / sr
+    sections = [{
+        "start": round(offset + a * bar_seconds, 2),
+        "end": round(offset + min(b * bar_seconds, duration), 2),
+        "label": name,
+        "group": group,
+        "energy": round(float(e), 3),
+    } for a, b, name, group, e in zip(edges, edges[1:], names, groups, energy)]
+
+    # loudness curve of the whole file, ENERGY_HOP seconds per point
+    per_point = max(1, int(ENERGY_HOP * sr / HOP_LENGTH))
+    usable = len(rms) // per_point * per_point
+    curve = rms[:usable].reshape(-1, per_point).mean(axis=1) if usable else rms
+    curve = curve / (curve.max() + 1e-9)
+    return {"sections": sections, "energy": [round(float(v), 3) for v in curve], "energy_hop": ENERGY_HOP}
+
+
+if __name__ == "__main__":
+    from detect_audio_meta import analyze
+
+    for path in sys.argv[1:]:
+        analysis = analyze(path)
+        print(f"{path}: {analysis['bpm']} BPM, {analysis['key']}")
+        for s in analysis["structure"]["sections"]:
+            print(f"  {s['start']:7.2f} - {s['end']:7.2f}  {s['label']:6s} {s['group']}  energy {s['energy']:.2f}")
@@ -0,0 +1,63 @@
+"""Local stand-ins for the remote services the pipeline talks to."""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Base handler: JSON helpers plus the latency/failure knobs set on the server."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def read_json(self):
+        body = self.read_body()
+        return json.loads(body) if body else {}
+
+    def send_json(self, status, body=None, headers=None):
+        data = json.dumps(body if body is not None else {}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_bytes(self, status, data, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def injected_failure(self):
+        """Sleep for the configured latency; return True (after replying 503) if this call should fail."""
+        latency = getattr(self.server, "latency", 0.0)
+        if latency:
+            time.sleep(latency)
+        if random.random() < getattr(self.server, "failure_rate", 0.0):
+            self.read_body()
+            self.send_json(503, {"error": "injected failure"})
+            return True
+        return False
+
+
+def serve(handler, host="127.0.0.1", port=0, latency=0.0, failure_rate=0.0, **state):
+    """Start a stand-in on a background thread and return (server, base_url)."""
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.failure_rate = failure_rate
+    for name, value in state.items():
+        setattr(server, name, value)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
@@ -0,0 +1,108 @@
+"""
+Stand-in for the BeatStars Studio API used by beatstars_http.py.
+
+    python -m standins.beatstars_api 8765
+    BEATSTARS_API_URL=http://127.0.0.1:8765 BEATSTARS_BACKEND=http python orchestrator.py
+"""
+import itertools
+import re
+import sys
+import threading
+import uuid
+
+from standins import StandInHandler, serve
+
+_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+)|bytes \*/0")
+
+
+class BeatStarsAPIHandler(StandInHandler):
+
+    def _authorized(self):
+        if self.headers.get("Authorization") or self.headers.get("Cookie"):
+            return True
+        self.read_body()
+        self.send_json(401, {"error": "not logged in"})
+        return False
+
+    def do_POST(self):
+        if self.injected_failure() or not self._authorized():
+            return
+        state = self.server
+        parts = self.path.strip("/").split("/")
+
+        if parts == ["tracks"]:
+            track_id = f"TK{next(state.ids)}"
+            with state.lock:
+                state.tracks[track_id] = {"id": track_id, "assets": {}, "fields": {}, "published": False}
+            return self.send_json(201, {"id": track_id})
+
+        if len(parts) == 4 and parts[0] == "tracks" and parts[2] == "assets":
+            track = state.tracks.get(parts[1])
+            if not track:
+                return self.send_json(404, {"error": "no such track"})
+            meta = self.read_json()
+            upload_id = uuid.uuid4().hex
+            with state.lock:
+                state.uploads[upload_id] = {"track": parts[1], "kind": parts[3], "meta": meta, "received": 0}
+            host = self.headers.get("Host")
+            return self.send_json(200, {"upload_url": f"http://{host}/uploads/{upload_id}", "chunk_size": state.chunk_size})
+
+        if len(parts) == 3 and parts[0] == "tracks" and parts[2] == "publish":
+            track = state.tracks.get(parts[1])
+            if not track:
+                return self.send_json(404, {"error": "no such track"})
+            track["published"] = True
+            return self.send_json(200, {"shortlink": f"https://bsta.rs/{parts[1].lower()}"})
+
+        self.send_json(404, {"error": "unknown endpoint"})
+
+    def do_PUT(self):
+        if self.injected_failure() or not self._authorized():
+            return
+        state = self.server
+        parts = self.path.strip("/").split("/")
+        upload = state.uploads.get(parts[1]) if len(parts) == 2 and parts[0] == "uploads" else None
+        if not upload:
+            self.read_body()
+            return self.send_json(404, {"error": "no such upload"})
+
+        data = self.read_body()
+        match = _RANGE.match(self.headers.get("Content-Range", ""))
+        if not match:
+            return self.send_json(400, {"error": "missing Content-Range"})
+        start = int(match.group(1) or 0)
+        if start != upload["received"]:
+            return self.send_json(409, {"error": f"expected offset {upload['received']}"})
+        upload["received"] += len(data)
+
+        size = upload["meta"].get("size", 0)
+        if upload["received"] < size:
+            return self.send_json(200, {"received": upload["received"]})
+        asset_id = uuid.uuid4().hex
+        with state.lock:
+            state.tracks[upload["track"]]["assets"][upload["kind"]] = asset_id
+        self.send_json(200, {"asset_id": asset_id, "received": upload["received"]})
+
+    def do_PATCH(self):
+        if self.injected_failure() or not self._authorized():
+            return
+        parts = self.path.strip("/").split("/")
+        track = self.server.tracks.get(parts[1]) if len(parts) == 2 and parts[0] == "tracks" else None
+        if not track:
+            self.read_body()
+            return self.send_json(404, {"error": "no such track"})
+        track["fields"].update(self.read_json())
+        self.send_json(200, track)
+
+
+def start(port=0, chunk_size=1024 * 1024, latency=0.0, failure_rate=0.0):
+    return serve(
+        BeatStarsAPIHandler, port=port, latency=latency, failure_rate=failure_rate,
+        tracks={}, uploads={}, ids=itertools.count(1), lock=threading.Lock(), chunk_size=chunk_size,
+    )
+
+
+if __name__ == "__main__":
+    server, url = start(port=int(sys.argv[1]) if len(sys.argv) > 1 else 8765)
+    print(f"BeatStars API stand-in listening on {url}")
+    threading.Event().wait()
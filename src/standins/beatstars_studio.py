@@ -0,0 +1,96 @@
+"""
+Stand-in for the BeatStars Studio web app, for the Playwright flow in upload_to_beatstars.py.
+Serves a static mock page (beatstars_studio.html) with the same Uppy inputs,
+menus, "Changes Saved" indicator and publish/shortlink modal the flow waits
+for, plus the small JSON API the page uploads assets to.
+
+    python -m standins.beatstars_studio 8768
+    BEATSTARS_STUDIO_URL=http://127.0.0.1:8768 python orchestrator.py
+"""
+import itertools
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from standins import StandInHandler, serve
+
+PAGE = Path(__file__).resolve().parent / "beatstars_studio.html"
+
+
+class BeatStarsStudioHandler(StandInHandler):
+
+    def do_GET(self):
+        state = self.server
+        path = self.path.split("?")[0].rstrip("/")
+
+        if path == "/content/tracks/uploaded/new":
+            track_id = f"TK{next(state.ids)}"
+            with state.lock:
+                state.tracks[track_id] = {"id": track_id, "assets": {}, "fields": {}, "shortlink": None}
+            self.send_response(302)
+            self.send_header("Location", f"/content/tracks/uploaded/{track_id}")
+            self.send_header("Content-Length", "0")
+            return self.end_headers()
+
+        if path == "/dashboard" or path.startswith("/content/tracks/uploaded/"):
+            return self.send_bytes(200, PAGE.read_bytes(), "text/html; charset=utf-8")
+
+        if path.startswith("/api/tracks/"):
+            if self.injected_failure():
+                return
+            track = state.tracks.get(path.split("/")[3])
+            return self.send_json(200, track) if track else self.send_json(404, {"error": "no such track"})
+
+        self.send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.injected_failure():
+            return
+        state = self.server
+        parts = self.path.strip("/").split("/")
+        track = state.tracks.get(parts[2]) if len(parts) > 2 and parts[:2] == ["api", "tracks"] else None
+        if not track:
+            self.read_body()
+            return self.send_json(404, {"error": "no such track"})
+
+        if len(parts) == 5 and parts[3] == "assets":
+            data = self.read_body()
+            if state.bandwidth:
+                time.sleep(len(data) / state.bandwidth)
+            asset_id = uuid.uuid4().hex
+            with state.lock:
+                track["assets"][parts[4]] = {"id": asset_id, "size": len(data)}
+            return self.send_json(200, {"asset_id": asset_id})
+
+        if len(parts) == 4 and parts[3] == "publish":
+            track["shortlink"] = f"https://bsta.rs/{track['id'].lower()}"
+            return self.send_json(200, {"shortlink": track["shortlink"]})
+
+        self.send_json(404, {"error": "unknown endpoint"})
+
+    def do_PATCH(self):
+        if self.injected_failure():
+            return
+        parts = self.path.strip("/").split("/")
+        track = self.server.tracks.get(parts[2]) if len(parts) == 3 and parts[:2] == ["api", "tracks"] else None
+        if not track:
+            self.read_body()
+            return self.send_json(404, {"error": "no such track"})
+        track["fields"].update(self.read_json())
+        self.send_json(200, track)
+
+
+def start(port=0, latency=0.0, failure_rate=0.0, bandwidth=0):
+    """Latency and failures apply to the page's API calls; bandwidth caps asset uploads in bytes/s."""
+    return serve(
+        BeatStarsStudioHandler, port=port, latency=latency, failure_rate=failure_rate,
+        tracks={}, ids=itertools.count(1), lock=threading.Lock(), bandwidth=bandwidth,
+    )
+
+
+if __name__ == "__main__":
+    server, url = start(port=int(sys.argv[1]) if len(sys.argv) > 1 else 8768)
+    print(f"BeatStars Studio stand-in listening on {url}/dashboard")
+    threading.Event().wait()
@@ -0,0 +1,70 @@
+"""
+Stand-in for Gemini's generateContent (REST transport) as used by gen_metadata.py.
+Replies with schema-valid metadata built from the artist and tags in the prompt.
+
+    python -m standins.gemini_api 8767
+    GEMINI_API_ENDPOINT=http://127.0.0.1:8767 python orchestrator.py
+"""
+import json
+import random
+import re
+import sys
+import threading
+
+from standins import StandInHandler, serve
+
+NAMES = ["ASTROVIBES", "NIGHTSHIFT", "GLASS HEART", "LOW ORBIT", "NEON RAIN", "COLD SUMMER", "AFTERGLOW"]
+_PROMPT = re.compile(r"trending tags for (?P<artist>.+?) right now: (?P<tags>[^\n]*)")
+
+
+def fake_metadata(prompt):
+    """Metadata shaped like gen_metadata.response_schema, derived from the prompt."""
+    match = _PROMPT.search(prompt)
+    artist = match.group("artist") if match else "Artist"
+    tags = [t.strip() for t in match.group("tags").split(",") if t.strip()] if match else []
+    return {
+        "title": f"[FREE] {artist.upper()} TYPE BEAT - '{random.choice(NAMES)}'",
+        "bs_tags": [artist.lower(), "trap", "type beat"],
+        "yt_tags": tags[:25] or [f"{artist.lower()} type beat"],
+        "description": f"Beat inspired by {artist}, Hope y'all like it!",
+        "tags": tags,
+        "short_hashtags": f"#{re.sub(r'[^a-z0-9]', '', artist.lower())}typebeat #typebeat",
+    }
+
+
+class GeminiAPIHandler(StandInHandler):
+
+    def do_POST(self):
+        if self.injected_failure():
+            return
+        if ":generateContent" not in self.path:
+            self.read_body()
+            return self.send_json(404, {"error": {"code": 404, "message": "unknown endpoint"}})
+        if "key=" not in self.path and not self.headers.get("x-goog-api-key"):
+            self.read_body()
+            return self.send_json(403, {"error": {"code": 403, "message": "API key missing"}})
+
+        request = self.read_json()
+        prompt = " ".join(
+            part.get("text", "") for content in request.get("contents", []) for part in content.get("parts", [])
+        )
+        text = json.dumps(fake_metadata(prompt), ensure_ascii=False)
+        self.send_json(200, {
+            "candidates": [{
+                "content": {"role": "model", "parts": [{"text": text}]},
+                "finishReason": "STOP",
+                "index": 0,
+            }],
+            "usageMetadata": {"promptTokenCount": len(prompt) // 4, "candidatesTokenCount": len(text) // 4,
+                              "totalTokenCount": (len(prompt) + len(text)) // 4},
+        })
+
+
+def start(port=0, latency=0.0, failure_rate=0.0):
+    return serve(GeminiAPIHandler, port=port, latency=latency, failure_rate=failure_rate)
+
+
+if __name__ == "__main__":
+    server, url = start(port=int(sys.argv[1]) if len(sys.argv) > 1 else 8767)
+    print(f"Gemini API stand-in listening on {url}")
+    threading.Event().wait()
@@ -0,0 +1,223 @@
+"""
+Stand-in for the parts of the YouTube Data API (and Google's OAuth token
+endpoint) the pipeline uses: search/videos.list for get_tags.py, resumable
+videos.insert, videos.update and thumbnails.set.
+
+    python -m standins.youtube_api 8766
+    YOUTUBE_API_ENDPOINT=http://127.0.0.1:8766 GOOGLE_TOKEN_URI=http://127.0.0.1:8766/token python orchestrator.py
+"""
+import itertools
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit, parse_qs
+
+from standins import StandInHandler, serve
+
+_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+|\*)|bytes \*/(\d+)")
+SCOPES = ["https://www.googleapis.com/auth/youtube.upload", "https://www.googleapis.com/auth/youtube.readonly",
+          "https://www.googleapis.com/auth/youtube.force-ssl"]
+TAG_WORDS = ["type beat", "free type beat", "instrumental", "trap beat", "beat 2026", "type beat 2026", "hard beat"]
+
+
+class YouTubeAPIHandler(StandInHandler):
+
+    def _route(self):
+        parts = urlsplit(self.path)
+        return parts.path.rstrip("/"), {k: v[0] for k, v in parse_qs(parts.query).items()}
+
+    def _authorized(self, query):
+        if self.headers.get("Authorization") or query.get("key"):
+            return True
+        self.read_body()
+        self.send_json(401, {"error": {"code": 401, "message": "Login Required"}})
+        return False
+
+    def _throttle(self, size):
+        """Simulated upstream bandwidth for uploaded bytes."""
+        bandwidth = self.server.bandwidth
+        if bandwidth:
+            time.sleep(size / bandwidth)
+
+    # ---------- reads ----------
+
+    def do_GET(self):
+        path, query = self._route()
+        if self.injected_failure() or not self._authorized(query):
+            return
+        state = self.server
+
+        if path == "/youtube/v3/search":
+            items = []
+            now = datetime.now(timezone.utc)
+            for _ in range(int(query.get("maxResults", 5))):
+                video_id = self._new_video_id()
+                published = now - timedelta(days=random.randint(0, 180))
+                words = random.sample(TAG_WORDS, 4)
+                q = query.get("q", "").replace(" type beat", "")
+                video = {
+                    "id": video_id,
+                    "snippet": {
+                        "title": f"[FREE] {q} Type Beat",
+                        "publishedAt": published.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                        "tags": [f"{q} {w}" for w in words] + words,
+                    },
+                }
+                with state.lock:
+                    state.videos[video_id] = video
+                items.append({"id": {"kind": "youtube#video", "videoId": video_id}, "snippet": video["snippet"]})
+            return self.send_json(200, {"kind": "youtube#searchListResponse", "items": items})
+
+        if path == "/youtube/v3/videos":
+            ids = [i for i in query.get("id", "").split(",") if i]
+            items = [self._video_resource(state.videos[i]) for i in ids if i in state.videos]
+            return self.send_json(200, {"kind": "youtube#videoListResponse", "items": items})
+
+        if path == "/youtube/v3/channels":
+            return self.send_json(200, {"items": [{"id": "UCstandin", "contentDetails": {
+                "relatedPlaylists": {"uploads": "UUstandin"}}}]})
+
+        self.send_json(404, {"error": {"code": 404, "message": "unknown endpoint"}})
+
+    def _new_video_id(self):
+        return f"sv{next(self.server.ids):09d}"
+
+    def _video_resource(self, video):
+        resource = {"kind": "youtube#video", **video}
+        resource.setdefault("status", {"privacyStatus": "public", "uploadStatus": "processed"})
+        # processing finishes after a while, so the status watcher has something to poll
+        done = time.time() - video.get("uploaded", 0) >= self.server.processing_seconds
+        resource["processingDetails"] = {"processingStatus": "succeeded" if done else "processing"}
+        if done and resource["status"].get("uploadStatus") == "uploaded":
+            resource["status"] = {**resource["status"], "uploadStatus": "processed"}
+        return resource
+
+    # ---------- writes ----------
+
+    def do_POST(self):
+        path, query = self._route()
+        if self.injected_failure():
+            return
+        state = self.server
+
+        if path == "/token":
+            form = parse_qs(self.read_body().decode())
+            return self.send_json(200, {"access_token": f"ya29.standin-{uuid.uuid4().hex}", "expires_in": 3599,
+                                        "token_type": "Bearer", "scope": " ".join(form.get("scope", SCOPES))})
+
+        if not self._authorized(query):
+            return
+
+        if path == "/upload/youtube/v3/videos" and query.get("uploadType") == "resumable":
+            upload_id = uuid.uuid4().hex
+            with state.lock:
+                state.uploads[upload_id] = {
+                    "body": self.read_json(), "received": 0,
+                    "size": self.headers.get("X-Upload-Content-Length"),
+                }
+            host = self.headers.get("Host")
+            return self.send_json(200, {}, headers={
+                "Location": f"http://{host}/upload/youtube/v3/videos?uploadType=resumable&upload_id={upload_id}",
+            })
+
+        if path == "/upload/youtube/v3/thumbnails/set":
+            data = self.read_body()
+            self._throttle(len(data))
+            video = state.videos.get(query.get("videoId"))
+            if not video:
+                return self.send_json(404, {"error": {"code": 404, "message": "videoNotFound"}})
+            video["thumbnail_bytes"] = len(data)
+            return self.send_json(200, {"kind": "youtube#thumbnailSetResponse", "items": [
+                {"default": {"url": f"https://i.ytimg.com/vi/{video['id']}/default.jpg"}}]})
+
+        self.read_body()
+        self.send_json(404, {"error": {"code": 404, "message": "unknown endpoint"}})
+
+    def do_PUT(self):
+        path, query = self._route()
+        if self.injected_failure():
+            return
+        state = self.server
+
+        if path == "/upload/youtube/v3/videos" and "upload_id" in query:
+            upload = state.uploads.get(query["upload_id"])
+            if not upload:
+                self.read_body()
+                return self.send_json(404, {"error": {"code": 404, "message": "upload session not found"}})
+            data = self.read_body()
+            self._throttle(len(data))
+            match = _RANGE.match(self.headers.get("Content-Range", ""))
+            if match and match.group(4) is not None:
+                # "bytes */total": the client asks how much we already have
+                total = int(match.group(4))
+            elif match:
+                start, total = int(match.group(1)), match.group(3)
+                if start != upload["received"]:
+                    return self._resume_incomplete(upload)
+                upload["received"] += len(data)
+                total = None if total == "*" else int(total)
+            else:
+                # single-request media (no Content-Range)
+                upload["received"] += len(data)
+                total = upload["received"]
+            if total is None or upload["received"] < total:
+                return self._resume_incomplete(upload)
+            return self.send_json(200, self._finish_upload(upload))
+
+        if path == "/youtube/v3/videos":
+            if not self._authorized(query):
+                return
+            body = self.read_json()
+            video = state.videos.get(body.get("id"))
+            if not video:
+                return self.send_json(404, {"error": {"code": 404, "message": "videoNotFound"}})
+            for part in query.get("part", "snippet").split(","):
+                if part in body:
+                    video[part] = body[part]
+            return self.send_json(200, self._video_resource(video))
+
+        self.read_body()
+        self.send_json(404, {"error": {"code": 404, "message": "unknown endpoint"}})
+
+    def _resume_incomplete(self, upload):
+        self.send_response(308)
+        if upload["received"]:
+            self.send_header("Range", f"bytes=0-{upload['received'] - 1}")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _finish_upload(self, upload):
+        state = self.server
+        if "video_id" not in upload:
+            video_id = self._new_video_id()
+            body = upload["body"]
+            video = {
+                "id": video_id,
+                "snippet": body.get("snippet", {}),
+                "status": {**body.get("status", {}), "uploadStatus": "uploaded"},
+                "size": upload["received"],
+                "uploaded": time.time(),
+            }
+            with state.lock:
+                state.videos[video_id] = video
+            upload["video_id"] = video_id
+        return self._video_resource(state.videos[upload["video_id"]])
+
+
+def start(port=0, latency=0.0, failure_rate=0.0, bandwidth=0, processing_seconds=0.0):
+    """bandwidth caps uploads in bytes/s (0 = unlimited)."""
+    return serve(
+        YouTubeAPIHandler, port=port, latency=latency, failure_rate=failure_rate,
+        videos={}, uploads={}, ids=itertools.count(1), lock=threading.Lock(),
+        bandwidth=bandwidth, processing_seconds=processing_seconds,
+    )
+
+
+if __name__ == "__main__":
+    server, url = start(port=int(sys.argv[1]) if len(sys.argv) > 1 else 8766)
+    print(f"YouTube API stand-in listening on {url}")
+    threading.Event().wait()
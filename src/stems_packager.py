@@ -0,0 +1,213 @@
+"""
+Build the stems zip BeatStars wants from a folder of stem files.
+
+    python stems_packager.py data/stems/don_toliver/ALLIANCE_135_VIRTHY_KVIT
+
+Stems for a beat live either as a ready-made data/stems/<artist>/<beat>.zip
+or as a folder data/stems/<artist>/<beat>/ with the loose files. A folder is
+packaged into cache/stems/<key>/<beat>.zip, where <key> hashes the names and
+contents of its stems, so an unchanged folder is never zipped twice.
+
+An unchanged folder is recognised from the names, sizes and mtimes of its
+stems alone (cache/stems/index.json maps that to the content key), so only
+a folder that was touched gets hashed again.
+
+Entries are streamed into the archive in chunks (no temp copies, no whole
+files in memory). Already-compressed formats are STOREd; everything else gets
+deflate level 1 only if a sample of it actually shrinks, since PCM audio
+rarely does. Hashing and sampling run one thread per stem, and while an entry
+is being written the next chunks are already being read in the background.
+"""
+import hashlib
+import json
+import os
+import queue
+import sys
+import threading
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import tracing
+from file_lock import locked
+from library_index import file_hash
+
+BASE_DIR = Path(__file__).resolve().parent
+
+# ===== CONFIG =====
+
+CACHE_DIR = BASE_DIR / "cache" / "stems"
+INDEX_FILE = CACHE_DIR / "index.json"    # stat key -> content key of already packaged folders
+# formats that are already compressed: deflating them only costs CPU
+STORED_EXTENSIONS = {'.mp3', '.m4a', '.aac', '.ogg', '.opus', '.flac', '.wma', '.zip', '.rar', '.7z',
+                     '.jpg', '.jpeg', '.png', '.webp', '.mp4'}
+DEFLATE_LEVEL = 1
+SAMPLE_BYTES = 1024 * 1024     # how much of a file is test-compressed before choosing DEFLATE
+MIN_SAVING = 0.10              # DEFLATE only if the sample shrinks by at least this much
+CHUNK_SIZE = 4 * 1024 * 1024
+PREFETCH_CHUNKS = 4
+MAX_WORKERS = int(os.getenv("STEMS_WORKERS", "4"))
+# ===================
+
+
+def stem_files(folder):
+    """Every regular, non-hidden file under folder, sorted by archive name."""
+    folder = Path(folder)
+    files = [p for p in folder.rglob("*")
+             if p.is_file() and not any(part.startswith(".") for part in p.relative_to(folder).parts)]
+    return sorted(files, key=lambda p: p.relative_to(folder).as_posix().lower())
+
+
+STORED = (zipfile.ZIP_STORED, None)
+DEFLATED = (zipfile.ZIP_DEFLATED, DEFLATE_LEVEL)
+
+
+def _compression(path):
+    """(method, level) for one stem: STORED or DEFLATED, from its extension or a test-compressed sample."""
+    if path.suffix.lower() in STORED_EXTENSIONS:
+        return STORED
+    with open(path, "rb") as f:
+        # sample from the middle, past headers and any leading silence
+        size = os.fstat(f.fileno()).st_size
+        f.seek(max(0, size // 2 - SAMPLE_BYTES // 2))
+        sample = f.read(SAMPLE_BYTES)
+    if not sample:
+        return STORED
+    saving = 1 - len(zlib.compress(sample, DEFLATE_LEVEL)) / len(sample)
+    return DEFLATED if saving >= MIN_SAVING else STORED
+
+
+def _stat_key(folder, files):
+    """Cheap key of a folder's stems from names, sizes and mtimes only (no reads)."""
+    key = hashlib.blake2b(digest_size=16)
+    for path in files:
+        st = path.stat()
+        key.update(f"{path.relative_to(folder).as_posix()}\0{st.st_size}\0{st.st_mtime_ns}\n".encode())
+    return key.hexdigest()
+
+
+def _load_index():
+    try:
+        with open(INDEX_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _remember(stat_key, content_key):
+    with locked(INDEX_FILE):
+        index = _load_index()
+        index[stat_key] = content_key
+        INDEX_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp = INDEX_FILE.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp, INDEX_FILE)
+
+
+def _inspect(path):
+    return file_hash(path), _compression(path)
+
+
+def _prefetch(files):
+    """Yield (path, chunks) with the chunks read ahead by a background thread."""
+    chunks = queue.Queue(maxsize=PREFETCH_CHUNKS)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                return chunks.put(item, timeout=0.5)
+            except queue.Full:
+                pass
+
+    def reader():
+        try:
+            for path in files:
+                with open(path, "rb") as f:
+                    for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                        put(chunk)
+                        if stop.is_set():
+                            return
+                put(done)
+        except Exception as e:
+            put(e)
+
+    def entry():
+        while True:
+            item = chunks.get()
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    threading.Thread(target=reader, daemon=True).start()
+    try:
+        for path in files:
+            yield path, entry()
+    finally:
+        # a failed write abandons the rest; let the reader close its file and exit
+        stop.set()
+
+
+def package(folder, name=None):
+    """
+    Zip a folder of stems and return the archive path (cached by content).
+    name is the archive's file name without .zip, defaulting to the folder name.
+    """
+    folder = Path(folder)
+    name = name or folder.name
+    files = stem_files(folder)
+    if not files:
+        raise FileNotFoundError(f"No stem files in {folder}")
+
+    with tracing.span("stems.package", stems=len(files)) as sp:
+        stat_key = _stat_key(folder, files)
+        known = _load_index().get(stat_key)
+        if known and (CACHE_DIR / known / f"{name}.zip").exists():
+            sp.count("cache_hits")
+            out_path = CACHE_DIR / known / f"{name}.zip"
+            print(f"[INFO] Stems zip up to date: {out_path}")
+            return str(out_path)
+
+        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(files))) as pool:
+            inspected = list(pool.map(_inspect, files))
+
+        key = hashlib.blake2b(digest_size=16)
+        for path, (digest, _) in zip(files, inspected):
+            key.update(f"{path.relative_to(folder).as_posix()}\0{digest}\n".encode())
+        out_path = CACHE_DIR / key.hexdigest() / f"{name}.zip"
+        if out_path.exists():
+            # touched but unchanged: same content, so the same zip
+            sp.count("cache_hits")
+            _remember(stat_key, key.hexdigest())
+            print(f"[INFO] Stems zip up to date: {out_path}")
+            return str(out_path)
+
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = out_path.with_suffix(f".{os.getpid()}.tmp")
+        compress = {path: method for path, (_, method) in zip(files, inspected)}
+        with zipfile.ZipFile(tmp, "w") as zf:
+            for path, chunks in _prefetch(files):
+                size = path.stat().st_size
+                # entries opened by name take their method and level from the ZipFile
+                zf.compression, zf.compresslevel = compress[path]
+                with zf.open(path.relative_to(folder).as_posix(), "w",
+                             force_zip64=size > zipfile.ZIP64_LIMIT) as entry:
+                    for chunk in chunks:
+                        entry.write(chunk)
+                sp.count("bytes_read", size)
+        os.replace(tmp, out_path)
+        _remember(stat_key, key.hexdigest())
+        sp.count("bytes_written", out_path.stat().st_size)
+        stored = sum(method == STORED for method in compress.values())
+        print(f"[INFO] Packaged {len(files)} stems ({stored} stored) into {out_path}")
+        return str(out_path)
+
+
+if __name__ == "__main__":
+    for folder in sys.argv[1:]:
+        print(package(folder))
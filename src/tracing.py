@@ -0,0 +1,366 @@
+"""
+Spans and metrics for pipeline runs.
+
+    with tracing.span("youtube.upload", channel="main") as s:
+        ...
+        tracing.count("bytes_sent", n)      # adds to the innermost open span
+
+Every finished span is appended to cache/traces/spans.jsonl (one JSON object
+per line: trace/span/parent ids, name, start, duration, status, attrs and
+counters such as bytes, retries, cache hits and quota units). When the
+outermost span of a run ends, cumulative per-span metrics are rewritten as a
+Prometheus textfile (cache/traces/beat_pipeline.prom, or TRACE_PROM_FILE,
+e.g. inside node_exporter's textfile directory).
+
+    python tracing.py                    # p50/p95 per span across all runs
+    python tracing.py --since 7d --prefix stage.
+    python tracing.py --last             # the latest run as a tree
+
+The current span lives in a ContextVar, so nesting follows `with` blocks and
+asyncio tasks automatically; work handed to another thread keeps its parent
+only when run through contextvars.copy_context().
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+from inspect import iscoroutinefunction
+from pathlib import Path
+
+from file_lock import locked
+
+BASE_DIR = Path(__file__).resolve().parent
+
+# ===== CONFIG =====
+
+TRACE_DIR = BASE_DIR / "cache" / "traces"
+TRACE_FILE = TRACE_DIR / "spans.jsonl"
+METRICS_FILE = TRACE_DIR / "metrics.json"
+PROM_FILE = Path(os.getenv("TRACE_PROM_FILE") or TRACE_DIR / "beat_pipeline.prom")
+ENABLED = os.getenv("TRACING", "1") != "0"
+# spans.jsonl is moved to spans.jsonl.1 past this size
+MAX_TRACE_BYTES = 50 * 1024 * 1024
+METRIC_PREFIX = "beat_pipeline"
+# ===================
+
+_current = ContextVar("tracing_span", default=None)
+_lock = threading.Lock()
+
+
+class Span:
+
+    def __init__(self, name, parent=None, attrs=None):
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.attrs = dict(attrs or {})
+        self.counters = {}
+        self.started_at = datetime.now(timezone.utc)
+        self._start = time.perf_counter()
+        self.duration = None
+        self.error = None
+        # finished descendants, kept on the root for the metrics rollup
+        self._finished = [] if parent is None else parent._finished
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def count(self, key, n=1):
+        self.counters[key] = self.counters.get(key, 0) + n
+
+    def record(self):
+        return {
+            "trace": self.trace_id,
+            "span": self.span_id,
+            "parent": self.parent.span_id if self.parent else None,
+            "name": self.name,
+            "start": self.started_at.strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+            "duration": round(self.duration, 6),
+            "status": "error" if self.error else "ok",
+            "error": self.error,
+            "attrs": self.attrs,
+            "counters": self.counters,
+            "thread": threading.current_thread().name,
+        }
+
+
+@contextmanager
+def span(name, **attrs):
+    """Open a child of the current span (or a new trace) for the duration of the block."""
+    current = Span(name, _current.get(), attrs)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"[:500]
+        raise
+    finally:
+        _current.reset(token)
+        current.duration = time.perf_counter() - current._start
+        if ENABLED:
+            _finish(current)
+
+
+def traced(name=None):
+    """Decorator: run the function (sync or async) inside a span named after it."""
+    def decorate(func):
+        span_name = name or func.__qualname__
+        if iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def current():
+    return _current.get()
+
+
+def count(key, n=1):
+    """Add n to a counter (bytes_sent, retries, cache_hits, quota_units, ...) of the current span."""
+    s = _current.get()
+    if s is not None:
+        s.count(key, n)
+
+
+def annotate(**attrs):
+    s = _current.get()
+    if s is not None:
+        s.set(**attrs)
+
+
+class Stages:
+    """
+    Back-to-back spans for the stages of a run: enter(name) ends the previous
+    stage and starts the next one; leaving the block ends the last.
+    """
+
+    def __init__(self, prefix="stage."):
+        self.prefix = prefix
+        self._open = None
+
+    def enter(self, name):
+        self._close(None)
+        self._open = span(self.prefix + name)
+        self._open.__enter__()
+
+    def _close(self, exc):
+        if self._open is not None:
+            cm, self._open = self._open, None
+            cm.__exit__(type(exc) if exc else None, exc, exc.__traceback__ if exc else None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._close(exc)
+        return False
+
+
+# ===========================================
+# Export
+# ===========================================
+def _finish(s):
+    line = json.dumps(s.record(), default=str)
+    with _lock:
+        os.makedirs(TRACE_DIR, exist_ok=True)
+        if TRACE_FILE.exists() and TRACE_FILE.stat().st_size > MAX_TRACE_BYTES:
+            os.replace(TRACE_FILE, TRACE_FILE.with_name(TRACE_FILE.name + ".1"))
+        with open(TRACE_FILE, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+    s._finished.append(s)
+    if s.parent is None:
+        try:
+            _update_metrics(s)
+        except OSError as e:
+            print(f"[WARN] Could not write metrics: {e}")
+
+
+def _update_metrics(root):
+    """Fold a finished run into the cumulative metrics and rewrite the Prometheus textfile."""
+    # the pipeline, GUI workers and the scheduler are separate processes folding into one file
+    with locked(METRICS_FILE):
+        try:
+            with open(METRICS_FILE, "r", encoding="utf-8") as f:
+                metrics = json.load(f)
+        except (FileNotFoundError, ValueError):
+            metrics = {"spans": {}}
+        for s in root._finished:
+            m = metrics["spans"].setdefault(s.name, {"count": 0, "errors": 0, "seconds": 0.0, "counters": {}})
+            m["count"] += 1
+            m["errors"] += bool(s.error)
+            m["seconds"] += s.duration
+            m["last_seconds"] = s.duration
+            for key, value in s.counters.items():
+                m["counters"][key] = m["counters"].get(key, 0) + value
+        metrics["last_run"] = {"name": root.name, "timestamp": time.time(), "seconds": root.duration,
+                               "success": not root.error}
+        _atomic_write(METRICS_FILE, json.dumps(metrics, indent=2))
+        _atomic_write(PROM_FILE, render_prometheus(metrics))
+
+
+def _atomic_write(path, text):
+    os.makedirs(path.parent, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def render_prometheus(metrics):
+    p = METRIC_PREFIX
+    lines = []
+
+    def family(name, kind, help_text, samples):
+        lines.append(f"# HELP {p}_{name} {help_text}")
+        lines.append(f"# TYPE {p}_{name} {kind}")
+        lines.extend(f"{p}_{name}{{{labels}}} {value}" for labels, value in samples)
+
+    spans = sorted(metrics["spans"].items())
+    family("span_seconds_total", "counter", "Time spent in spans, by span name.",
+           [(f'span="{_label(n)}"', round(m["seconds"], 6)) for n, m in spans])
+    family("span_count_total", "counter", "Finished spans, by span name.",
+           [(f'span="{_label(n)}"', m["count"]) for n, m in spans])
+    family("span_errors_total", "counter", "Spans that ended with an exception.",
+           [(f'span="{_label(n)}"', m["errors"]) for n, m in spans])
+    family("span_last_seconds", "gauge", "Duration of the latest span with this name.",
+           [(f'span="{_label(n)}"', round(m.get("last_seconds", 0.0), 6)) for n, m in spans])
+    family("span_counter_total", "counter", "Bytes, retries, cache hits, quota units... summed per span name.",
+           [(f'span="{_label(n)}",counter="{_label(k)}"', v) for n, m in spans for k, v in sorted(m["counters"].items())])
+    last = metrics.get("last_run")
+    if last:
+        family("last_run_timestamp_seconds", "gauge", "When the latest run ended.",
+               [(f'run="{_label(last["name"])}"', round(last["timestamp"], 3))])
+        family("last_run_seconds", "gauge", "Duration of the latest run.",
+               [(f'run="{_label(last["name"])}"', round(last["seconds"], 6))])
+        family("last_run_success", "gauge", "1 if the latest run finished without an exception.",
+               [(f'run="{_label(last["name"])}"', int(last["success"]))])
+    return "\n".join(lines) + "\n"
+
+
+# ===========================================
+# Summaries
+# ===========================================
+def load_spans(path=TRACE_FILE, since=None):
+    spans = []
+    for p in (path.with_name(path.name + ".1"), path):
+        if not p.exists():
+            continue
+        with open(p, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if since and record["start"] < since:
+                    continue
+                spans.append(record)
+    return spans
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def summarize(spans, prefix=""):
+    """{span name: count, errors, p50, p95, max, total seconds, summed counters}."""
+    groups = {}
+    for s in spans:
+        if s["name"].startswith(prefix):
+            groups.setdefault(s["name"], []).append(s)
+    summary = {}
+    for name, group in groups.items():
+        durations = [s["duration"] for s in group]
+        counters = {}
+        for s in group:
+            for key, value in s["counters"].items():
+                counters[key] = counters.get(key, 0) + value
+        summary[name] = {
+            "count": len(group), "errors": sum(s["status"] == "error" for s in group),
+            "p50": statistics.median(durations), "p95": _percentile(durations, 0.95),
+            "max": max(durations), "total": sum(durations), "counters": counters,
+        }
+    return summary
+
+
+def print_summary(summary):
+    grand_total = sum(s["total"] for name, s in summary.items() if "." not in name) or None
+    print(f"{'span':<28} {'n':>5} {'err':>4} {'p50':>9} {'p95':>9} {'max':>9} {'total':>10}  counters")
+    for name, s in sorted(summary.items(), key=lambda item: item[1]["total"], reverse=True):
+        counters = ", ".join(f"{k}={_human(k, v)}" for k, v in sorted(s["counters"].items()))
+        print(f"{name:<28} {s['count']:>5} {s['errors']:>4} {s['p50']:8.2f}s {s['p95']:8.2f}s "
+              f"{s['max']:8.2f}s {s['total']:9.1f}s  {counters}")
+    if grand_total:
+        print(f"\n{grand_total / 60:.1f} min in top-level runs")
+
+
+def _human(key, value):
+    if "bytes" in key:
+        return f"{value / 1e6:.1f}MB"
+    return f"{value:g}" if isinstance(value, float) else str(value)
+
+
+def print_tree(spans):
+    """The latest trace, children indented under their parent in start order."""
+    if not spans:
+        print("No spans recorded yet.")
+        return
+    trace = spans[-1]["trace"]
+    records = sorted((s for s in spans if s["trace"] == trace), key=lambda s: s["start"])
+    children = {}
+    for s in records:
+        children.setdefault(s["parent"], []).append(s)
+
+    def show(s, depth):
+        flag = " ERROR " + s["error"] if s["error"] else ""
+        counters = " ".join(f"{k}={_human(k, v)}" for k, v in s["counters"].items())
+        print(f"{'  ' * depth}{s['name']:<{max(1, 32 - 2 * depth)}} {s['duration']:8.2f}s  {counters}{flag}")
+        for child in children.get(s["span"], []):
+            show(child, depth + 1)
+
+    for root in children.get(None, []):
+        show(root, 0)
+
+
+def _since(value):
+    match = re.fullmatch(r"(\d+)([hd])", value or "")
+    if not match:
+        return None
+    delta = timedelta(hours=int(match.group(1))) if match.group(2) == "h" else timedelta(days=int(match.group(1)))
+    return (datetime.now(timezone.utc) - delta).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize recorded pipeline spans.")
+    parser.add_argument("--since", help="only spans started within e.g. 24h or 7d")
+    parser.add_argument("--prefix", default="", help="only span names starting with this, e.g. stage.")
+    parser.add_argument("--last", action="store_true", help="show the latest run as a tree")
+    args = parser.parse_args()
+
+    records = load_spans(since=_since(args.since))
+    if args.last:
+        print_tree(records)
+    else:
+        print_summary(summarize(records, args.prefix))
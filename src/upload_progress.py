@@ -0,0 +1,71 @@
+import json
+import os
+import re
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+
+# ===== CONFIG =====
+
+PROGRESS_DIR = BASE_DIR / "cache" / "beatstars_progress"
+# ===================
+
+
+def progress_path(beat_path, backend):
+    artist = os.path.basename(os.path.dirname(beat_path))
+    name = os.path.splitext(os.path.basename(beat_path))[0]
+    key = re.sub(r"[^A-Za-z0-9_-]+", "_", f"{artist}__{name}")
+    return PROGRESS_DIR / f"{key}.{backend}.json"
+
+
+def load_progress(beat_path, backend):
+    """
+    Return what an earlier, unfinished upload of this beat already did:
+    the draft it created, the steps it completed and the assets it sent.
+    """
+    path = progress_path(beat_path, backend)
+    if path.exists():
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                progress = json.load(f)
+            print(f"[INFO] Resuming BeatStars upload of {os.path.basename(beat_path)} "
+                  f"(done: {', '.join(progress.get('done', [])) or 'nothing'})")
+            return progress
+        except (OSError, ValueError) as e:
+            print(f"[WARN] Ignoring unreadable progress file {path}: {e}")
+    return new_progress(beat_path, backend)
+
+
+def new_progress(beat_path, backend):
+    return {"beat_path": str(beat_path), "backend": backend, "track_id": None, "draft_url": None,
+            "done": [], "assets": {}, "link": None}
+
+
+def save_progress(progress):
+    path = progress_path(progress["beat_path"], progress["backend"])
+    os.makedirs(path.parent, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(progress, f, indent=2)
+    os.replace(tmp, path)
+
+
+def mark_done(progress, step):
+    if step not in progress["done"]:
+        progress["done"].append(step)
+    save_progress(progress)
+
+
+def draft_id(beat_path, backend):
+    """The draft an unfinished upload of this beat already created on BeatStars, if any."""
+    try:
+        with open(progress_path(beat_path, backend), "r", encoding="utf-8") as f:
+            return json.load(f).get("track_id")
+    except (OSError, ValueError):
+        return None
+
+
+def clear_progress(beat_path, backend):
+    path = progress_path(beat_path, backend)
+    if path.exists():
+        path.unlink()
@@ -1,86 +1,162 @@
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dotenv import load_dotenv
 from pathlib import Path
+from network_filter import NetworkFilter
+from prep_image import derivative
+from upload_progress import load_progress, new_progress, mark_done, clear_progress, draft_id
+import asyncio
 import os, re, time, random
-from pathlib import Path
+import tracing
 
 BASE_DIR = Path(__file__).resolve().parent
 
+load_dotenv()
+
 # ===== CONFIG =====
 
-SESSION_FILE = BASE_DIR / "secrets" / "beatstars_session.json"
+SESSION_FILE = Path(os.getenv("BEATSTARS_SESSION_FILE", BASE_DIR / "secrets" / "beatstars_session.json"))
 STEMS_PATH = BASE_DIR / "data" / "stems"
+
+# Run Chromium without a window unless BEATSTARS_HEADLESS=0 (useful for debugging selectors)
+HEADLESS = os.getenv("BEATSTARS_HEADLESS", "1") != "0"
+# Artificial delay between Playwright actions, off by default (every wait is tied to a page condition)
+SLOW_MO = int(os.getenv("BEATSTARS_SLOW_MO", "0"))
+# How many tracks upload_many() drives at once (one browser context each)
+MAX_CONCURRENCY = int(os.getenv("BEATSTARS_CONCURRENCY", "2"))
+# "browser" drives Studio with Playwright, "http" calls the Studio API directly (see beatstars_http.py)
+BACKEND = os.getenv("BEATSTARS_BACKEND", "browser")
+# Where the browser flow opens Studio (standins/beatstars_studio.py serves a local mock of it)
+STUDIO_URL = (os.getenv("BEATSTARS_STUDIO_URL") or "https://studio.beatstars.com").rstrip("/")
 # ===================
 
+# Label of the upload the current task works on, used to tell interleaved logs apart
+_job_label = ContextVar("beatstars_job_label", default=None)
+
+# Every context records what the page copies instead of sharing the OS clipboard,
+# so parallel uploads can't read each other's shortlinks.
+CLIPBOARD_CAPTURE_JS = """
+(() => {
+  window.__bsCopiedText = null;
+  const remember = t => { window.__bsCopiedText = String(t); };
+  if (navigator.clipboard && navigator.clipboard.writeText) {
+    const original = navigator.clipboard.writeText.bind(navigator.clipboard);
+    navigator.clipboard.writeText = t => { remember(t); return original(t).catch(() => {}); };
+  }
+  const setData = DataTransfer.prototype.setData;
+  DataTransfer.prototype.setData = function (type, value) {
+    if (/text/.test(type)) remember(value);
+    return setData.call(this, type, value);
+  };
+  document.addEventListener('copy', () => {
+    const selected = String(document.getSelection() || '');
+    if (selected) remember(selected);
+  }, true);
+})();
+"""
+
 
 # ─────────────────────────────────────────────
 # Utility Functions
 # ─────────────────────────────────────────────
 
-def wait_for_any(page, selectors, timeout_ms=120_000, check_interval=500):
-    """Wait until any of the selectors appears."""
-    for _ in range(int(timeout_ms / check_interval)):
-        for sel in selectors:
-            if page.locator(sel).count() and page.locator(sel).first.is_visible():
-                return sel
-        page.wait_for_timeout(check_interval)
-    raise PlaywrightTimeoutError(f"None of {selectors} appeared within {timeout_ms} ms.")
+def log(msg):
+    """print() that prefixes the upload label when several uploads run at once."""
+    label = _job_label.get()
+    print(f"[{label}] {msg}" if label else msg)
+
+
+def _visible_any(page, selectors):
+    """One locator matching the visible elements of any of the selectors."""
+    combined = None
+    for sel in selectors:
+        loc = page.locator(f"{sel} >> visible=true")
+        combined = loc if combined is None else combined.or_(loc)
+    return combined
+
+
+async def wait_for_any(page, selectors, timeout_ms=120_000):
+    """Wait until any of the selectors appears and return the one that matched."""
+    try:
+        await _visible_any(page, selectors).first.wait_for(state="visible", timeout=timeout_ms)
+    except PlaywrightTimeoutError:
+        raise PlaywrightTimeoutError(f"None of {selectors} appeared within {timeout_ms} ms.")
+    for sel in selectors:
+        if await page.locator(f"{sel} >> visible=true").count():
+            return sel
+    return selectors[0]
 
 
-def wait_until_disappears(page, selectors, timeout_ms=300_000, check_interval=500):
+async def wait_until_disappears(page, selectors, timeout_ms=300_000):
     """Wait until all given selectors disappear or are hidden."""
-    for _ in range(int(timeout_ms / check_interval)):
-        if all(page.locator(sel).count() == 0 or not page.locator(sel).first.is_visible() for sel in selectors):
-            return True
-        page.wait_for_timeout(check_interval)
-    raise PlaywrightTimeoutError(f"{selectors} did not disappear within {timeout_ms} ms.")
+    try:
+        await _visible_any(page, selectors).first.wait_for(state="hidden", timeout=timeout_ms)
+    except PlaywrightTimeoutError:
+        raise PlaywrightTimeoutError(f"{selectors} did not disappear within {timeout_ms} ms.")
+    return True
 
 
-def retry_action(func, retries=3, delay=1500):
+async def retry_action(func, retries=3, delay=1500):
     """Retry an action a few times before failing."""
     for attempt in range(retries):
         try:
-            return func()
+            return await func()
         except Exception as e:
-            print(f"[WARN] Attempt {attempt+1}/{retries} failed: {e}")
-            time.sleep(delay / 1000)
+            log(f"[WARN] Attempt {attempt+1}/{retries} failed: {e}")
+            await asyncio.sleep(delay / 1000)
     raise RuntimeError(f"Action failed after {retries} retries.")
 
 
-def wait_changes_saved(page, timeout_ms=180_000):
+@contextmanager
+def timed_step(timings, name):
+    """Record how long a named step of the upload took (also traced as beatstars.<name>)."""
+    start = time.perf_counter()
+    try:
+        with tracing.span(f"beatstars.{name}"):
+            yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+
+
+def print_timings(timings):
+    if not timings:
+        return
+    log("\n[INFO] BeatStars step timings:")
+    for name, seconds in timings.items():
+        log(f"  {name:<14} {seconds:7.2f}s")
+    log(f"  {'total':<14} {sum(timings.values()):7.2f}s")
+
+
+async def wait_changes_saved(page, timeout_ms=180_000):
     """Wait until 'Changes Saved' message appears after metadata processing."""
     try:
-        wait_until_disappears(page, ["text=/Metadata Processing/i"], timeout_ms=timeout_ms)
+        await wait_until_disappears(page, ["text=/Metadata Processing/i"], timeout_ms=timeout_ms)
     except Exception:
         pass
-    page.locator("text=/Changes Saved/i").wait_for(state="visible", timeout=timeout_ms)
+    await page.locator("text=/Changes Saved/i").wait_for(state="visible", timeout=timeout_ms)
+
 
+async def _uppy_file_input(page, timeout_ms=20_000):
+    """Return the (hidden) Uppy file input once it is attached to the DOM."""
+    file_input = page.locator('input.uppy-Dashboard-input[type="file"]').first
+    try:
+        await file_input.wait_for(state="attached", timeout=timeout_ms)
+    except PlaywrightTimeoutError:
+        raise RuntimeError("Uppy input not found.")
+    return file_input
 
-def attach_via_uppy_in_current_modal(page, file_path):
+
+async def attach_via_uppy_in_current_modal(page, file_path):
     """Attach a file inside the open Uppy modal."""
-    page.wait_for_selector("text=/Upload file/i", timeout=20_000)
+    await page.wait_for_selector("text=/Upload file/i", timeout=20_000)
     try:
-        page.get_by_text("browse files", exact=False).click()
+        await page.get_by_text("browse files", exact=False).click(timeout=5_000)
     except Exception:
         pass
 
-    for _ in range(3):
-        inputs = page.query_selector_all('input.uppy-Dashboard-input[type="file"]')
-        if inputs:
-            break
-        page.wait_for_timeout(500)
-
-    if not inputs:
-        raise RuntimeError("Uppy input not found.")
-
-    file_input = inputs[0]
-    page.evaluate(
-        """el => { el.removeAttribute('hidden');
-                   el.style.display='block';
-                   el.style.visibility='visible';
-                   el.style.opacity=1; }""",
-        file_input
-    )
-    file_input.set_input_files(file_path)
+    # set_input_files works on hidden inputs, no need to reveal it first
+    await (await _uppy_file_input(page)).set_input_files(file_path)
 
 def check_allowed_limits(title,tags):
     TITLE_LIMIT = 60
@@ -93,325 +169,553 @@ def check_allowed_limits(title,tags):
 
 
 # ─────────────────────────────────────────────
-# Main Upload Function
+# Main Upload Functions
 # ─────────────────────────────────────────────
 
-def open_and_fill(beat_path, image_path, tags, collaborators, title):
+def open_and_fill(beat_path, image_path, tags, collaborators, title, headless=None, backend=None, resume=True,
+                  stems_path=None, publish=True):
+    """
+    Upload a single track and return its BeatStars shortlink.
+    With resume=True a call after a failed attempt continues that attempt's draft.
+    stems_path defaults to data/stems/<artist>/<beat>.zip (see stems_path_for).
+    With publish=False the track is only filled in and left as a draft (returns None);
+    a later call with resume=True publishes that draft.
+    """
+    if (backend or BACKEND) == "http":
+        try:
+            return _open_and_fill_http(beat_path, image_path, tags, collaborators, title, resume, stems_path, publish)
+        except Exception as e:
+            if draft_id(beat_path, "http"):
+                # the draft exists on BeatStars now; the browser flow would start a second one,
+                # so fail and let the next attempt resume this draft over HTTP
+                print(f"[WARN] HTTP upload failed after creating its draft ({e}) — retry to resume it.")
+                raise
+            print(f"[WARN] HTTP upload failed ({e}) — falling back to the browser flow.")
+
+    job = {
+        "beat_path": beat_path,
+        "image_path": image_path,
+        "tags": tags,
+        "collaborators": collaborators,
+        "title": title,
+        "resume": resume,
+        "stems_path": stems_path,
+        "publish": publish,
+    }
+    result = upload_many([job], concurrency=1, headless=headless)[0]
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+def _open_and_fill_http(beat_path, image_path, tags, collaborators, title, resume=True, stems_path=None, publish=True):
+    from beatstars_http import upload_track
 
     if isinstance(tags, str):
         tags = [t.strip() for t in tags.split(",") if t.strip()]
+    title, tags = check_allowed_limits(title, tags)
+    progress = load_progress(beat_path, "http") if resume else new_progress(beat_path, "http")
+    with tracing.span("beatstars.upload", backend="http", publish=publish) as upload_span:
+        upload_span.count("steps_resumed", len(progress["done"]))
+        beat_link = upload_track(beat_path, cover_for(image_path), tags, collaborators, title,
+                                 preview_path=preview_for(beat_path),
+                                 stems_path=stems_path or stems_path_for(beat_path), session_file=SESSION_FILE,
+                                 progress=progress, publish=publish)
+    if beat_link:
+        clear_progress(beat_path, "http")
+    return beat_link
+
+
+def cover_for(image_path):
+    """The square cover derivative of an artwork, so Studio's crop step is a no-op and the upload is small."""
+    try:
+        return derivative(image_path, "cover")
+    except Exception as e:
+        print(f"[WARN] Could not prepare cover from {image_path} ({e}) — uploading the original.")
+        return image_path
+
 
+def preview_for(beat_path):
+    """The voice-tagged preview of a beat (see voice_tag.py), or None without a tag sample."""
+    from voice_tag import tagged_audio
+    try:
+        preview = tagged_audio(beat_path)
+    except Exception as e:
+        print(f"[WARN] Could not make a tagged preview of {beat_path} ({e}) — leaving it to BeatStars.")
+        return None
+    return preview if preview != beat_path else None
+
+
+def stems_path_for(beat_path):
+    """
+    data/stems/<artist>/<beat>.zip for a beat in data/beats/<artist>/. Without
+    that zip, a data/stems/<artist>/<beat>/ folder of loose stems is packaged
+    into one (see stems_packager.py).
+    """
     folder_name = os.path.basename(os.path.dirname(beat_path))
     file_basename = os.path.splitext(os.path.basename(beat_path))[0]
-    stems_path = os.path.join(STEMS_PATH, folder_name, f"{file_basename}.zip")
+    zip_path = os.path.join(STEMS_PATH, folder_name, f"{file_basename}.zip")
+    stems_dir = os.path.join(STEMS_PATH, folder_name, file_basename)
+    if not os.path.exists(zip_path) and os.path.isdir(stems_dir):
+        from stems_packager import package
+        try:
+            return package(stems_dir, file_basename)
+        except Exception as e:
+            print(f"[WARN] Could not package stems from {stems_dir}: {e}")
+    return zip_path
 
-    # check limits
-    title,tags = check_allowed_limits(title,tags)
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=False, slow_mo=100)
-        context = browser.new_context(
-            storage_state=SESSION_FILE,
-            permissions=["clipboard-read", "clipboard-write"]
-        )
-        page = context.new_page()
+def upload_many(jobs, concurrency=None, headless=None):
+    """
+    Upload several tracks in parallel from one browser process.
+    Each job is a dict with open_and_fill's arguments (and 'resume', 'stems_path', 'publish'), plus an
+    optional 'session_file' to publish from a different BeatStars account.
+    Returns one shortlink (or the exception raised) per job, in order.
+    """
+    return asyncio.run(upload_batch(jobs, concurrency=concurrency, headless=headless))
 
-        # 1️⃣ Go to Dashboard -> Create Track
-        page.goto("https://studio.beatstars.com/dashboard", wait_until="load")
-        retry_action(lambda: page.get_by_role("button", name="Create").click())
-        page.wait_for_timeout(400)
-        retry_action(lambda: page.get_by_role("menuitem", name="Create Track").click())
-        page.wait_for_url("**/content/tracks/uploaded**", timeout=60_000)
 
-        # Close update popup if visible
-        try:
-            if page.locator("button:has-text('Dismiss')").is_visible():
-                page.locator("button:has-text('Dismiss')").click()
-        except Exception:
-            pass
+async def upload_batch(jobs, concurrency=None, headless=None):
+    concurrency = max(1, concurrency or MAX_CONCURRENCY)
+    headless = HEADLESS if headless is None else headless
+    limiter = asyncio.Semaphore(concurrency)
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=headless, slow_mo=SLOW_MO)
 
-        # 2️⃣ Upload MP3 / audio file
-        print("[INFO] Uploading audio...")
-        attach_via_uppy_in_current_modal(page, beat_path)
-        print("[INFO] Audio selected. Waiting for upload to start...")
+        async def run(job):
+            async with limiter:
+                return await _upload_job(browser, job, labelled=len(jobs) > 1)
 
         try:
-            # Wait for the 'Master Track (Untagged)' section to show 'Uploading' text
-            master_section = page.locator("text=/Master Track/i").first
-            page.wait_for_function(
-                """section => section && section.innerText.includes('Uploading')""",
-                arg=master_section,
-                timeout=90_000
-            )
-            print("[INFO] Upload started — waiting for completion...")
+            return await asyncio.gather(*(run(job) for job in jobs), return_exceptions=True)
+        finally:
+            await browser.close()
 
-            # Wait until that same section no longer contains 'Uploading'
-            page.wait_for_function(
-                """section => !section.innerText.includes('Uploading')""",
-                arg=master_section,
-                timeout=600_000
-            )
 
-            # Wait until BeatStars shows metadata or next step
-            page.wait_for_selector("text=/Metadata|Preview Track|Stem Files/i", timeout=60_000)
-            print("[INFO] Audio uploaded successfully.")
-        except PlaywrightTimeoutError:
-            print("[WARN] Upload progress not detected — continuing cautiously.")
+async def _upload_job(browser, job, labelled=False):
+    beat_path = job["beat_path"]
+    tags = job.get("tags") or []
+    if isinstance(tags, str):
+        tags = [t.strip() for t in tags.split(",") if t.strip()]
 
+    # check limits
+    title,tags = check_allowed_limits(job["title"],tags)
+    # preparing the cover and packaging stems is blocking file work; keep it off the event loop
+    image_path = await asyncio.to_thread(cover_for, job["image_path"])
+    stems_path = job.get("stems_path") or await asyncio.to_thread(stems_path_for, beat_path)
+    job = dict(job, title=title, tags=tags, image_path=image_path, stems_path=stems_path,
+               collaborators=job.get("collaborators") or [])
+
+    if labelled:
+        _job_label.set(os.path.splitext(os.path.basename(beat_path))[0])
+    progress = load_progress(beat_path, "browser") if job.get("resume", True) else new_progress(beat_path, "browser")
+    timings = {}
+
+    # a fresh context per upload keeps cookies, storage and copied links isolated
+    context = await browser.new_context(
+        storage_state=job.get("session_file") or SESSION_FILE,
+        permissions=["clipboard-read", "clipboard-write"]
+    )
+    await context.add_init_script(CLIPBOARD_CAPTURE_JS)
+    network = NetworkFilter()
+    await network.install(context)
+    try:
+        page = await context.new_page()
+        with tracing.span("beatstars.upload", backend="browser", publish=job.get("publish", True)) as upload_span:
+            upload_span.count("steps_resumed", len(progress["done"]))
+            try:
+                beat_link = await _run_steps(page, job, progress, timings)
+            finally:
+                for key, value in network.summary().items():
+                    upload_span.count(key, value)
+        if beat_link:
+            clear_progress(beat_path, "browser")
+        return beat_link
+    finally:
+        print_timings(timings)
+        network.report(log)
+        network.save_sizes()
+        await context.close()
+
+
+async def _run_steps(page, job, progress, timings):
+    """
+    Run the upload steps in order, skipping the ones an earlier attempt finished.
+    A step returns True once its work is safely on BeatStars; only then is it
+    recorded, so a retry reopens the same draft and picks up at the first step
+    that did not complete instead of creating a new track.
+    """
+    if progress["draft_url"]:
+        with timed_step(timings, "reopen"):
+            log(f"[INFO] Reopening draft {progress['track_id'] or progress['draft_url']}...")
+            await page.goto(progress["draft_url"], wait_until="domcontentloaded")
+            await _dismiss_popup(page)
+
+    for name, step in STEPS:
+        if name in DRAFT_STOP_STEPS and not job.get("publish", True):
+            log(f"[INFO] Draft saved, not publishing yet ({progress['track_id'] or progress['draft_url']}).")
+            return None
+        if name in progress["done"]:
+            log(f"[INFO] Step '{name}' already done — skipping.")
+            continue
+        with timed_step(timings, name):
+            if await step(page, job, progress):
+                mark_done(progress, name)
+    return progress["link"]
+
+
+async def _dismiss_popup(page):
+    # Close update popup if visible
+    try:
+        if await page.locator("button:has-text('Dismiss')").is_visible():
+            await page.locator("button:has-text('Dismiss')").click()
+    except Exception:
+        pass
 
-        # 6️⃣ Upload Artwork (Browse → Save → Upload 1 file)
-        try:
-            print("[INFO] Uploading artwork...")
 
-            # Open Edit → Upload file
-            page.get_by_role("button", name=re.compile("Edit", re.I)).first.click()
-            page.wait_for_timeout(300)
-            page.get_by_role("menuitem", name=re.compile("Upload file", re.I)).first.click()
+# 1️⃣ Go to Dashboard -> Create Track
+async def _step_create(page, job, progress):
+    await page.goto(f"{STUDIO_URL}/dashboard", wait_until="domcontentloaded")
+    await retry_action(lambda: page.get_by_role("button", name="Create").click())
+    await retry_action(lambda: page.get_by_role("menuitem", name="Create Track").click())
+    await page.wait_for_url("**/content/tracks/uploaded**", timeout=60_000)
+    await _dismiss_popup(page)
 
-            # Wait for Uppy dashboard
-            page.wait_for_selector(".uppy-Dashboard-inner", timeout=30_000)
+    progress["draft_url"] = page.url
+    match = re.search(r"/tracks/uploaded/([^/?#]+)", page.url)
+    progress["track_id"] = match.group(1) if match else None
+    return True
 
-            # --- Attach file into Uppy ---
-            for _ in range(12):
-                inputs = page.query_selector_all('input.uppy-Dashboard-input[type="file"]')
-                if inputs:
-                    break
-                page.wait_for_timeout(250)
-            if not inputs:
-                raise RuntimeError("Uppy file input not found.")
-            file_input = inputs[0]
-            page.evaluate(
-                """el => { el.removeAttribute('hidden');
-                          el.style.display='block';
-                          el.style.visibility='visible';
-                          el.style.opacity=1; }""",
-                file_input
-            )
-            file_input.set_input_files(image_path)
-            print("[INFO] File attached, waiting for cropping modal...")
-
-            # --- Cropping modal (click Save) ---
-            # Wait until cropping editor appears
-            page.wait_for_selector(".uppy-DashboardContent-save", timeout=60_000)
-            save_button = page.locator("button.uppy-DashboardContent-save")
-            save_button.wait_for(state="visible", timeout=20_000)
-
-            # Click Save with retries
-            for attempt in range(4):
-                try:
-                    save_button.scroll_into_view_if_needed()
-                    save_button.click(timeout=2000)
-                    print("[INFO] Cropping modal: real 'Save' clicked.")
-                    break
-                except Exception as e:
-                    print(f"[WARN] Cropping save click attempt {attempt+1} failed: {e}")
-                    page.wait_for_timeout(500)
-            else:
-                raise RuntimeError("Failed to click 'Save' in cropping modal.")
 
-            # Wait until that Save button disappears
-            page.wait_for_function(
-                "() => document.querySelectorAll('.uppy-DashboardContent-save').length===0",
-                timeout=60_000
-            )
-            print("[INFO] Cropping modal closed, returning to Uppy dashboard.")
+# 2️⃣ Upload MP3 / audio file
+async def _step_audio(page, job, progress):
+    log("[INFO] Uploading audio...")
+    await attach_via_uppy_in_current_modal(page, job["beat_path"])
+    log("[INFO] Audio selected. Waiting for upload to start...")
+
+    try:
+        # Wait for the 'Master Track (Untagged)' section to show 'Uploading' text
+        master_section = page.locator("text=/Master Track/i").first
+        master_handle = await master_section.element_handle(timeout=30_000)
+        await page.wait_for_function(
+            """section => section && section.innerText.includes('Uploading')""",
+            arg=master_handle,
+            polling="mutation",
+            timeout=90_000
+        )
+        log("[INFO] Upload started — waiting for completion...")
+
+        # Wait until that same section no longer contains 'Uploading'
+        await page.wait_for_function(
+            """section => !section.innerText.includes('Uploading')""",
+            arg=master_handle,
+            polling="mutation",
+            timeout=600_000
+        )
+
+        # Wait until BeatStars shows metadata or next step
+        await page.wait_for_selector("text=/Metadata|Preview Track|Stem Files/i", timeout=60_000)
+        log("[INFO] Audio uploaded successfully.")
+    except PlaywrightTimeoutError:
+        log("[WARN] Upload progress not detected — continuing cautiously.")
+        return False
+    progress["assets"]["audio"] = os.path.basename(job["beat_path"])
+    return True
+
 
+# 6️⃣ Upload Artwork (Browse → Save → Upload 1 file)
+async def _step_artwork(page, job, progress):
+    try:
+        log("[INFO] Uploading artwork...")
+
+        # Open Edit → Upload file (click() waits for the menu item itself)
+        await page.get_by_role("button", name=re.compile("Edit", re.I)).first.click()
+        await page.get_by_role("menuitem", name=re.compile("Upload file", re.I)).first.click()
+
+        # Wait for Uppy dashboard
+        await page.wait_for_selector(".uppy-Dashboard-inner", timeout=30_000)
+
+        # --- Attach file into Uppy ---
+        await (await _uppy_file_input(page, timeout_ms=3_000)).set_input_files(job["image_path"])
+        log("[INFO] File attached, waiting for cropping modal...")
 
-            # --- Click Upload 1 file ---
-            upload_btn = page.get_by_role("button", name=re.compile(r"Upload 1 file", re.I)).first
-            upload_btn.wait_for(state="visible", timeout=30_000)
-            upload_btn.click()
-            print("[INFO] 'Upload 1 file' clicked.")
+        # --- Cropping modal (click Save) ---
+        save_button = page.locator("button.uppy-DashboardContent-save")
+        await save_button.wait_for(state="visible", timeout=60_000)
 
-            # 🕒 Wait for BeatStars upload panel (bottom-right) to appear & disappear
+        # Click Save with retries
+        for attempt in range(4):
             try:
-                print("[INFO] Waiting for BeatStars bottom-right uploader panel...")
-
-                # Phase 1: wait until panel appears (Uploading / Uploaded text)
-                panel_appeared = False
-                for _ in range(60):  # up to ~30 seconds
-                    if page.locator("text=/Uploading|Uploaded all files/i").count() > 0:
-                        panel_appeared = True
-                        break
-                    page.wait_for_timeout(500)
-                if panel_appeared:
-                    print("[INFO] Upload panel appeared — waiting for it to finish.")
-                else:
-                    print("[WARN] Upload panel never appeared; continuing to monitor disappearance anyway.")
-
-                # Phase 2: wait until it disappears completely
-                page.wait_for_function(
-                    """() => {
-                        const nodes = Array.from(document.querySelectorAll('*'));
-                        return !nodes.some(e => /Uploading|Uploaded all files/i.test(e.textContent || ''));
-                    }""",
-                    timeout=360_000  # up to 6 minutes
-                )
-                print("[INFO] Upload panel disappeared — upload fully processed.")
+                await save_button.scroll_into_view_if_needed()
+                await save_button.click(timeout=2000)
+                log("[INFO] Cropping modal: real 'Save' clicked.")
+                break
             except Exception as e:
-                print(f"[WARN] Upload panel wait timed out or failed: {e}")
+                log(f"[WARN] Cropping save click attempt {attempt+1} failed: {e}")
+                await save_button.wait_for(state="visible", timeout=5_000)
+        else:
+            raise RuntimeError("Failed to click 'Save' in cropping modal.")
 
+        # Wait until that Save button disappears
+        await save_button.wait_for(state="detached", timeout=60_000)
+        log("[INFO] Cropping modal closed, returning to Uppy dashboard.")
 
-            # Wait until Uppy modal closes
-            page.wait_for_function(
-                "() => document.querySelectorAll('.uppy-Dashboard-inner').length===0",
-                timeout=120_000
-            )
-            print("[INFO] Uppy modal closed.")
 
-            # Wait for BeatStars to persist
-            try:
-                page.locator("text=/Changes Saved/i").wait_for(state="visible", timeout=120_000)
-            except Exception:
-                pass
+        # --- Click Upload 1 file ---
+        upload_btn = page.get_by_role("button", name=re.compile(r"Upload 1 file", re.I)).first
+        await upload_btn.wait_for(state="visible", timeout=30_000)
+        await upload_btn.click()
+        log("[INFO] 'Upload 1 file' clicked.")
 
-            print("Artwork uploaded and saved successfully.")
+        # 🕒 Wait for BeatStars upload panel (bottom-right) to appear & disappear
+        try:
+            log("[INFO] Waiting for BeatStars bottom-right uploader panel...")
 
+            # Phase 1: wait until panel appears (Uploading / Uploaded text)
+            try:
+                await page.locator("text=/Uploading|Uploaded all files/i").first.wait_for(state="attached", timeout=30_000)
+                log("[INFO] Upload panel appeared — waiting for it to finish.")
+            except PlaywrightTimeoutError:
+                log("[WARN] Upload panel never appeared; continuing to monitor disappearance anyway.")
+
+            # Phase 2: wait until it disappears completely
+            await wait_until_disappears(page, ["text=/Uploading|Uploaded all files/i"], timeout_ms=360_000)
+            log("[INFO] Upload panel disappeared — upload fully processed.")
         except Exception as e:
-            page.screenshot(path="debug_artwork_fail.png", full_page=True)
-            print(f"[ERROR] Artwork upload failed: {e}")
+            log(f"[WARN] Upload panel wait timed out or failed: {e}")
 
 
+        # Wait until Uppy modal closes
+        await page.locator(".uppy-Dashboard-inner").first.wait_for(state="detached", timeout=120_000)
+        log("[INFO] Uppy modal closed.")
 
-        # 3️⃣ Fill Title
+        # Wait for BeatStars to persist
         try:
-            title_input = page.locator('input[placeholder*="Title" i]').first
-            title_input.fill(title)
-            print("[INFO] Title filled.")
+            await page.locator("text=/Changes Saved/i").wait_for(state="visible", timeout=120_000)
         except Exception:
-            print("[WARN] Title input not found.")
+            pass
 
-        # 4️⃣ Fill Tags
-        try:
-            for i, tag in enumerate(tags, start=1):
-                input_selectors = [
-                    "input[placeholder*='tag']",
-                    "input[aria-label*='tag']",
-                    "input[placeholder*='Tag']",
-                    "input[aria-label*='Tag']",
-                ]
-                tag_input = next((page.locator(sel).last for sel in input_selectors if page.locator(sel).count()), None)
-                if not tag_input:
-                    raise RuntimeError("No tag input found.")
-                tag_input.wait_for(state="visible", timeout=20_000)
-                tag_input.fill(tag)
-                tag_input.press("Enter")
-                page.wait_for_timeout(200)
-                print(f"[INFO] Added tag {i}: {tag}")
-        except Exception as e:
-            print(f"[WARN] Could not fill tags: {e}")
+        log("Artwork uploaded and saved successfully.")
+        progress["assets"]["artwork"] = os.path.basename(job["image_path"])
+        return True
 
-        # 5️⃣ Autofill Metadata
-        try:
-            autofill_btn = page.get_by_text(re.compile("Autofill.*Metadata", re.I))
-            if not autofill_btn.count():
-                autofill_btn = page.locator("button:has-text('Autofill')")
-            autofill_btn.first.click()
-            print("[INFO] Autofill metadata clicked.")
-            wait_changes_saved(page)
-        except Exception:
-            print("[WARN] Autofill button not found.")
+    except Exception as e:
+        await page.screenshot(path="debug_artwork_fail.png", full_page=True)
+        log(f"[ERROR] Artwork upload failed: {e}")
+        # close the half-finished Uppy modal so the next steps can reach the form
+        await page.keyboard.press("Escape")
+        return False
 
 
+# 3️⃣ Fill Title
+async def _step_title(page, job, progress):
+    try:
+        title_input = page.locator('input[placeholder*="Title" i]').first
+        await title_input.fill(job["title"])
+        log("[INFO] Title filled.")
+        return True
+    except Exception:
+        log("[WARN] Title input not found.")
+        return False
 
-        # 7️⃣ Upload Stems (if exists)
-        try:
-            stem_path = Path(stems_path)
-            if stem_path.exists():
-                print(f"[INFO] Uploading stems: {stem_path.name}")
-                stem_section = page.locator("section:has-text('Stem Files')")
-                stem_section.wait_for(state="visible", timeout=30_000)
-                stem_section.locator("button:has-text('Add')").first.click()
-                attach_via_uppy_in_current_modal(page, str(stem_path))
-                wait_for_any(page, ["text=/Processing/i", "text=/Uploading/i"], 180_000)
-                wait_until_disappears(page, ["text=/Processing/i", "text=/Uploading/i"], 600_000)
-                print("[INFO] Stems uploaded successfully.")
-            else:
-                print(f"[WARN] Stem file not found at {stem_path}. Skipping.")
-        except Exception as e:
-            print(f"[WARN] Stems upload failed: {e}")
 
-        # 8️⃣ Add Collaborators
-        try:
-            collabs = collaborators if isinstance(collaborators, list) else [collaborators]
-            collabs = [c.strip() for c in collabs if c.strip()]
-            for collab in collabs:
-                print(f"[INFO] Adding collaborator: {collab}")
-                if not page.locator('input[placeholder*="Artist"]').count():
-                    page.get_by_text("Add collaborator", exact=False).click()
-                    page.wait_for_timeout(800)
-                artist_inputs = page.locator('input[placeholder*="Artist"]')
-                empty_field = next((artist_inputs.nth(i) for i in range(artist_inputs.count()) if not artist_inputs.nth(i).input_value().strip()), None)
-                (empty_field or artist_inputs.last).fill(collab)
-                wait_changes_saved(page)
-                print(f"[INFO] Collaborator '{collab}' added.")
-        except Exception as e:
-            print(f"[WARN] Collaborator step failed: {e}")
+# 4️⃣ Fill Tags
+async def _step_tags(page, job, progress):
+    try:
+        input_selectors = [
+            "input[placeholder*='tag']",
+            "input[aria-label*='tag']",
+            "input[placeholder*='Tag']",
+            "input[aria-label*='Tag']",
+        ]
+        for i, tag in enumerate(job["tags"], start=1):
+            tag_input = None
+            for sel in input_selectors:
+                if await page.locator(sel).count():
+                    tag_input = page.locator(sel).last
+                    break
+            if not tag_input:
+                raise RuntimeError("No tag input found.")
+            await tag_input.wait_for(state="visible", timeout=20_000)
+            await tag_input.fill(tag)
+            await tag_input.press("Enter")
+            # the input is cleared once the chip has been added
+            try:
+                await page.wait_for_function("el => !el.value", arg=await tag_input.element_handle(), timeout=5_000)
+            except PlaywrightTimeoutError:
+                pass
+            log(f"[INFO] Added tag {i}: {tag}")
+        return True
+    except Exception as e:
+        log(f"[WARN] Could not fill tags: {e}")
+        return False
 
-        # 9️⃣ Publish Track
-        try:
-            wait_changes_saved(page)
-            publish_btn = page.locator("button:has-text('Publish Track')").first
-            publish_btn.wait_for(state="visible", timeout=180_000)
-            page.evaluate("const o=document.querySelector('#survey_1049305');if(o)o.style.display='none';")
-            publish_btn.click(force=True)
-            print("Publish button clicked.")
-        except Exception as e:
-            print(f"[WARN] Publish button failed: {e}")
 
-        # 🔟 Extract BeatStars Link
-        # 8️⃣ Extract BeatStars link after publish (via "View all links" modal)
-        try:
-            print("[INFO] Waiting for BeatStars shortlink modal...")
+# 5️⃣ Autofill Metadata
+async def _step_autofill(page, job, progress):
+    try:
+        autofill_btn = page.get_by_text(re.compile("Autofill.*Metadata", re.I))
+        if not await autofill_btn.count():
+            autofill_btn = page.locator("button:has-text('Autofill')")
+        await autofill_btn.first.click()
+        log("[INFO] Autofill metadata clicked.")
+        await wait_changes_saved(page)
+        return True
+    except Exception:
+        log("[WARN] Autofill button not found.")
+        return False
 
-            # Wait for initial modal after publish
-            page.wait_for_selector("text=Share your CONTENT with the world!", timeout=60_000)
 
-            # Click "View all links"
-            view_links_btn = page.get_by_text("View all links", exact=False)
-            if view_links_btn.count():
-                view_links_btn.first.click()
-                print("[INFO] Opened 'View all links' modal.")
+# 7️⃣ Upload Stems (if exists)
+async def _step_stems(page, job, progress):
+    try:
+        stem_path = Path(job["stems_path"])
+        if stem_path.exists():
+            log(f"[INFO] Uploading stems: {stem_path.name}")
+            stem_section = page.locator("section:has-text('Stem Files')")
+            await stem_section.wait_for(state="visible", timeout=30_000)
+            await stem_section.locator("button:has-text('Add')").first.click()
+            await attach_via_uppy_in_current_modal(page, str(stem_path))
+            await wait_for_any(page, ["text=/Processing/i", "text=/Uploading/i"], 180_000)
+            await wait_until_disappears(page, ["text=/Processing/i", "text=/Uploading/i"], 600_000)
+            log("[INFO] Stems uploaded successfully.")
+            progress["assets"]["stems"] = stem_path.name
+        else:
+            log(f"[WARN] Stem file not found at {stem_path}. Skipping.")
+        return True
+    except Exception as e:
+        log(f"[WARN] Stems upload failed: {e}")
+        return False
+
+
+# 8️⃣ Add Collaborators
+async def _step_collaborators(page, job, progress):
+    try:
+        collabs = job["collaborators"] if isinstance(job["collaborators"], list) else [job["collaborators"]]
+        collabs = [c.strip() for c in collabs if c.strip()]
+        for collab in collabs:
+            log(f"[INFO] Adding collaborator: {collab}")
+            artist_inputs = page.locator('input[placeholder*="Artist"]')
+            if not await artist_inputs.count():
+                await page.get_by_text("Add collaborator", exact=False).click()
+                await artist_inputs.first.wait_for(state="visible", timeout=10_000)
+            empty_field = None
+            for i in range(await artist_inputs.count()):
+                value = (await artist_inputs.nth(i).input_value()).strip()
+                if value.lower() == collab.lower():
+                    break  # saved by an earlier attempt
+                if not value:
+                    empty_field = artist_inputs.nth(i)
+                    break
             else:
-                print("[WARN] 'View all links' button not found. Attempting fallback.")
-
-            # Wait for "Marketplace short URL" section
-            page.wait_for_selector("text=Marketplace short URL", timeout=20_000)
+                empty_field = artist_inputs.last
+            if empty_field:
+                await empty_field.fill(collab)
+                await wait_changes_saved(page)
+            log(f"[INFO] Collaborator '{collab}' added.")
+        return True
+    except Exception as e:
+        log(f"[WARN] Collaborator step failed: {e}")
+        return False
+
+
+# 9️⃣ Publish Track
+async def _step_publish(page, job, progress):
+    try:
+        await wait_changes_saved(page)
+        publish_btn = page.locator("button:has-text('Publish Track')").first
+        await publish_btn.wait_for(state="visible", timeout=180_000)
+        await page.evaluate("const o=document.querySelector('#survey_1049305');if(o)o.style.display='none';")
+        await publish_btn.click(force=True)
+        log("Publish button clicked.")
+        return True
+    except Exception as e:
+        log(f"[WARN] Publish button failed: {e}")
+        return False
+
+
+# 🔟 Extract BeatStars link after publish (via "View all links" modal)
+async def _step_link(page, job, progress):
+    try:
+        log("[INFO] Waiting for BeatStars shortlink modal...")
 
-            # Click "Copy link" beside short URL
-            copy_btn = page.locator("button:has-text('Copy link')").first
-            copy_btn.click()
-            print("[INFO] Clicked 'Copy link' for short URL.")
+        # Wait for initial modal after publish
+        share_modal = page.locator("text=Share your CONTENT with the world!")
+        try:
+            await share_modal.wait_for(state="visible", timeout=60_000 if "publish" not in progress["done"] else 5_000)
+        except PlaywrightTimeoutError:
+            if "publish" not in progress["done"]:
+                raise
+            # published by an earlier attempt: reopen the share modal from the track page
+            await page.get_by_role("button", name=re.compile("Share", re.I)).first.click()
+
+        # Click "View all links"
+        view_links_btn = page.get_by_text("View all links", exact=False)
+        if await view_links_btn.count():
+            await view_links_btn.first.click()
+            log("[INFO] Opened 'View all links' modal.")
+        else:
+            log("[WARN] 'View all links' button not found. Attempting fallback.")
+
+        # Wait for "Marketplace short URL" section
+        await page.wait_for_selector("text=Marketplace short URL", timeout=20_000)
+
+        # Click "Copy link" beside short URL
+        copy_btn = page.locator("button:has-text('Copy link')").first
+        await copy_btn.click()
+        log("[INFO] Clicked 'Copy link' for short URL.")
+
+        # Wait until this page has copied the short link
+        try:
+            await page.wait_for_function(
+                "() => (window.__bsCopiedText || '').startsWith('https://bsta.rs/')",
+                timeout=5_000
+            )
+        except PlaywrightTimeoutError:
+            pass
 
-            # Wait briefly for clipboard update
-            page.wait_for_timeout(1000)
+        # Read what this page copied (captured per context, not the shared clipboard)
+        beat_link = await page.evaluate("window.__bsCopiedText")
 
-            # Try reading from clipboard in page context
-            beat_link = page.evaluate("navigator.clipboard.readText()")
+        if beat_link and beat_link.startswith("https://bsta.rs/"):
+            log(f"BeatStars shortlink copied: {beat_link}")
+        else:
+            log("[WARN] Copied link empty or invalid; falling back to DOM extraction...")
 
-            if beat_link and beat_link.startswith("https://bsta.rs/"):
-                print(f"BeatStars shortlink copied: {beat_link}")
-                with open("last_published_link.txt", "w") as f:
-                    f.write(beat_link)
-                return beat_link
+            # Fallback: extract value from the short URL input field
+            short_input = page.locator("input[value^='https://bsta.rs/']").first
+            if await short_input.count():
+                beat_link = await short_input.get_attribute("value")
+                log(f"Fallback shortlink found: {beat_link}")
             else:
-                print("[WARN] Clipboard read empty or invalid; falling back to DOM extraction...")
+                log("[WARN] BeatStars link not found in modal.")
+                return False
 
-                # Fallback: extract value from the short URL input field
-                short_input = page.locator("input[value^='https://bsta.rs/']").first
-                if short_input.count():
-                    beat_link = short_input.get_attribute("value")
-                    print(f"Fallback shortlink found: {beat_link}")
-                    with open("last_published_link.txt", "w") as f:
-                        f.write(beat_link)
-                else:
-                    beat_link = None
-                    print("[WARN] BeatStars link not found in modal.")
+        with open("last_published_link.txt", "w") as f:
+            f.write(beat_link)
+        progress["link"] = beat_link
+        return True
 
-                return beat_link
+    except Exception as e:
+        log(f"[WARN] Could not extract BeatStars link: {e}")
+        return False
 
-        except Exception as e:
-            print(f"[WARN] Could not extract BeatStars link: {e}")
+
+STEPS = [
+    ("create", _step_create),
+    ("audio", _step_audio),
+    ("artwork", _step_artwork),
+    ("title", _step_title),
+    ("tags", _step_tags),
+    ("autofill", _step_autofill),
+    ("stems", _step_stems),
+    ("collaborators", _step_collaborators),
+    ("publish", _step_publish),
+    ("link", _step_link),
+]
+# steps skipped when only a draft is wanted (open_and_fill(publish=False))
+DRAFT_STOP_STEPS = ("publish", "link")
 
 
 
@@ -443,5 +747,3 @@ if __name__ == "__main__":
         print("All upload attempts failed. BeatStars link not captured.")
     else:
         print(f"Final BeatStars link: {beatstars_link}")
-
-    
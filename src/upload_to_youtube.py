@@ -1,32 +1,90 @@
-from googleapiclient.discovery import build
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build, build_from_document
 from googleapiclient.errors import HttpError
-from googleapiclient.http import MediaFileUpload
-from google_auth_check import check_and_refresh_google_token
+from googleapiclient.http import MediaFileUpload, MediaIoBaseUpload, MediaUpload
+from google_auth_check import check_and_refresh_google_token, require_scopes
 from googleapiclient.discovery import build
+import io
+import mmap
 import os
 import datetime
+import hashlib
+import http.client
+import json
+import random
+import socket
+import time
+import contextvars
+import httplib2
+import yaml
+import tracing
+import yt_quota
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from urllib.parse import urljoin
 
 BASE_DIR = Path(__file__).resolve().parent
 
 # ===========================================
 # Configuration
 # ===========================================
-SCOPES = ["https://www.googleapis.com/auth/youtube.upload"]
+SCOPES = [
+    "https://www.googleapis.com/auth/youtube.upload",
+    # videos.list with processingDetails for the status watcher
+    "https://www.googleapis.com/auth/youtube.readonly",
+    # videos.update for yt_bulk_update
+    "https://www.googleapis.com/auth/youtube.force-ssl",
+]
 
 
 CLIENT_SECRET_FILE = BASE_DIR / "secrets" / "client_secret.json"
 VIDEO_PATH = BASE_DIR / "data" / "vids" / "test.mp4"
 TOKEN_FILE = BASE_DIR / "secrets" / "token.pickle"
+# Root of the YouTube Data API, e.g. http://127.0.0.1:8766 for standins/youtube_api.py; unset = Google
+YOUTUBE_API_ENDPOINT = os.getenv("YOUTUBE_API_ENDPOINT", "").rstrip("/")
 
 # ===========================================
 # Authentication
 # ===========================================
-def get_authenticated_service():
-    creds = check_and_refresh_google_token()
-    youtube = build("youtube", "v3", credentials=creds)
+def build_youtube(**kwargs):
+    """
+    YouTube Data API client (kwargs go to googleapiclient's build).
+    With YOUTUBE_API_ENDPOINT set, every call goes there instead, including
+    media uploads and batches, which client_options' api_endpoint alone doesn't move.
+    """
+    if not YOUTUBE_API_ENDPOINT:
+        return build("youtube", "v3", **kwargs)
+    doc = json.loads(discovery_cache.get_static_doc("youtube", "v3"))
+    doc["rootUrl"] = YOUTUBE_API_ENDPOINT + "/"
+    doc["baseUrl"] = urljoin(doc["rootUrl"], doc["servicePath"])
+    return build_from_document(doc, **kwargs)
+
+
+def get_authenticated_service(channel=None, scopes=()):
+    """YouTube client for a channel; raises early if its token wasn't granted all of `scopes`."""
+    env_prefix = (channel or DEFAULT_CHANNEL)["env_prefix"]
+    creds = check_and_refresh_google_token(env_prefix)
+    require_scopes(creds, scopes, env_prefix)
+    youtube = build_youtube(credentials=creds)
     return youtube
 
+
+# ===========================================
+# Channels
+# ===========================================
+CONFIG_FILE = BASE_DIR.parent / "CONFIG.yml"
+DEFAULT_CHANNEL = {"name": "main", "env_prefix": "GOOGLE", "daily_quota": yt_quota.DEFAULT_DAILY_QUOTA, "overrides": {}}
+
+
+def load_channels():
+    """Channel profiles from the youtube_channels section of CONFIG.yml."""
+    try:
+        with open(CONFIG_FILE, "r", encoding="utf-8") as f:
+            profiles = (yaml.safe_load(f) or {}).get("youtube_channels") or []
+    except FileNotFoundError:
+        profiles = []
+    return [{**DEFAULT_CHANNEL, **p, "overrides": p.get("overrides") or {}} for p in profiles] or [DEFAULT_CHANNEL]
+
 import re
 import unicodedata
 
@@ -63,11 +121,189 @@ def sanitize_youtube_tags(raw_tags):
     return cleaned
 
 
+# ===========================================
+# Resumable Upload
+# ===========================================
+# Uploads go up in chunks (a multiple of 256 KiB) so a dropped connection only costs one chunk
+CHUNK_SIZE = max(1, int(os.getenv("YT_CHUNK_SIZE", str(16 * 1024 * 1024))) // (256 * 1024)) * 256 * 1024
+MAX_RETRIES = int(os.getenv("YT_MAX_RETRIES", "10"))
+RETRIABLE_STATUS_CODES = (500, 502, 503, 504)
+RETRIABLE_EXCEPTIONS = (httplib2.HttpLib2Error, ConnectionError, TimeoutError, socket.timeout,
+                        http.client.IncompleteRead, http.client.ImproperConnectionState)
+# Session URI + offset of unfinished uploads, so a restarted process continues the same upload
+UPLOAD_STATE_DIR = BASE_DIR / "cache" / "yt_uploads"
+
+
+def _upload_state_path(file_path, channel="main"):
+    # size and mtime pin the session to these exact bytes: a new render of the same path starts over
+    st = os.stat(file_path)
+    key = f"{channel}|{os.path.abspath(file_path)}|{st.st_size}|{st.st_mtime_ns}"
+    return UPLOAD_STATE_DIR / f"{hashlib.sha1(key.encode()).hexdigest()}.json"
+
+
+def _save_upload_state(state_path, request):
+    os.makedirs(state_path.parent, exist_ok=True)
+    tmp = state_path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"uri": request.resumable_uri, "progress": request.resumable_progress}, f)
+    os.replace(tmp, state_path)
+
+
+def _load_upload_state(state_path):
+    try:
+        with open(state_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def pending_upload(file_path, channel="main"):
+    """True if an earlier run left an upload of this very file (same render) unfinished."""
+    return os.path.exists(file_path) and _upload_state_path(file_path, channel).exists()
+
+
+def _query_session(request, uri):
+    """
+    Ask YouTube how much of a saved session it has: an empty PUT with
+    Content-Range: bytes */size. Returns (bytes received, None), or
+    (size, video resource) if the upload had finished before the restart.
+    """
+    size = request.resumable.size()
+    resp, content = request.http.request(uri, method="PUT",
+                                         headers={"Content-Length": "0", "Content-Range": f"bytes */{size}"})
+    if resp.status in (200, 201):
+        return size, json.loads(content)
+    if resp.status == 308:
+        match = re.match(r"bytes=0-(\d+)", resp.get("range", ""))
+        return (int(match.group(1)) + 1 if match else 0), None
+    raise HttpError(resp, content, uri=uri)
+
+
+@tracing.traced("youtube.upload")
+def execute_resumable(request, state_path=None, on_progress=None):
+    """
+    Drive a resumable insert chunk by chunk, retrying 5xx and connection errors
+    with exponential backoff. With state_path, the session URI and offset are
+    persisted after every chunk and picked up again by a later process.
+    on_progress(fraction, mb_per_s) is called after every chunk; fraction is
+    None when the total size is unknown. An exception raised by it aborts the upload.
+    """
+    saved = _load_upload_state(state_path) if state_path else None
+    resume_uri = saved and saved["uri"]
+
+    retry = 0
+    response = None
+    started = time.monotonic()
+    first_byte = request.resumable_progress
+    while response is None:
+        error = None
+        try:
+            if resume_uri:
+                first_byte, response = _query_session(request, resume_uri)
+                request.resumable_uri, request.resumable_progress = resume_uri, first_byte
+                resume_uri = None
+                retry = 0
+                tracing.count("cache_hits")
+                print(f"Resuming previous upload session from {first_byte / 1e6:.1f} MB.")
+                continue
+            status, response = request.next_chunk()
+            tracing.count("chunks")
+            retry = 0
+            if state_path and request.resumable_uri and response is None:
+                _save_upload_state(state_path, request)
+            if status:
+                elapsed = max(time.monotonic() - started, 1e-6)
+                speed = (status.resumable_progress - first_byte) / elapsed / 1e6
+                if status.total_size:
+                    print(f"Uploading... {int(status.progress() * 100)}% ({speed:.1f} MB/s)")
+                else:
+                    print(f"Uploading... {status.resumable_progress / 1e6:.1f} MB ({speed:.1f} MB/s)")
+                if on_progress:
+                    on_progress(status.progress() if status.total_size else None, speed)
+        except HttpError as e:
+            if resume_uri and e.resp.status in (404, 410):
+                # the saved session expired on YouTube's side: start a fresh one
+                print("Saved upload session expired, starting over.")
+                resume_uri = None
+                continue
+            if e.resp.status not in RETRIABLE_STATUS_CODES:
+                raise
+            error = f"server error {e.resp.status}"
+        except RETRIABLE_EXCEPTIONS as e:
+            error = f"connection error: {e!r}"
+
+        if error:
+            retry += 1
+            tracing.count("retries")
+            if retry > MAX_RETRIES:
+                raise RuntimeError(f"Upload failed after {MAX_RETRIES} retries ({error}).")
+            delay = min(2 ** retry, 64) * random.uniform(0.5, 1.0)
+            print(f"{error} — retry {retry}/{MAX_RETRIES} in {delay:.1f}s")
+            time.sleep(delay)
+
+    if state_path and state_path.exists():
+        state_path.unlink()
+    tracing.count("bytes_sent", (request.resumable.size() or request.resumable_progress) - first_byte)
+    return response
+
+
+class PipeMediaUpload(MediaUpload):
+    """
+    Resumable media read from a non-seekable stream of unknown length, e.g.
+    ffmpeg's stdout. Only the not-yet-committed chunk is kept in memory, so a
+    failed chunk can be re-sent but the upload can't outlive the process.
+    """
+
+    def __init__(self, stream, mimetype="video/mp4", chunksize=None, process=None):
+        self._stream = stream
+        self._mimetype = mimetype
+        self._chunksize = chunksize or CHUNK_SIZE
+        self._process = process
+        self._buffer = bytearray()
+        self._buffer_start = 0
+        self._eof = False
+
+    def chunksize(self):
+        return self._chunksize
+
+    def mimetype(self):
+        return self._mimetype
+
+    def size(self):
+        return None
+
+    def resumable(self):
+        return True
+
+    def has_stream(self):
+        return False
+
+    def getbytes(self, begin, length):
+        if begin < self._buffer_start:
+            raise RuntimeError(f"Byte {begin} of the piped video is no longer buffered; restart the upload.")
+        # everything before `begin` is committed on YouTube's side
+        del self._buffer[:begin - self._buffer_start]
+        self._buffer_start = begin
+
+        while len(self._buffer) < length and not self._eof:
+            data = self._stream.read(length - len(self._buffer))
+            if not data:
+                self._eof = True
+                self._check_process()
+                break
+            self._buffer += data
+        return bytes(self._buffer[:length])
+
+    def _check_process(self):
+        # a short read finalizes the upload, so never let a crashed encode through
+        if self._process is not None and self._process.wait() != 0:
+            raise RuntimeError(f"ffmpeg exited with code {self._process.returncode}; upload aborted.")
+
+
 # ===========================================
 # Video Upload Function
 # ===========================================
-def upload_video(
-    file_path,
+def build_request_body(
     title,
     description,
     tags,
@@ -83,11 +319,8 @@ def upload_video(
     license_type="youtube",
     public_stats_viewable=True,
     made_for_kids=False,
-    notify_subscribers=True,
     publish_at=None,
 ):
-    youtube = get_authenticated_service()
-
     tags = sanitize_youtube_tags(tags)
 
     # Build request body with all supported fields
@@ -121,9 +354,86 @@ def upload_video(
         request_body["recordingDetails"]["recordingDate"] = recording_date
     if publish_at:
         request_body["status"]["publishAt"] = publish_at  # ISO8601 UTC string
+    return request_body
+
+
+@tracing.traced("youtube.thumbnail")
+def set_thumbnail(youtube, video_id, image_path, channel=None):
+    """
+    Set a video's custom thumbnail from its artwork (the cached 1280x720
+    derivative, well under the 2MB limit). Channels without custom thumbnails
+    enabled refuse it, so failures are reported and swallowed.
+    """
+    from prep_image import derivative
+
+    channel = channel or DEFAULT_CHANNEL
+    try:
+        thumb = derivative(image_path, "thumbnail")
+        yt_quota.reserve(channel["name"], yt_quota.COSTS["thumbnails.set"], channel["daily_quota"])
+        tracing.count("quota_units", yt_quota.COSTS["thumbnails.set"])
+        youtube.thumbnails().set(
+            videoId=video_id, media_body=MediaFileUpload(thumb, mimetype="image/jpeg")
+        ).execute(num_retries=3)
+        print(f"[INFO] Thumbnail set for {video_id}.")
+        return True
+    except Exception as e:
+        print(f"[WARN] Could not set thumbnail for {video_id}: {e}")
+        return False
+
+
+def upload_video(
+    file_path,
+    title,
+    description,
+    tags,
+    category_id=10,
+    privacy_status="private",
+    default_language="en",
+    default_audio_language="en",
+    location_description="",
+    location_latitude=None,
+    location_longitude=None,
+    recording_date=None,
+    embeddable=True,
+    license_type="youtube",
+    public_stats_viewable=True,
+    made_for_kids=False,
+    notify_subscribers=True,
+    publish_at=None,
+    chunk_size=None,
+    channel=None,
+    media=None,
+    on_progress=None,
+    thumbnail=None,
+):
+    channel = channel or DEFAULT_CHANNEL
+    youtube = get_authenticated_service(channel)
+
+    request_body = build_request_body(
+        title, description, tags,
+        category_id=category_id,
+        privacy_status=privacy_status,
+        default_language=default_language,
+        default_audio_language=default_audio_language,
+        location_description=location_description,
+        location_latitude=location_latitude,
+        location_longitude=location_longitude,
+        recording_date=recording_date,
+        embeddable=embeddable,
+        license_type=license_type,
+        public_stats_viewable=public_stats_viewable,
+        made_for_kids=made_for_kids,
+        publish_at=publish_at,
+    )
 
     # Upload media
-    media = MediaFileUpload(file_path, chunksize=-1, resumable=True)
+    if media is None:
+        media = MediaFileUpload(file_path, chunksize=chunk_size or CHUNK_SIZE, resumable=True)
+
+    state_path = _upload_state_path(file_path, channel["name"])
+    if not state_path.exists():
+        # a resumed session was already paid for by the run that started it
+        yt_quota.reserve(channel["name"], yt_quota.COSTS["videos.insert"], channel["daily_quota"])
 
     try:
         request = youtube.videos().insert(
@@ -132,25 +442,160 @@ def upload_video(
             media_body=media,
             notifySubscribers=notify_subscribers,
         )
-
-        response = None
-        while response is None:
-            status, response = request.next_chunk()
-            if status:
-                print(f"Uploading... {int(status.progress() * 100)}%")
+        response = execute_resumable(request, state_path=state_path, on_progress=on_progress)
 
         print("\nUpload complete!")
         print("Video ID:", response["id"])
         print("Watch here: https://youtu.be/" + response["id"])
+        if thumbnail:
+            set_thumbnail(youtube, response["id"], thumbnail, channel)
         return f"https://youtu.be/" + response["id"]
 
     except HttpError as e:
         print(f"An error occurred: {e}")
-        if e.resp.status in [403, 500, 503]:
-            print("Retrying may help if quota or server errors.")
+        if e.resp.status == 403:
+            print("Quota exceeded or upload not allowed for this channel.")
         raise
 
 
+def upload_video_stream(stream, title, description, tags, process=None, notify_subscribers=True,
+                        chunk_size=None, channel=None, on_progress=None, thumbnail=None, **body_options):
+    """
+    Upload a video while it is being produced (see gen_video.start_video_stream).
+    body_options are the build_request_body() fields (privacy_status, publish_at, ...).
+    channel and thumbnail are as in upload_video: the profile to upload to
+    (DEFAULT_CHANNEL if None) and the artwork to set as custom thumbnail.
+    """
+    channel = channel or DEFAULT_CHANNEL
+    youtube = get_authenticated_service(channel)
+    request_body = build_request_body(title, description, tags, **body_options)
+    media = PipeMediaUpload(stream, chunksize=chunk_size, process=process)
+    yt_quota.reserve(channel["name"], yt_quota.COSTS["videos.insert"], channel["daily_quota"])
+
+    try:
+        request = youtube.videos().insert(
+            part="snippet,status,recordingDetails",
+            body=request_body,
+            media_body=media,
+            notifySubscribers=notify_subscribers,
+        )
+        # the stream can't be replayed, so there is no session to persist across restarts
+        response = execute_resumable(request, on_progress=on_progress)
+
+        print("\nUpload complete!")
+        print("Video ID:", response["id"])
+        print("Watch here: https://youtu.be/" + response["id"])
+        if thumbnail:
+            set_thumbnail(youtube, response["id"], thumbnail, channel)
+        return "https://youtu.be/" + response["id"]
+
+    except HttpError as e:
+        print(f"An error occurred: {e}")
+        raise
+    finally:
+        if process is not None and process.poll() is None:
+            process.kill()
+
+
+# ===========================================
+# Multi-channel Upload
+# ===========================================
+class SharedBufferReader(io.RawIOBase):
+    """Independent seekable reader over a buffer shared by several uploads."""
+
+    def __init__(self, buffer):
+        self._view = memoryview(buffer)
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self._view)}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def read(self, size=-1):
+        end = len(self._view) if size is None or size < 0 else min(self._pos + size, len(self._view))
+        data = self._view[self._pos:end].tobytes()
+        self._pos = end
+        return data
+
+    def close(self):
+        # the buffer's owner (an mmap) can't be closed while any view of it is alive
+        if not self.closed:
+            self._view.release()
+        super().close()
+
+
+def _detached(error):
+    """error without its traceback (or its chain's), so it no longer keeps the failed call's frames alive."""
+    e = error
+    while e is not None:
+        e.__traceback__ = None
+        e = e.__cause__ or e.__context__
+    return error
+
+
+def apply_overrides(title, description, tags, body_options, overrides):
+    """Per-channel metadata: overrides from CONFIG.yml on top of the generated metadata."""
+    title = overrides.get("title") or f"{overrides.get('title_prefix', '')}{title}{overrides.get('title_suffix', '')}"
+    if overrides.get("description_suffix"):
+        description = f"{description}\n\n{overrides['description_suffix']}"
+    tags = list(overrides.get("tags") or tags) + list(overrides.get("extra_tags") or [])
+    body_options = dict(body_options)
+    for key in ("privacy_status", "publish_at", "category_id"):
+        if key in overrides:
+            body_options[key] = overrides[key]
+    return title, description, tags, body_options
+
+
+def upload_to_channels(file_path, title, description, tags, channels=None, **body_options):
+    """
+    Upload one rendered video to every channel profile in parallel.
+    The file is mapped into memory once and every upload reads from that map.
+    Returns {channel name: youtu.be link or the exception that stopped it}.
+    """
+    channels = channels or load_channels()
+    results = {}
+
+    with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as shared:
+
+        def upload(channel):
+            ch_title, ch_description, ch_tags, ch_options = apply_overrides(
+                title, description, tags, body_options, channel["overrides"]
+            )
+            reader = SharedBufferReader(shared)
+            try:
+                media = MediaIoBaseUpload(reader, mimetype="video/mp4", chunksize=CHUNK_SIZE, resumable=True)
+                print(f"[{channel['name']}] Uploading to YouTube...")
+                return upload_video(file_path, ch_title, ch_description, ch_tags,
+                                    channel=channel, media=media, **ch_options)
+            finally:
+                reader.close()
+
+        with ThreadPoolExecutor(max_workers=len(channels)) as pool:
+            # a context copy per upload keeps its spans under the caller's
+            futures = {channel["name"]: pool.submit(contextvars.copy_context().run, upload, channel)
+                       for channel in channels}
+            for name, future in futures.items():
+                try:
+                    results[name] = future.result()
+                    print(f"[{name}] {results[name]}")
+                except Exception as e:
+                    print(f"[{name}] Upload failed: {e}")
+                    # a live traceback would pin the failed upload's frames, and with them the map
+                    results[name] = _detached(e)
+
+    return results
+
+
 # ===========================================
 # Example usage
 # ===========================================
@@ -0,0 +1,175 @@
+"""
+Producer voice tag mixed into the audio that goes public (YouTube video, BeatStars preview).
+
+    python voice_tag.py data/beats/don_toliver/ALLIANCE_135_VIRTHY_KVIT.mp3
+
+The tag sample (VOICE_TAG_FILE) is dropped in every VOICE_TAG_INTERVAL seconds,
+loudness-matched to the beat and with the beat ducked underneath it. The mix
+is a handful of whole-array NumPy operations on the decoded beat, and the
+result is cached per beat content and tag version, so re-rendering a video or
+retrying an upload reuses it; prune() clears mixes that went unused. Without a
+tag file the untagged master is used.
+"""
+import hashlib
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+from dotenv import load_dotenv
+
+import tracing
+from library_index import file_hash
+
+BASE_DIR = Path(__file__).resolve().parent
+
+load_dotenv()
+
+# ===== CONFIG =====
+
+TAG_FILE = Path(os.getenv("VOICE_TAG_FILE") or BASE_DIR / "data" / "voice_tag.wav")
+CACHE_DIR = BASE_DIR / "cache" / "tagged"
+INTERVAL = float(os.getenv("VOICE_TAG_INTERVAL") or 30)   # seconds between tag starts
+FIRST_AT = 4.0             # seconds into the beat of the first tag
+LEVEL_DB = -2.0            # tag loudness relative to the beat's
+DUCK_DB = -8.0             # beat gain while the tag plays
+DUCK_FADE = 0.08           # seconds the ducking ramps in and out
+PEAK_CEILING = 0.98
+CACHE_MAX_AGE_DAYS = 14    # prune() drops tagged mixes not used for this long
+# ===================
+
+
+def _db(x):
+    return 10 ** (x / 20)
+
+
+def _rms(audio, frame=2048):
+    """RMS over the frames within 40 dB of the loudest, so silences and tails don't drag it down."""
+    n = len(audio) // frame * frame
+    if not n:
+        return float(np.sqrt(np.mean(audio ** 2)))
+    # (samples, channels) is contiguous, so frames of all channels are plain rows
+    power = np.square(audio[:n]).reshape(-1, frame * audio.shape[1]).mean(axis=1)
+    loud = power[power > power.max() * _db(-40) ** 2]
+    return float(np.sqrt(loud.mean())) if loud.size else 0.0
+
+
+def tag_version():
+    """Changes whenever the tag sample or the mix settings change."""
+    settings = f"{INTERVAL}:{FIRST_AT}:{LEVEL_DB}:{DUCK_DB}:{DUCK_FADE}:{PEAK_CEILING}"
+    return hashlib.blake2b(f"{file_hash(TAG_FILE)}:{settings}".encode(), digest_size=8).hexdigest()
+
+
+def _load(path):
+    try:
+        audio, sr = sf.read(path, dtype="float32", always_2d=True)
+    except sf.LibsndfileError:
+        # m4a/aac/wma: libsndfile can't read them, librosa decodes through audioread/ffmpeg
+        import librosa
+        audio, sr = librosa.load(path, sr=None, mono=False)
+        audio = np.atleast_2d(audio).T.astype(np.float32)
+    return audio, sr
+
+
+def _load_tag(sr, channels):
+    tag, tag_sr = _load(TAG_FILE)
+    if tag_sr != sr:
+        import librosa
+        tag = librosa.resample(tag.T, orig_sr=tag_sr, target_sr=sr).T
+    if tag.shape[1] != channels:
+        tag = np.repeat(tag.mean(axis=1, keepdims=True), channels, axis=1)
+    return tag
+
+
+def mix(beat, tag, sr):
+    """
+    beat with tag laid in every INTERVAL seconds from FIRST_AT, at the beat's
+    loudness + LEVEL_DB, over a DUCK_DB duck. Both are (samples, channels).
+    """
+    n, m = len(beat), len(tag)
+    fade = int(DUCK_FADE * sr)
+    step = max(int(INTERVAL * sr), m + 2 * fade)   # never let two tags (or their ducks) overlap
+    starts = np.arange(int(FIRST_AT * sr), n - m - fade, step)
+    if not len(starts):
+        return beat
+
+    tag = tag * (_db(LEVEL_DB) * _rms(beat) / max(_rms(tag), 1e-9))
+
+    # ducking: 1 outside the tags, DUCK_DB under them, raised-cosine ramps either side
+    ramp = 0.5 - 0.5 * np.cos(np.linspace(0, np.pi, fade, dtype=np.float32))
+    window = np.concatenate([ramp, np.ones(m, np.float32), ramp[::-1]])
+    depth = np.zeros(n, np.float32)
+    depth[np.clip(starts[:, None] - fade + np.arange(len(window)), 0, n - 1)] = window
+    gain = 1 - (1 - _db(DUCK_DB)) * depth
+
+    out = beat * gain[:, None]
+    # one (tags x samples) index grid lays in every tag at once
+    out[starts[:, None] + np.arange(m)] += tag
+    peak = np.abs(out).max()
+    if peak > PEAK_CEILING:
+        out *= PEAK_CEILING / peak
+    return out
+
+
+def tagged_audio(beat_path):
+    """
+    Path of the voice-tagged version of a beat (a cached WAV with the beat's
+    name), or beat_path itself when no tag sample is configured or the mix
+    fails (with a warning: an untagged video beats no video).
+    """
+    if not TAG_FILE.exists():
+        return beat_path
+    try:
+        return _tagged_audio(beat_path)
+    except Exception as e:
+        print(f"[WARN] Could not mix the voice tag into {os.path.basename(beat_path)} ({e}) — using the untagged beat.")
+        return beat_path
+
+
+def _tagged_audio(beat_path):
+    with tracing.span("audio.voice_tag", beat=os.path.basename(beat_path)) as sp:
+        key = f"{file_hash(beat_path)}_{tag_version()}"
+        out_path = CACHE_DIR / key / f"{Path(beat_path).stem}.wav"
+        if out_path.exists():
+            sp.count("cache_hits")
+            now = time.time()
+            os.utime(out_path, (now, now))    # keeps it out of prune()
+            return str(out_path)
+
+        beat, sr = _load(beat_path)
+        out = mix(beat, _load_tag(sr, beat.shape[1]), sr)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = out_path.with_suffix(f".{os.getpid()}.tmp")
+        sf.write(tmp, out, sr, subtype="PCM_16", format="WAV")
+        os.replace(tmp, out_path)
+        sp.count("bytes_written", out_path.stat().st_size)
+        print(f"[INFO] Voice tag mixed into {out_path.name}.")
+        return str(out_path)
+
+
+def prune(max_age_days=CACHE_MAX_AGE_DAYS):
+    """Delete tagged mixes not used for max_age_days; returns how many were removed."""
+    cutoff = time.time() - max_age_days * 86400
+    removed = 0
+    for p in CACHE_DIR.glob("*/*.wav"):
+        try:
+            if p.stat().st_mtime < cutoff:
+                p.unlink()
+                removed += 1
+        except FileNotFoundError:
+            pass    # pruned by another run at the same time
+        try:
+            p.parent.rmdir()
+        except OSError:
+            pass    # still holds a mix (two beats with the same content share a key)
+    return removed
+
+
+if __name__ == "__main__":
+    if not TAG_FILE.exists():
+        print(f"[ERROR] No voice tag sample at {TAG_FILE} (set VOICE_TAG_FILE).")
+        sys.exit(1)
+    for path in sys.argv[1:]:
+        print(tagged_audio(path))
@@ -0,0 +1,244 @@
+"""
+Bulk metadata maintenance for videos that are already on YouTube.
+
+    python yt_bulk_update.py --replace-link https://bsta.rs/old https://bsta.rs/new
+    python yt_bulk_update.py --tags "trap beat, type beat" --dry-run dQw4w9WgXcQ ...
+
+Snippets are read with videos.list (50 ids per call, 1 unit each), every video is
+run through the requested transforms, videos whose snippet did not change are
+skipped, and the rest are sent as videos.update calls grouped into batch HTTP
+requests of up to 50.
+"""
+import argparse
+import re
+
+import tracing
+import yt_quota
+from google_auth_check import FORCE_SSL_SCOPE, READONLY_SCOPE
+from upload_to_youtube import get_authenticated_service, load_channels, sanitize_youtube_tags, DEFAULT_CHANNEL
+from yt_status_watcher import video_id_from_link
+
+# ===== CONFIG =====
+
+BATCH_SIZE = 50  # ids per videos.list call and calls per batch request
+# ===================
+
+# Snippet fields videos.update accepts; the rest of a listed snippet is read-only
+WRITABLE_FIELDS = ("title", "description", "tags", "categoryId", "defaultLanguage", "defaultAudioLanguage")
+WRITABLE_STATUS = ("privacyStatus", "publishAt", "embeddable", "license", "publicStatsViewable",
+                   "selfDeclaredMadeForKids", "containsSyntheticMedia")
+
+
+# ===========================================
+# Reading
+# ===========================================
+def list_channel_uploads(youtube, channel_name="main", daily_quota=yt_quota.DEFAULT_DAILY_QUOTA):
+    """Ids of every video in the channel's uploads playlist, newest first."""
+    yt_quota.reserve(channel_name, 1, daily_quota)
+    channels = youtube.channels().list(part="contentDetails", mine=True).execute()
+    playlist = channels["items"][0]["contentDetails"]["relatedPlaylists"]["uploads"]
+
+    ids, page_token = [], None
+    while True:
+        yt_quota.reserve(channel_name, 1, daily_quota)
+        response = youtube.playlistItems().list(
+            part="contentDetails", playlistId=playlist, maxResults=BATCH_SIZE, pageToken=page_token
+        ).execute()
+        ids += [item["contentDetails"]["videoId"] for item in response.get("items", [])]
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            return ids
+
+
+def fetch_snippets(youtube, video_ids, channel_name="main", daily_quota=yt_quota.DEFAULT_DAILY_QUOTA):
+    """{video_id: writable snippet} for the given ids; unknown ids are left out."""
+    snippets = {}
+    for i in range(0, len(video_ids), BATCH_SIZE):
+        batch = video_ids[i:i + BATCH_SIZE]
+        yt_quota.reserve(channel_name, yt_quota.COSTS["videos.list"], daily_quota)
+        response = youtube.videos().list(part="snippet", id=",".join(batch), maxResults=BATCH_SIZE).execute()
+        for item in response.get("items", []):
+            snippets[item["id"]] = {k: item["snippet"][k] for k in WRITABLE_FIELDS if k in item["snippet"]}
+    return snippets
+
+
+# ===========================================
+# Transforms: snippet -> snippet
+# ===========================================
+def replace_link(old, new):
+    """Swap a store link (e.g. a changed BeatStars shortlink) wherever it appears in the description."""
+    def transform(snippet):
+        return {**snippet, "description": snippet.get("description", "").replace(old, new)}
+    return transform
+
+
+def set_tags(tags):
+    """Replace the tags, cleaned the same way as on upload."""
+    cleaned = sanitize_youtube_tags(tags)
+
+    def transform(snippet):
+        return {**snippet, "tags": cleaned}
+    return transform
+
+
+def append_cross_link(text, marker="Latest beat:"):
+    """Put a `marker` line at the end of the description, replacing the previous one."""
+    def transform(snippet):
+        description = re.sub(rf"\n*{re.escape(marker)}.*$", "", snippet.get("description", ""), flags=re.M).rstrip()
+        return {**snippet, "description": f"{description}\n\n{marker} {text}"}
+    return transform
+
+
+def rebuild_description(inst, email, tags, short_hashtags):
+    """
+    Regenerate the description tail with gen_metadata's builder, keeping each
+    video's intro text, store link, key and bpm.
+    """
+    from gen_metadata import build_description
+
+    def transform(snippet):
+        description = snippet.get("description", "")
+        if "\n\nUSAGE TERMS" not in description:
+            return snippet
+        body = description.split("\n\nUSAGE TERMS", 1)[0]
+        link = _field(description, "Download/Purchase")
+        key = _field(description, "Key")
+        bpm = _field(description, "Bpm")
+        return {**snippet, "description": build_description(body, key, bpm, inst, email, tags, short_hashtags, link=link)}
+    return transform
+
+
+def _field(description, name):
+    match = re.search(rf"^{re.escape(name)}: (.*)$", description, flags=re.M)
+    return match.group(1).strip() if match else ""
+
+
+def plan_updates(snippets, transforms):
+    """Apply the transforms and keep only videos whose snippet actually changed."""
+    updates = {}
+    for video_id, snippet in snippets.items():
+        new = snippet
+        for transform in transforms:
+            new = transform(new)
+        if new != snippet:
+            updates[video_id] = new
+    return updates
+
+
+# ===========================================
+# Writing
+# ===========================================
+def apply_updates(youtube, updates, channel_name="main", daily_quota=yt_quota.DEFAULT_DAILY_QUOTA):
+    """
+    Send videos.update for every planned snippet, 50 calls per batch request.
+    Only as many updates as today's remaining quota allows are sent; the rest
+    are returned as deferred so the job can be repeated tomorrow.
+    """
+    cost = yt_quota.COSTS["videos.update"]
+    affordable = max(0, yt_quota.remaining(channel_name, daily_quota) // cost)
+    ids = list(updates)
+    send, deferred = ids[:affordable], ids[affordable:]
+    if deferred:
+        print(f"[WARN] Quota allows {len(send)} of {len(ids)} updates today, {len(deferred)} deferred.")
+
+    results = {}
+
+    def on_response(request_id, response, exception):
+        results[request_id] = exception or response
+
+    for i in range(0, len(send), BATCH_SIZE):
+        chunk = send[i:i + BATCH_SIZE]
+        yt_quota.reserve(channel_name, cost * len(chunk), daily_quota)
+        batch = youtube.new_batch_http_request(callback=on_response)
+        for video_id in chunk:
+            batch.add(
+                youtube.videos().update(part="snippet", body={"id": video_id, "snippet": updates[video_id]}),
+                request_id=video_id,
+            )
+        batch.execute()
+        print(f"[INFO] Batch {i // BATCH_SIZE + 1}: sent {len(chunk)} update(s).")
+
+    failed = {vid: r for vid, r in results.items() if isinstance(r, Exception)}
+    for video_id, error in failed.items():
+        print(f"[ERROR] {video_id}: {error}")
+    return {"updated": [vid for vid in send if vid in results and vid not in failed], "failed": failed, "deferred": deferred}
+
+
+@tracing.traced("youtube.unschedule")
+def unschedule(video_id, channel=None):
+    """
+    Keep a scheduled upload private: its status is written back without
+    publishAt, so YouTube doesn't publish it when the slot comes.
+    """
+    channel = channel or DEFAULT_CHANNEL
+    name, daily_quota = channel["name"], channel["daily_quota"]
+    youtube = get_authenticated_service(channel, scopes=[READONLY_SCOPE, FORCE_SSL_SCOPE])
+
+    # videos.update replaces the whole status part, so the other settings are sent back as they are
+    yt_quota.reserve(name, yt_quota.COSTS["videos.list"], daily_quota)
+    items = youtube.videos().list(part="status", id=video_id).execute().get("items", [])
+    if not items:
+        raise RuntimeError(f"Video {video_id} not found")
+    status = {k: v for k, v in items[0]["status"].items() if k in WRITABLE_STATUS and k != "publishAt"}
+    status["privacyStatus"] = "private"
+
+    yt_quota.reserve(name, yt_quota.COSTS["videos.update"], daily_quota)
+    youtube.videos().update(part="status", body={"id": video_id, "status": status}).execute()
+
+
+@tracing.traced("youtube.bulk_update")
+def bulk_update(video_ids, transforms, channel=None, dry_run=False):
+    """
+    Update many uploads of one channel in one go. `video_ids` may be ids or links;
+    None means every video on the channel. Raises before any call if the
+    channel's token can't edit videos (see google_auth_setup.py).
+    """
+    channel = channel or DEFAULT_CHANNEL
+    name, daily_quota = channel["name"], channel["daily_quota"]
+    # videos.update needs youtube.force-ssl; without it every update would come back 403
+    scopes = [READONLY_SCOPE] if dry_run else [READONLY_SCOPE, FORCE_SSL_SCOPE]
+    youtube = get_authenticated_service(channel, scopes=scopes)
+
+    if video_ids is None:
+        video_ids = list_channel_uploads(youtube, name, daily_quota)
+    video_ids = [video_id_from_link(v) for v in video_ids]
+
+    snippets = fetch_snippets(youtube, video_ids, name, daily_quota)
+    missing = [v for v in video_ids if v not in snippets]
+    if missing:
+        print(f"[WARN] {len(missing)} video(s) not found: {', '.join(missing)}")
+
+    updates = plan_updates(snippets, transforms)
+    print(f"[INFO] {len(updates)} of {len(snippets)} video(s) need an update.")
+    if dry_run or not updates:
+        for video_id in updates:
+            print(f"  would update https://youtu.be/{video_id}")
+        return {"updated": [], "failed": {}, "deferred": []}
+    return apply_updates(youtube, updates, name, daily_quota)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-edit descriptions and tags of uploaded videos.")
+    parser.add_argument("videos", nargs="*", help="video ids or links (default: all uploads of the channel)")
+    parser.add_argument("--channel", default="main", help="channel name from CONFIG.yml")
+    parser.add_argument("--replace-link", nargs=2, metavar=("OLD", "NEW"))
+    parser.add_argument("--tags", help="comma separated tags to set")
+    parser.add_argument("--cross-link", help="text for the 'Latest beat:' line")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    transforms = []
+    if args.replace_link:
+        transforms.append(replace_link(*args.replace_link))
+    if args.tags:
+        transforms.append(set_tags(args.tags))
+    if args.cross_link:
+        transforms.append(append_cross_link(args.cross_link))
+    if not transforms:
+        parser.error("nothing to change")
+
+    channel = next((c for c in load_channels() if c["name"] == args.channel), None)
+    if channel is None:
+        parser.error(f"unknown channel {args.channel}")
+    result = bulk_update(args.videos or None, transforms, channel=channel, dry_run=args.dry_run)
+    print(f"Updated {len(result['updated'])}, failed {len(result['failed'])}, deferred {len(result['deferred'])}.")
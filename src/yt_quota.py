@@ -0,0 +1,75 @@
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+import tracing
+from file_lock import locked
+
+BASE_DIR = Path(__file__).resolve().parent
+
+# ===== CONFIG =====
+
+QUOTA_FILE = BASE_DIR / "cache" / "yt_quota.json"
+DEFAULT_DAILY_QUOTA = 10_000
+# ===================
+
+# YouTube Data API units per call
+COSTS = {
+    "videos.insert": 1600,
+    "videos.update": 50,
+    "videos.list": 1,
+    "thumbnails.set": 50,
+    "search.list": 100,
+}
+
+
+class QuotaExceededError(RuntimeError):
+    pass
+
+
+def quota_day():
+    """YouTube quotas reset at midnight Pacific time."""
+    return datetime.now(ZoneInfo("America/Los_Angeles")).date().isoformat()
+
+
+def _load():
+    try:
+        with open(QUOTA_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (FileNotFoundError, ValueError):
+        data = {}
+    return data if data.get("day") == quota_day() else {"day": quota_day(), "used": {}}
+
+
+def used(channel):
+    return _load()["used"].get(channel, 0)
+
+
+def remaining(channel, daily_quota=DEFAULT_DAILY_QUOTA):
+    return daily_quota - used(channel)
+
+
+def reserve(channel, units, daily_quota=DEFAULT_DAILY_QUOTA):
+    """
+    Book `units` against today's quota of a channel, or raise if they don't fit.
+    The ledger is shared by the pipeline, GUI jobs and the scheduler, so the
+    booking holds its file lock from read to write.
+    """
+    with locked(QUOTA_FILE):
+        data = _load()
+        spent = data["used"].get(channel, 0)
+        if spent + units > daily_quota:
+            raise QuotaExceededError(
+                f"Channel '{channel}' would exceed its daily quota ({spent} + {units} > {daily_quota})."
+            )
+        data["used"][channel] = spent + units
+        os.makedirs(QUOTA_FILE.parent, exist_ok=True)
+        tmp = QUOTA_FILE.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, QUOTA_FILE)
+        tracing.count("quota_units", units)
+        return spent + units
+
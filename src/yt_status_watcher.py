@@ -0,0 +1,201 @@
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import tracing
+import yt_quota
+from file_lock import locked
+from google_auth_check import READONLY_SCOPE
+from upload_to_youtube import get_authenticated_service, load_channels, DEFAULT_CHANNEL
+
+BASE_DIR = Path(__file__).resolve().parent
+
+# ===== CONFIG =====
+
+WATCH_FILE = BASE_DIR / "cache" / "yt_watch.json"
+BATCH_SIZE = 50          # videos.list accepts up to 50 ids per call
+MIN_INTERVAL = 30        # seconds between polls while things are changing
+MAX_INTERVAL = 15 * 60   # ceiling when nothing changed for a while
+BACKOFF = 1.5
+# ===================
+
+
+def video_id_from_link(link):
+    return link.rstrip("/").rsplit("/", 1)[-1].split("?v=")[-1]
+
+
+def _load_watchlist():
+    try:
+        with open(WATCH_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _save_watchlist(videos):
+    os.makedirs(WATCH_FILE.parent, exist_ok=True)
+    tmp = WATCH_FILE.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(videos, f, indent=2)
+    os.replace(tmp, WATCH_FILE)
+
+
+def _update_watchlist(update):
+    """Read, change (update(videos) in place) and write the watch list under the file lock; returns it."""
+    with locked(WATCH_FILE):
+        videos = _load_watchlist()
+        update(videos)
+        _save_watchlist(videos)
+    return videos
+
+
+def watch_video(video_id, channel="main", publish_at=None):
+    """Add an uploaded video to the persistent watch list (the watcher picks it up on its next poll)."""
+    def add(videos):
+        videos[video_id] = {"channel": channel, "publish_at": publish_at, "processed": False, "published": False}
+
+    return _update_watchlist(add)
+
+
+def _parse_time(value):
+    return datetime.fromisoformat(value.replace("Z", "+00:00")) if value else None
+
+
+def print_event(event, video_id, item):
+    details = item.get("processingDetails", {}) if item else {}
+    reason = details.get("processingFailureReason") or (item or {}).get("status", {}).get("failureReason") or ""
+    print(f"[{event.upper()}] https://youtu.be/{video_id} {reason}".rstrip())
+
+
+class VideoStatusWatcher:
+    """
+    Follows processing and scheduled publishing of many uploads at once.
+    Videos are polled with one videos.list call per 50 ids and per channel,
+    and the poll interval backs off while nothing changes.
+
+    Events passed to on_event(event, video_id, item):
+    processed, failed, published, missing.
+    """
+
+    def __init__(self, on_event=print_event, min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL):
+        self.on_event = on_event
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+        self.videos = _load_watchlist()
+        self.channels = {c["name"]: c for c in load_channels()}
+        self._services = {}
+
+    def watch(self, video_id, channel="main", publish_at=None):
+        self.videos = watch_video(video_id, channel, publish_at)
+
+    def _service(self, channel_name):
+        if channel_name not in self._services:
+            channel = self.channels.get(channel_name, DEFAULT_CHANNEL)
+            self._services[channel_name] = get_authenticated_service(channel, scopes=[READONLY_SCOPE])
+        return self._services[channel_name]
+
+    def _fetch(self, channel_name, ids):
+        channel = self.channels.get(channel_name, DEFAULT_CHANNEL)
+        items = {}
+        for i in range(0, len(ids), BATCH_SIZE):
+            batch = ids[i:i + BATCH_SIZE]
+            yt_quota.reserve(channel_name, yt_quota.COSTS["videos.list"], channel["daily_quota"])
+            response = self._service(channel_name).videos().list(
+                part="status,processingDetails", id=",".join(batch), maxResults=BATCH_SIZE
+            ).execute()
+            items.update({item["id"]: item for item in response.get("items", [])})
+        return items
+
+    def _check(self, video_id, state, item):
+        """Update one video's state from its API item and return the events it produced."""
+        if item is None:
+            return ["missing"]
+        status = item.get("status", {})
+        processing = item.get("processingDetails", {}).get("processingStatus")
+        upload_status = status.get("uploadStatus")
+
+        if upload_status in ("failed", "rejected", "deleted") or processing in ("failed", "terminated"):
+            return ["failed"]
+
+        events = []
+        if not state["processed"] and (upload_status == "processed" or processing == "succeeded"):
+            state["processed"] = True
+            events.append("processed")
+        if state["publish_at"] and not state["published"] and status.get("privacyStatus") == "public":
+            state["published"] = True
+            events.append("published")
+        return events
+
+    def _done(self, state):
+        return state["processed"] and (not state["publish_at"] or state["published"])
+
+    @tracing.traced("youtube.status_poll")
+    def poll_once(self):
+        """Check every watched video once; return the (event, video_id) pairs seen."""
+        # uploads in other processes (cron, GUI) add to the file while this one runs
+        self.videos = _load_watchlist()
+        by_channel = {}
+        for video_id, state in self.videos.items():
+            by_channel.setdefault(state["channel"], []).append(video_id)
+
+        seen = []
+        for channel_name, ids in by_channel.items():
+            items = self._fetch(channel_name, ids)
+            for video_id in ids:
+                state = self.videos[video_id]
+                for event in self._check(video_id, state, items.get(video_id)):
+                    self.on_event(event, video_id, items.get(video_id))
+                    seen.append((event, video_id))
+                    if event in ("failed", "missing"):
+                        state["finished"] = True
+                if self._done(state):
+                    state["finished"] = True
+
+        polled = self.videos
+
+        def merge(videos):
+            # only the videos this poll checked are written back; anything added meanwhile stays
+            for video_id, state in polled.items():
+                if state.get("finished"):
+                    videos.pop(video_id, None)
+                elif video_id in videos:
+                    videos[video_id] = state
+
+        self.videos = _update_watchlist(merge)
+        return seen
+
+    def next_interval(self, changed):
+        """Poll fast while videos change, back off when they don't, wake up for the next publishAt."""
+        self.interval = self.min_interval if changed else min(self.interval * BACKOFF, self.max_interval)
+        now = datetime.now(timezone.utc)
+        upcoming = [
+            (_parse_time(s["publish_at"]) - now).total_seconds()
+            for s in self.videos.values()
+            if s["publish_at"] and not s["published"]
+        ]
+        upcoming = [t for t in upcoming if t > 0]
+        if upcoming:
+            return max(self.min_interval, min(self.interval, min(upcoming) + 5))
+        return self.interval
+
+    def run(self):
+        """Poll until every watched video has finished processing (and gone live, if scheduled)."""
+        while self.videos:
+            changed = self.poll_once()
+            if not self.videos:
+                break
+            wait = self.next_interval(bool(changed))
+            print(f"Watching {len(self.videos)} video(s), next check in {int(wait)}s.")
+            time.sleep(wait)
+        print("All watched videos are done.")
+
+
+if __name__ == "__main__":
+    watcher = VideoStatusWatcher()
+    for arg in sys.argv[1:]:
+        watcher.watch(video_id_from_link(arg))
+    watcher.run()
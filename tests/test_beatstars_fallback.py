@@ -0,0 +1,40 @@
+import pytest
+
+import upload_progress
+import upload_to_beatstars
+
+BEAT = "/library/don_toliver/ECHO_140.mp3"
+
+
+@pytest.fixture
+def calls(tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_progress, "PROGRESS_DIR", tmp_path)
+    calls = []
+    monkeypatch.setattr(upload_to_beatstars, "upload_many",
+                        lambda jobs, **kwargs: calls.append(jobs) or ["https://bsta.rs/browser"])
+    return calls
+
+
+def _fail_http(create_draft):
+    def upload(beat_path, *args):
+        if create_draft:
+            progress = upload_progress.new_progress(beat_path, "http")
+            progress["track_id"] = "trk_1"
+            upload_progress.mark_done(progress, "create")
+        raise RuntimeError("asset upload failed")
+    return upload
+
+
+def test_falls_back_to_browser_before_a_draft_exists(calls, monkeypatch):
+    monkeypatch.setattr(upload_to_beatstars, "_open_and_fill_http", _fail_http(create_draft=False))
+    link = upload_to_beatstars.open_and_fill(BEAT, "img.jpg", ["trap"], [], "TITLE", backend="http")
+    assert link == "https://bsta.rs/browser"
+    assert len(calls) == 1
+
+
+def test_no_second_draft_once_http_created_one(calls, monkeypatch):
+    monkeypatch.setattr(upload_to_beatstars, "_open_and_fill_http", _fail_http(create_draft=True))
+    with pytest.raises(RuntimeError):
+        upload_to_beatstars.open_and_fill(BEAT, "img.jpg", ["trap"], [], "TITLE", backend="http")
+    assert calls == []
+    assert upload_progress.draft_id(BEAT, "http") == "trk_1"
@@ -0,0 +1,37 @@
+import threading
+
+import pytest
+
+import beatstars_http
+import upload_progress
+
+BEAT = "/library/don_toliver/ECHO_140.mp3"
+
+
+class _Client:
+    """Stand-in for BeatStarsHTTPClient whose audio upload fails once the artwork has landed."""
+
+    def __init__(self, **kwargs):
+        self.artwork_done = threading.Event()
+
+    def create_track(self):
+        return "trk_1"
+
+    def upload_asset(self, track_id, kind, path):
+        if kind == "audio":
+            self.artwork_done.wait(5)
+            raise beatstars_http.BeatStarsAPIError("audio chunk rejected")
+        self.artwork_done.set()
+        return f"asset_{kind}"
+
+
+def test_assets_that_landed_are_kept_when_another_fails(tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_progress, "PROGRESS_DIR", tmp_path)
+    monkeypatch.setattr(beatstars_http, "BeatStarsHTTPClient", _Client)
+
+    with pytest.raises(beatstars_http.BeatStarsAPIError, match="audio chunk rejected"):
+        beatstars_http.upload_track(BEAT, "img.jpg", ["trap"], [], "TITLE")
+
+    progress = upload_progress.load_progress(BEAT, "http")
+    assert progress["track_id"] == "trk_1"
+    assert progress["assets"] == {"artwork": "asset_artwork"}
@@ -0,0 +1,38 @@
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import detect_audio_meta  # noqa: E402
+import google_auth_check  # noqa: E402
+import gui  # noqa: E402
+import orchestrator  # noqa: E402
+
+MATCH = {"path": "/library/old/ECHO_140.mp3", "artist": "don_toliver",
+         "released_at": "2026-03-01T12:00:00+00:00", "distance": 3}
+
+
+def _refuse(path):
+    raise detect_audio_meta.DuplicateBeat(path, MATCH)
+
+
+def test_orchestrator_raises_duplicate_instead_of_returning_none(monkeypatch):
+    monkeypatch.setattr(google_auth_check, "check_and_refresh_google_token", lambda: object())
+    monkeypatch.setattr(detect_audio_meta, "analyze_beat", _refuse)
+
+    with pytest.raises(detect_audio_meta.DuplicateBeat):
+        orchestrator.main("/library/new/ECHO_140.mp3", "/library/img.jpg", "don_toliver")
+
+
+def test_gui_reports_the_matching_release(monkeypatch):
+    def refuse(*args, **kwargs):
+        _refuse(args[0])
+
+    monkeypatch.setattr(gui, "orchestrator_main", refuse)
+    with pytest.raises(RuntimeError) as error:
+        gui.upload_files("/library/new/ECHO_140.mp3", "/library/img.jpg", None, "don_toliver", None)
+
+    message = str(error.value)
+    assert "ECHO_140.mp3" in message and "2026-03-01" in message
+    assert "Google" not in message
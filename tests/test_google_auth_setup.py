@@ -0,0 +1,46 @@
+from types import SimpleNamespace
+
+import pytest
+
+import google_auth_check
+import google_auth_setup
+
+
+def _token_endpoint(monkeypatch, scope):
+    response = SimpleNamespace(status_code=200, json=lambda: {"access_token": "ya29.new", "scope": scope})
+    monkeypatch.setattr(google_auth_setup.requests, "post", lambda *a, **kw: response)
+
+
+@pytest.fixture
+def stored_token(tmp_path, monkeypatch):
+    (tmp_path / "client_secret.json").write_text("{}")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(google_auth_setup, "ENV_PATH", tmp_path / ".env")
+    for key in ("CLIENT_ID", "CLIENT_SECRET", "REFRESH_TOKEN"):
+        monkeypatch.setenv(f"GOOGLE_{key}", "stored")
+    flows = []
+    monkeypatch.setattr(google_auth_setup, "authenticate_and_store", flows.append)
+    return flows
+
+
+def test_upload_only_token_is_authorized_again(stored_token, monkeypatch):
+    _token_endpoint(monkeypatch, google_auth_check.UPLOAD_SCOPE)
+    google_auth_setup.main()
+    assert stored_token == ["GOOGLE"]
+
+
+def test_token_with_every_scope_is_kept(stored_token, monkeypatch):
+    _token_endpoint(monkeypatch, " ".join(google_auth_check.SCOPES))
+    google_auth_setup.main()
+    assert stored_token == []
+
+    google_auth_setup.main(force=True)
+    assert stored_token == ["GOOGLE"]
+
+
+def test_require_scopes_names_the_missing_one():
+    creds = SimpleNamespace(granted_scopes=[google_auth_check.UPLOAD_SCOPE])
+    with pytest.raises(RuntimeError, match="youtube.readonly.*google_auth_setup.py GOOGLE_SECOND"):
+        google_auth_check.require_scopes(creds, [google_auth_check.READONLY_SCOPE], "GOOGLE_SECOND")
+    # servers that don't report scopes aren't second-guessed
+    google_auth_check.require_scopes(SimpleNamespace(granted_scopes=None), google_auth_check.SCOPES)
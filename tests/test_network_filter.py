@@ -0,0 +1,23 @@
+import json
+from types import SimpleNamespace
+
+import network_filter
+
+
+def _response(url, length):
+    return SimpleNamespace(url=url, headers={"content-length": str(length)})
+
+
+def test_concurrent_sessions_keep_each_others_sizes(tmp_path, monkeypatch):
+    sizes_file = tmp_path / "cache" / "network_sizes.json"
+    monkeypatch.setattr(network_filter, "SIZES_FILE", sizes_file)
+
+    # both jobs start from the same (empty) file, then save one after the other
+    first, second = (network_filter.NetworkFilter(network_filter.DEFAULTS) for _ in range(2))
+    first._on_response(_response("https://cdn.example.com/a.js", 100))
+    second._on_response(_response("https://cdn.example.com/b.css", 200))
+    first.save_sizes()
+    second.save_sizes()
+
+    with open(sizes_file, encoding="utf-8") as f:
+        assert json.load(f) == {"cdn.example.com/a.js": 100, "cdn.example.com/b.css": 200}
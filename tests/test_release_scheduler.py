@@ -0,0 +1,60 @@
+from datetime import datetime, timezone
+
+import pytest
+
+import release_scheduler
+import yt_bulk_update
+from release_scheduler import ReleaseScheduler, load_releases
+
+NOW = datetime(2026, 10, 19, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def releases_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(release_scheduler, "RELEASES_FILE", tmp_path / "releases.json")
+    return tmp_path / "releases.json"
+
+
+def _prepared(release_id, publish_at):
+    return {"id": release_id, "artist": "a", "publish_at": publish_at, "status": "prepared", "attempts": 0,
+            "retry_at": None, "error": None, "yt_link": f"https://youtu.be/{release_id}", "yt_scheduled": True}
+
+
+def _scheduler():
+    return ReleaseScheduler(schedule=dict(release_scheduler.DEFAULT_SCHEDULE))
+
+
+def test_slot_passed_before_finalize_unschedules_the_video(releases_file, monkeypatch):
+    release_scheduler.save_releases({"late": _prepared("late", "2026-10-19T11:00:00Z")})
+    calls = []
+    monkeypatch.setattr(yt_bulk_update, "unschedule", calls.append)
+
+    _scheduler().tick(NOW)
+
+    release = load_releases()["late"]
+    assert calls == ["late"]
+    assert (release["status"], release["yt_scheduled"]) == ("missed", False)
+
+
+def test_video_stays_reported_until_unscheduling_works(releases_file, monkeypatch, capsys):
+    release_scheduler.save_releases({"late": _prepared("late", "2026-10-19T11:00:00Z")})
+
+    def no_scope(video_id):
+        raise RuntimeError("token lacks youtube.force-ssl")
+
+    monkeypatch.setattr(yt_bulk_update, "unschedule", no_scope)
+    _scheduler().tick(NOW)
+    _scheduler().tick(NOW)
+
+    assert load_releases()["late"]["yt_scheduled"] is True
+    assert capsys.readouterr().out.count("is still scheduled for 2026-10-19T11:00:00Z") == 2
+
+
+def test_tick_starts_from_what_other_processes_saved(releases_file):
+    daemon = _scheduler()                       # loaded before the cron run below
+    release_scheduler.save_releases({"cron": _prepared("cron", "2026-10-20T12:00:00Z")})
+
+    daemon.tick(NOW)
+
+    assert set(load_releases()) == {"cron"}
+    assert not list(releases_file.parent.glob("*.tmp"))
@@ -0,0 +1,39 @@
+import numpy as np
+
+from detect_audio_meta import HOP_LENGTH
+from song_structure import _bar_features, analyze_structure
+
+SR = 22050
+BPM = 140
+
+
+def _feats(frames, rng):
+    return {
+        "y": rng.standard_normal(frames * HOP_LENGTH).astype(np.float32) * 0.1,
+        "sr": SR,
+        "onset_env": rng.random(frames + 1),
+        "chroma": rng.random((12, frames)),
+        "trim": (0, frames * HOP_LENGTH),
+    }
+
+
+def test_bar_features_when_frames_are_not_whole_bars():
+    rng = np.random.default_rng(0)
+    bar = 4 * 60 / BPM * SR / HOP_LENGTH
+    # lengths whose last bar start rounds up onto the end of the track
+    lengths = [f for f in range(700, 2000) if round(np.arange(0, f, bar)[-1]) >= f]
+    assert lengths
+    for frames in lengths + [740, 1000]:
+        feats = _feats(frames, rng)
+        bars, _ = _bar_features(feats, rng.random(frames + 1), BPM)
+        assert bars.shape[1] == 14
+        assert np.isfinite(bars).all()
+
+
+def test_analyze_structure_covers_the_track():
+    rng = np.random.default_rng(1)
+    feats = _feats(2584, rng)
+    structure = analyze_structure(feats, BPM)
+    sections = structure["sections"]
+    assert sections[0]["start"] == 0
+    assert all(a["end"] == b["start"] for a, b in zip(sections, sections[1:]))
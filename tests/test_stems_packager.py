@@ -0,0 +1,37 @@
+import os
+import zipfile
+
+import numpy as np
+
+import stems_packager
+
+
+def _stems(folder):
+    folder.mkdir()
+    (folder / "808.wav").write_bytes(b"RIFF" + b"\0" * 200_000)      # silence: deflates well
+    (folder / "melody.mp3").write_bytes(np.random.default_rng(0).bytes(50_000))
+    return folder
+
+
+def test_unchanged_folder_is_not_hashed_again(tmp_path, monkeypatch):
+    monkeypatch.setattr(stems_packager, "CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setattr(stems_packager, "INDEX_FILE", tmp_path / "cache" / "index.json")
+    folder = _stems(tmp_path / "BEAT_140")
+
+    first = stems_packager.package(folder)
+    with zipfile.ZipFile(first) as zf:
+        methods = {info.filename: info.compress_type for info in zf.infolist()}
+    assert methods == {"808.wav": zipfile.ZIP_DEFLATED, "melody.mp3": zipfile.ZIP_STORED}
+
+    def no_hashing(path):
+        raise AssertionError(f"{path} hashed again")
+
+    monkeypatch.setattr(stems_packager, "file_hash", no_hashing)
+    assert stems_packager.package(folder) == first
+
+    # touched but unchanged: hashed once more, same archive
+    monkeypatch.undo()
+    monkeypatch.setattr(stems_packager, "CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setattr(stems_packager, "INDEX_FILE", tmp_path / "cache" / "index.json")
+    os.utime(folder / "808.wav", (1, 1))
+    assert stems_packager.package(folder) == first
@@ -0,0 +1,34 @@
+import json
+import multiprocessing
+
+import pytest
+
+import tracing
+
+
+def _runs(times):
+    for _ in range(times):
+        with tracing.span("pipeline"):
+            tracing.count("quota_units", 1)
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_runs_in_several_processes_all_reach_the_metrics(tmp_path, monkeypatch):
+    monkeypatch.setattr(tracing, "ENABLED", True)
+    monkeypatch.setattr(tracing, "TRACE_DIR", tmp_path)
+    monkeypatch.setattr(tracing, "TRACE_FILE", tmp_path / "spans.jsonl")
+    monkeypatch.setattr(tracing, "METRICS_FILE", tmp_path / "metrics.json")
+    monkeypatch.setattr(tracing, "PROM_FILE", tmp_path / "beat_pipeline.prom")
+
+    fork = multiprocessing.get_context("fork")
+    workers = [fork.Process(target=_runs, args=(20,)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert [w.exitcode for w in workers] == [0] * 4
+    metrics = json.loads((tmp_path / "metrics.json").read_text())
+    assert metrics["spans"]["pipeline"]["count"] == 80
+    assert metrics["spans"]["pipeline"]["counters"] == {"quota_units": 80}
+    assert 'beat_pipeline_span_count_total{span="pipeline"} 80' in (tmp_path / "beat_pipeline.prom").read_text()
@@ -0,0 +1,69 @@
+import json
+import os
+from types import SimpleNamespace
+
+import httplib2
+import pytest
+from googleapiclient.http import MediaFileUpload
+
+import upload_to_youtube
+
+SIZE = 1024 * 1024
+SESSION = "https://upload.example.com/session/1"
+
+
+class _Request:
+    """The parts of googleapiclient's HttpRequest that execute_resumable uses."""
+
+    def __init__(self, video, reply):
+        self.resumable = MediaFileUpload(str(video), chunksize=256 * 1024, resumable=True)
+        self.resumable_uri = None
+        self.resumable_progress = 0
+        self.queries, self.chunks = [], []
+
+        def request(uri, method, headers):
+            self.queries.append((uri, method, headers))
+            return reply
+
+        self.http = SimpleNamespace(request=request)
+
+    def next_chunk(self):
+        self.chunks.append((self.resumable_uri, self.resumable_progress))
+        return None, {"id": "vid1"}
+
+
+@pytest.fixture
+def saved_session(tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_to_youtube, "UPLOAD_STATE_DIR", tmp_path / "yt_uploads")
+    video = tmp_path / "BEAT_140.mp4"
+    video.write_bytes(b"\0" * SIZE)
+    state_path = upload_to_youtube._upload_state_path(video)
+    upload_to_youtube._save_upload_state(state_path, SimpleNamespace(resumable_uri=SESSION, resumable_progress=0))
+    return video, state_path
+
+
+def test_restart_continues_where_youtube_stopped(saved_session):
+    video, state_path = saved_session
+    request = _Request(video, (httplib2.Response({"status": 308, "range": "bytes=0-524287"}), b""))
+
+    assert upload_to_youtube.execute_resumable(request, state_path=state_path) == {"id": "vid1"}
+    assert request.queries == [(SESSION, "PUT", {"Content-Length": "0", "Content-Range": f"bytes */{SIZE}"})]
+    assert request.chunks == [(SESSION, 512 * 1024)]
+    assert not state_path.exists()
+
+
+def test_upload_finished_before_the_restart(saved_session):
+    video, state_path = saved_session
+    request = _Request(video, (httplib2.Response({"status": 200}), json.dumps({"id": "done1"}).encode()))
+
+    assert upload_to_youtube.execute_resumable(request, state_path=state_path) == {"id": "done1"}
+    assert request.chunks == []
+
+
+def test_pending_upload_is_tied_to_the_render(saved_session):
+    video, _ = saved_session
+    assert upload_to_youtube.pending_upload(video)
+    assert not upload_to_youtube.pending_upload(video, channel="second")
+
+    os.utime(video, ns=(1, 1))          # rendered again: the session's bytes are gone
+    assert not upload_to_youtube.pending_upload(video)
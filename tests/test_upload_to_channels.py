@@ -0,0 +1,39 @@
+import io
+from types import SimpleNamespace
+
+import upload_to_youtube
+
+
+def test_failed_channel_keeps_the_other_results(tmp_path, monkeypatch):
+    video = tmp_path / "video.mp4"
+    video.write_bytes(b"\0" * 4096)
+
+    def fake_upload(file_path, title, description, tags, channel=None, media=None, **options):
+        stream = media.stream()
+        stream.seek(0)
+        chunk = stream.read(1024)
+        if channel["name"] == "broken":
+            raise RuntimeError("upload refused")
+        return f"https://youtu.be/{channel['name']}{len(chunk)}"
+
+    monkeypatch.setattr(upload_to_youtube, "upload_video", fake_upload)
+    channels = [dict(upload_to_youtube.DEFAULT_CHANNEL, name=name) for name in ("main", "broken", "second")]
+    results = upload_to_youtube.upload_to_channels(str(video), "title", "description", ["tag"], channels=channels)
+
+    assert results["main"] == "https://youtu.be/main1024"
+    assert results["second"] == "https://youtu.be/second1024"
+    assert isinstance(results["broken"], RuntimeError)
+
+
+def test_streamed_upload_uses_the_given_channel(monkeypatch):
+    calls = []
+    youtube = SimpleNamespace(videos=lambda: SimpleNamespace(insert=lambda **kwargs: "request"))
+    monkeypatch.setattr(upload_to_youtube, "get_authenticated_service", lambda channel: calls.append(channel) or youtube)
+    monkeypatch.setattr(upload_to_youtube.yt_quota, "reserve", lambda name, units, daily: calls.append(name))
+    monkeypatch.setattr(upload_to_youtube, "execute_resumable", lambda request, on_progress=None: {"id": "vid1"})
+
+    second = dict(upload_to_youtube.DEFAULT_CHANNEL, name="second", env_prefix="GOOGLE_SECOND")
+    link = upload_to_youtube.upload_video_stream(io.BytesIO(b"\0" * 1024), "title", "description", ["tag"], channel=second)
+
+    assert link == "https://youtu.be/vid1"
+    assert calls == [second, "second"]
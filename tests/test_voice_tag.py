@@ -0,0 +1,19 @@
+import os
+import time
+
+import voice_tag
+
+
+def test_prune_drops_only_mixes_that_went_unused(tmp_path, monkeypatch):
+    monkeypatch.setattr(voice_tag, "CACHE_DIR", tmp_path)
+    old = tmp_path / "aaa_v1" / "OLD_140.wav"
+    fresh = tmp_path / "bbb_v1" / "FRESH_90.wav"
+    for path in (old, fresh):
+        path.parent.mkdir()
+        path.write_bytes(b"RIFF")
+    month_ago = time.time() - 30 * 86400
+    os.utime(old, (month_ago, month_ago))
+
+    assert voice_tag.prune() == 1
+    assert not old.parent.exists()
+    assert fresh.exists()
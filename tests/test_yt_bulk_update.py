@@ -0,0 +1,48 @@
+from types import SimpleNamespace
+
+import pytest
+
+import upload_to_youtube
+import yt_bulk_update
+from google_auth_check import READONLY_SCOPE, UPLOAD_SCOPE
+
+
+def test_token_without_force_ssl_fails_before_any_call(monkeypatch):
+    creds = SimpleNamespace(granted_scopes=[UPLOAD_SCOPE, READONLY_SCOPE])
+    monkeypatch.setattr(upload_to_youtube, "check_and_refresh_google_token", lambda env_prefix: creds)
+
+    def no_client(**kwargs):
+        raise AssertionError("API client built")
+
+    monkeypatch.setattr(upload_to_youtube, "build_youtube", no_client)
+    with pytest.raises(RuntimeError, match="youtube.force-ssl.*re-run google_auth_setup.py GOOGLE"):
+        yt_bulk_update.bulk_update(["dQw4w9WgXcQ"], [yt_bulk_update.set_tags("trap beat")])
+
+
+class _Videos:
+    def __init__(self, status):
+        self.status, self.sent = status, []
+
+    def videos(self):
+        return self
+
+    def list(self, **kwargs):
+        return SimpleNamespace(execute=lambda: {"items": [{"id": kwargs["id"], "status": self.status}]})
+
+    def update(self, part, body):
+        self.sent.append((part, body))
+        return SimpleNamespace(execute=lambda: body)
+
+
+def test_unschedule_keeps_the_other_status_settings(monkeypatch):
+    youtube = _Videos({"uploadStatus": "processed", "privacyStatus": "private", "publishAt": "2026-10-20T12:00:00Z",
+                       "license": "youtube", "embeddable": True, "selfDeclaredMadeForKids": False})
+    monkeypatch.setattr(upload_to_youtube, "check_and_refresh_google_token",
+                        lambda env_prefix: SimpleNamespace(granted_scopes=None))
+    monkeypatch.setattr(upload_to_youtube, "build_youtube", lambda **kwargs: youtube)
+    monkeypatch.setattr(yt_bulk_update.yt_quota, "reserve", lambda *args: None)
+
+    yt_bulk_update.unschedule("vid1")
+
+    assert youtube.sent == [("status", {"id": "vid1", "status": {
+        "privacyStatus": "private", "license": "youtube", "embeddable": True, "selfDeclaredMadeForKids": False}})]
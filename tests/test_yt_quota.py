@@ -0,0 +1,26 @@
+import multiprocessing
+
+import pytest
+
+import yt_quota
+
+
+def _book(times):
+    for _ in range(times):
+        yt_quota.reserve("main", 1)
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_bookings_from_several_processes_all_count(tmp_path, monkeypatch):
+    monkeypatch.setattr(yt_quota, "QUOTA_FILE", tmp_path / "yt_quota.json")
+    monkeypatch.setattr(yt_quota.tracing, "count", lambda *args: None)
+
+    fork = multiprocessing.get_context("fork")
+    workers = [fork.Process(target=_book, args=(25,)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert [w.exitcode for w in workers] == [0] * 4
+    assert yt_quota.used("main") == 100
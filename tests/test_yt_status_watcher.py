@@ -0,0 +1,22 @@
+import yt_status_watcher
+from yt_status_watcher import VideoStatusWatcher, watch_video
+
+
+def test_poll_keeps_videos_added_by_other_processes(tmp_path, monkeypatch):
+    monkeypatch.setattr(yt_status_watcher, "WATCH_FILE", tmp_path / "yt_watch.json")
+    watch_video("done1", channel="main")
+    watch_video("busy1", channel="main")
+    watcher = VideoStatusWatcher(on_event=lambda *args: None)
+
+    def fetch(channel_name, ids):
+        # another upload registers its video while this poll waits on the API
+        watch_video("late1", channel="main")
+        return {"done1": {"id": "done1", "status": {"uploadStatus": "processed"}},
+                "busy1": {"id": "busy1", "status": {"uploadStatus": "uploaded"}}}
+
+    monkeypatch.setattr(watcher, "_fetch", fetch)
+    seen = watcher.poll_once()
+
+    assert seen == [("processed", "done1")]
+    assert set(yt_status_watcher._load_watchlist()) == {"busy1", "late1"}
+    assert set(watcher.videos) == {"busy1", "late1"}